@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Compare the legacy per-pixel row scan of CoveragePathPlanner with the
+precomputed RowSpanIndex on generated maps of increasing size.
+
+    python3 benchmarks/bench_span_index.py
+"""
+import math
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mapGenrating.generatePGM_Map import generate_map
+from pathPlannig.row_spans import RowSpanIndex
+
+
+def synthetic_lake(radius_m, vertices=64, lat=48.84, lng=2.27):
+    """Irregular polygon around (lat, lng) with the given mean radius in meters"""
+    coordinates = []
+    for i in range(vertices):
+        angle = 2 * math.pi * i / vertices
+        r = radius_m * (1.0 + 0.25 * math.sin(5 * angle))
+        d_lat = r * math.sin(angle) / 111320.0
+        d_lng = r * math.cos(angle) / (111320.0 * math.cos(math.radians(lat)))
+        coordinates.append({"lat": lat + d_lat, "lng": lng + d_lng})
+    return coordinates
+
+
+def legacy_navigable_range(map_img, y):
+    """The original pure Python scan, kept here as the baseline"""
+    x_min = None
+    x_max = None
+    for x in range(map_img.shape[1]):
+        if map_img[y, x] == 255:
+            if x_min is None:
+                x_min = x
+            x_max = x
+    return x_min, x_max
+
+
+def run(radius_m, sample_rows=50):
+    with tempfile.TemporaryDirectory() as tmp:
+        map_path = os.path.join(tmp, "bench.pgm")
+        generate_map(synthetic_lake(radius_m), output_path=map_path)
+        map_img = cv2.imread(map_path, cv2.IMREAD_GRAYSCALE)
+
+    height, width = map_img.shape
+    rows = range(0, height, max(1, height // sample_rows))
+
+    start = time.perf_counter()
+    legacy = [legacy_navigable_range(map_img, y) for y in rows]
+    legacy_per_row = (time.perf_counter() - start) / len(rows)
+
+    start = time.perf_counter()
+    index = RowSpanIndex.from_map(map_img)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed = [index.row_range(y) for y in rows]
+    lookup_per_row = (time.perf_counter() - start) / len(rows)
+
+    assert legacy == indexed, "span index disagrees with the legacy scan"
+
+    print(f"{width}x{height} px | legacy {legacy_per_row * 1e3:8.3f} ms/row | "
+          f"index build {build_time * 1e3:8.1f} ms | lookup {lookup_per_row * 1e6:6.2f} us/row | "
+          f"speedup {legacy_per_row / lookup_per_row:10.0f}x")
+
+
+if __name__ == "__main__":
+    for radius in (25, 50, 100, 200):
+        run(radius)
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Time the hot paths of the planner on synthetic lakes of increasing size
+and vertex count: map generation, map loading, coverage planning, coverage
+evaluation, waypoint export and path display. Every stage records its wall time (median of the
+runs) and how much its resident memory grew at the peak (one extra run in
+a forked child, so memmapped pages and OpenCV and Qt buffers count too),
+and the results are written to a JSON file. Two result files can be compared
+to catch slower stages or higher peak memory (exit status 1):
+
+    python3 benchmarks/run_benchmarks.py -o before.json
+    python3 benchmarks/run_benchmarks.py -o after.json --compare before.json
+    python3 benchmarks/run_benchmarks.py --compare before.json after.json
+
+The display stages run on the offscreen Qt platform, no screen is needed.
+The memory runs need fork and getrusage, so the benchmarks run on Linux.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import traceback
+from datetime import datetime
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench_span_index import synthetic_lake
+from mapGenrating.clearance import clearance_path
+from mapGenrating.generatePGM_Map import generate_map
+from pathPlannig.coverage_eval import evaluate_coverage
+from pathPlannig.coverage_planner import CoveragePathPlanner, default_start
+
+# Size tiers: mean lake radius in meters and polygon vertices
+TIERS = {
+    "small": {"radius_m": 25, "vertices": 32},
+    "medium": {"radius_m": 100, "vertices": 256},
+    "large": {"radius_m": 250, "vertices": 2048},
+}
+# Timed runs per stage, the median is reported
+DEFAULT_REPEAT = 3
+# A stage regresses when it is this much slower than the baseline...
+REGRESSION_RATIO = 0.2
+# ...and by more than this many seconds, so that noise on fast stages is ignored
+REGRESSION_MIN_SECONDS = 0.005
+# Same for the peak memory, in megabytes
+REGRESSION_MIN_MB = 1.0
+
+
+def peak_rss_mb(stage, setup=None):
+    """
+    Growth of the resident set size, in megabytes, from the start of
+    stage() to its peak. The stage runs in a forked child: the pages of
+    earlier runs are not in the way and whatever it leaves behind is
+    dropped with the child.
+    """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            os.close(read_fd)
+            if setup:
+                setup()
+            # ru_maxrss of a new child starts at its resident size, in KiB on Linux
+            baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            stage()
+            os.write(write_fd, str(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline).encode())
+            status = 0
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            os._exit(status)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        output = f.read()
+    _, status = os.waitpid(pid, 0)
+    if status != 0:
+        raise RuntimeError("the memory run of the stage failed")
+    return int(output) / 1024
+
+def measure(stage, repeat, setup=None):
+    """
+    Median wall time of repeat runs of stage() and the peak growth of the
+    resident memory during one more run. setup() runs untimed before every
+    run.
+    """
+    runs = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        stage()
+        runs.append(time.perf_counter() - start)
+    return {
+        "seconds": round(statistics.median(runs), 6),
+        "runs": [round(run, 6) for run in runs],
+        "peak_rss_mb": round(peak_rss_mb(stage, setup), 3),
+    }
+
+def run_tier(name, radius_m, vertices, workdir, repeat=DEFAULT_REPEAT, gui=True):
+    """Benchmark every stage on one synthetic lake, returns the tier result dict"""
+    # The GUI module pulls in PyQt5, imported only when the benchmarks run
+    from pathPlannig.main import NavigationManager
+    map_path = os.path.join(workdir, f"{name}.pgm")
+    coordinates = synthetic_lake(radius_m, vertices)
+    stages = {}
+
+    def generate():
+        # generate_map reports progress on stdout
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            generate_map(coordinates, output_path=map_path, export_gazebo=False)
+    stages["generate_map"] = measure(generate, repeat)
+
+    # A cold load: the cached distance field is removed before every run
+    def remove_clearance():
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(clearance_path(map_path))
+    nav_manager = NavigationManager()
+    stages["load_map"] = measure(lambda: nav_manager.load_map(map_path), repeat, remove_clearance)
+    nav_manager.load_map(map_path)
+
+    start = default_start(nav_manager.clearance, nav_manager.safety_margin)
+    points = []
+    def plan():
+        planner = CoveragePathPlanner(nav_manager.map_img, nav_manager.clearance, nav_manager.safety_margin)
+        points[:] = planner.generate_path(*start)
+    stages["plan_path"] = measure(plan, repeat)
+    nav_manager.add_waypoints(points)
+
+    # The same plan turned 45 degrees about the map center: diagonal legs
+    # have bounding boxes much larger than their swaths
+    center = np.array([nav_manager.width, nav_manager.height]) / 2.0
+    turn = np.array([[1.0, -1.0], [1.0, 1.0]]) / np.sqrt(2.0)
+    diagonal = (np.asarray(points, dtype=np.float64) - center) @ turn.T + center
+    for stage, plan_points in (("evaluate_coverage", points), ("evaluate_coverage_diagonal", diagonal)):
+        stages[stage] = measure(lambda plan_points=plan_points: evaluate_coverage(
+            nav_manager.map_img, plan_points, resolution=nav_manager.resolution), repeat)
+
+    export_path = os.path.join(workdir, f"{name}_waypoints.yaml")
+    stages["export_waypoints"] = measure(lambda: nav_manager.save_waypoints(export_path), repeat)
+
+    if gui:
+        stages.update(gui_stages(nav_manager, repeat))
+    return {
+        "radius_m": radius_m,
+        "vertices": vertices,
+        "width": nav_manager.width,
+        "height": nav_manager.height,
+        "waypoints": len(nav_manager.get_waypoints()),
+        "stages": stages,
+    }
+
+def gui_stages(nav_manager, repeat):
+    """Display: building the map levels, rebuilding the path item and painting the whole scene"""
+    from PyQt5.QtGui import QImage, QPainter
+    from PyQt5.QtWidgets import QApplication, QGraphicsScene
+    from pathPlannig.main import MapTileItem, PathVisualizer
+    from pathPlannig.map_pyramid import MapPyramid
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    stages = {"build_pyramid": measure(lambda: MapPyramid(nav_manager.map_img).build(), repeat)}
+    # The window builds the levels in the background before painting them
+    nav_manager.map_pyramid.build()
+    scene = QGraphicsScene()
+    map_item = MapTileItem(nav_manager.map_pyramid)
+    scene.addItem(map_item)
+    scene.setSceneRect(map_item.boundingRect())
+    visualizer = PathVisualizer(scene, nav_manager)
+    visualizer.draw_grid()
+    stages["update_display"] = measure(visualizer.update_display, repeat)
+
+    # Paint to an image the size of the default window
+    image = QImage(1000, 800, QImage.Format_RGB32)
+    def paint():
+        painter = QPainter(image)
+        scene.render(painter)
+        painter.end()
+    stages["paint_scene"] = measure(paint, repeat)
+    app.processEvents()
+    return stages
+
+def environment():
+    """Where the results come from, timings are only comparable on the same machine"""
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+def run_benchmarks(tiers, repeat=DEFAULT_REPEAT, gui=True):
+    results = {"environment": environment(), "repeat": repeat, "tiers": {}}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in tiers:
+            tier = run_tier(name, TIERS[name]["radius_m"], TIERS[name]["vertices"], workdir, repeat, gui)
+            results["tiers"][name] = tier
+            width = max(len(stage) for stage in tier["stages"])
+            for stage, result in tier["stages"].items():
+                print(f"{name:6s} {tier['width']:5d}x{tier['height']:<5d} {stage:{width}s} "
+                      f"{result['seconds'] * 1e3:9.1f} ms  {result['peak_rss_mb']:8.1f} MB", file=sys.stderr)
+    return results
+
+def is_regression(before, after, ratio, minimum):
+    return after > before * (1.0 + ratio) and after - before > minimum
+
+def compare(baseline, current, ratio=REGRESSION_RATIO, min_seconds=REGRESSION_MIN_SECONDS,
+            min_mb=REGRESSION_MIN_MB):
+    """
+    Stage by stage comparison of two result dicts
+    Returns a list of dicts with both timings and peak memories, the time
+    ratio and regression flags for every stage present in both.
+    """
+    rows = []
+    for tier, result in current["tiers"].items():
+        base_stages = baseline["tiers"].get(tier, {}).get("stages", {})
+        for stage, timing in result["stages"].items():
+            if stage not in base_stages:
+                continue
+            before = base_stages[stage]["seconds"]
+            after = timing["seconds"]
+            # Results written before the resident memory was measured have none
+            peak_before = base_stages[stage].get("peak_rss_mb")
+            peak_after = timing.get("peak_rss_mb")
+            rows.append({
+                "tier": tier,
+                "stage": stage,
+                "before": before,
+                "after": after,
+                "ratio": round(after / before, 3) if before > 0 else None,
+                "peak_mb_before": peak_before,
+                "peak_mb_after": peak_after,
+                "regression": is_regression(before, after, ratio, min_seconds),
+                "memory_regression": (peak_before is not None and peak_after is not None
+                                      and is_regression(peak_before, peak_after, ratio, min_mb)),
+            })
+    return rows
+
+def format_mb(value):
+    return f"{value:7.1f}" if value is not None else "      -"
+
+def print_comparison(rows):
+    width = max((len(row["stage"]) for row in rows), default=0)
+    for row in rows:
+        ratio = f"{row['ratio']:6.2f}x" if row["ratio"] is not None else "     -"
+        flag = "  SLOWER" if row["regression"] else ""
+        flag += "  MORE MEMORY" if row["memory_regression"] else ""
+        print(f"{row['tier']:6s} {row['stage']:{width}s} {row['before'] * 1e3:9.1f} ms -> "
+              f"{row['after'] * 1e3:9.1f} ms {ratio}  "
+              f"{format_mb(row['peak_mb_before'])} -> {format_mb(row['peak_mb_after'])} MB{flag}")
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark map generation, planning and display")
+    parser.add_argument("--tiers", nargs="+", choices=list(TIERS), default=list(TIERS),
+                        help="size tiers to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="timed runs per stage")
+    parser.add_argument("--no-gui", action="store_true", help="skip the Qt display stages")
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="JSON file for the results")
+    parser.add_argument("--compare", nargs="+", metavar="RESULTS",
+                        help="baseline JSON to compare this run against, or two JSON files "
+                        "(baseline, current) to compare without running")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_RATIO,
+                        help="slowdown or memory growth flagged as a regression (default: 0.2 for 20%%)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.compare and len(args.compare) > 2:
+        print("--compare takes one or two result files", file=sys.stderr)
+        return 2
+    if args.compare and len(args.compare) == 2:
+        current = load_results(args.compare[1])
+    else:
+        current = run_benchmarks(args.tiers, args.repeat, gui=not args.no_gui)
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"Results written to {args.output}", file=sys.stderr)
+    if not args.compare:
+        return 0
+    rows = compare(load_results(args.compare[0]), current, args.threshold)
+    print_comparison(rows)
+    # Non-zero exit status so that CI jobs fail on regressions
+    return 1 if any(row["regression"] or row["memory_regression"] for row in rows) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
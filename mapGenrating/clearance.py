@@ -0,0 +1,202 @@
+import json
+import math
+import os
+import tempfile
+
+import cv2
+import numpy as np
+
+from mapGenrating.instrumentation import count, timed
+
+# Clearances are stored as uint16 in 1/CLEARANCE_SCALE pixel units
+CLEARANCE_SCALE = 16
+# Clearances are only exact up to this distance, larger ones are clamped to it
+MAX_CLEARANCE_M = 10.0
+# Default distance in meters kept from borders and land
+DEFAULT_SAFETY_MARGIN = 0.5
+# Rows of the map transformed at once
+BAND_ROWS = 1024
+
+
+def clearance_path(map_path):
+    """Path of the cached clearance of a map: <stem>.dist.npy next to the PGM"""
+    return os.path.splitext(map_path)[0] + ".dist.npy"
+
+def clearance_info_path(map_path):
+    """Path of the parameters the cached clearance was computed with: <stem>.dist.json"""
+    return os.path.splitext(map_path)[0] + ".dist.json"
+
+def read_clearance_info(map_path):
+    """Parameters of the cached clearance of a map as a dict, None when unknown"""
+    try:
+        with open(clearance_info_path(map_path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_clearance_info(map_path, info):
+    path = clearance_info_path(map_path)
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                    dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(info, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+def max_clearance_px(resolution, max_clearance_m=MAX_CLEARANCE_M):
+    return min(int(math.ceil(max_clearance_m / resolution)), np.iinfo(np.uint16).max // CLEARANCE_SCALE)
+
+def compute_clearance(map_img, resolution, max_clearance_m=MAX_CLEARANCE_M, out=None,
+                      free_value=255, band_rows=BAND_ROWS, progress=None):
+    """
+    Euclidean distance (in 1/CLEARANCE_SCALE pixels) from every free pixel
+    to the nearest non-free pixel or to the map edge, 0 on non-free pixels.
+
+    The map is transformed in bands of rows overlapping by the clamp
+    distance: any obstacle closer than that lies inside the band, so the
+    clamped result is exact while memory stays bounded on huge maps.
+    out: optional uint16 array (e.g. a memmap) to write into
+    progress: optional callback called with the completed fraction after
+        every band, may raise to abort
+    """
+    height, width = map_img.shape
+    clamp = max_clearance_px(resolution, max_clearance_m)
+    if out is None:
+        out = np.empty((height, width), dtype=np.uint16)
+    for y0 in range(0, height, band_rows):
+        y1 = min(y0 + band_rows, height)
+        a0 = max(y0 - clamp, 0)
+        a1 = min(y1 + clamp, height)
+        free = (np.asarray(map_img[a0:a1]) == free_value).astype(np.uint8)
+        # Pixels outside the map count as obstacles
+        top = 1 if a0 == 0 else 0
+        bottom = 1 if a1 == height else 0
+        free = cv2.copyMakeBorder(free, top, bottom, 1, 1, cv2.BORDER_CONSTANT, value=0)
+        dist = cv2.distanceTransform(free, cv2.DIST_L2, cv2.DIST_MASK_PRECISE)
+        band = dist[top + y0 - a0:top + y1 - a0, 1:-1]
+        np.minimum(band, clamp, out=band)
+        out[y0:y1] = np.rint(band * CLEARANCE_SCALE)
+        if progress:
+            progress(y1 / height)
+    return out
+
+class ClearanceMap:
+    """
+    Distance field of the free space of a map, for O(1) clearance queries
+    in meters. Clearances above the clamp distance read as the clamp.
+    """
+
+    def __init__(self, dist, resolution):
+        self.dist = dist
+        self.resolution = resolution
+        self.height, self.width = dist.shape
+
+    @classmethod
+    def compute(cls, map_img, resolution=0.05, max_clearance_m=MAX_CLEARANCE_M, progress=None):
+        """Distance field held in memory, for maps that are not files"""
+        return cls(compute_clearance(map_img, resolution, max_clearance_m, progress=progress), resolution)
+
+    @classmethod
+    def load_or_compute(cls, map_path, map_img, resolution=0.05, max_clearance_m=MAX_CLEARANCE_M,
+                        progress=None):
+        """
+        Memory-map the cached distance field of a map, computing and saving
+        it first when it is missing, older than the map or computed with
+        another resolution or clamp distance
+        progress: optional callback called with the completed fraction of
+            the computation, may raise to abort it
+        """
+        path = clearance_path(map_path)
+        # Stored distances are in pixels, clamped at a distance in pixels
+        info = {"resolution": resolution,
+                "max_clearance_px": max_clearance_px(resolution, max_clearance_m)}
+        try:
+            if (os.path.getmtime(path) >= os.path.getmtime(map_path)
+                    and read_clearance_info(map_path) == info):
+                dist = np.load(path, mmap_mode="r")
+                if dist.shape == map_img.shape and dist.dtype == np.uint16:
+                    count("clearance.cache_hits")
+                    return cls(dist, resolution)
+        except (OSError, ValueError):
+            pass
+        tmp_path = None
+        try:
+            # A temporary file of its own: two loads of the same map may overlap
+            fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                            dir=os.path.dirname(path) or ".")
+            os.close(fd)
+            out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.uint16, shape=map_img.shape)
+            with timed("clearance.compute"):
+                compute_clearance(map_img, resolution, max_clearance_m, out=out, progress=progress)
+            out.flush()
+            del out
+            # Without its parameters the old field no longer passes the check
+            try:
+                os.remove(clearance_info_path(map_path))
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_path, path)
+            tmp_path = None
+            write_clearance_info(map_path, info)
+            return cls(np.load(path, mmap_mode="r"), resolution)
+        except OSError as e:
+            # Read-only map directory, keep it in memory
+            print(f"Could not cache clearance of {map_path}: {str(e)}")
+            return cls.compute(map_img, resolution, max_clearance_m, progress)
+        finally:
+            # Failed or aborted
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def threshold(self, margin):
+        """Stored distance value of a clearance of margin meters, at least one pixel"""
+        return max(margin / self.resolution, 1.0) * CLEARANCE_SCALE
+
+    def clearance(self, x, y):
+        """Clearance in meters of pixel (x, y), 0 outside the free space"""
+        if x < 0 or y < 0:
+            return 0.0
+        x = int(x)
+        y = int(y)
+        if x >= self.width or y >= self.height:
+            return 0.0
+        return float(self.dist[y, x]) / CLEARANCE_SCALE * self.resolution
+
+    def lookup(self, xy):
+        """Stored distance values of (n, 2) pixel coordinates, 0 outside the map"""
+        xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+        x = xy[:, 0].astype(np.intp)
+        y = xy[:, 1].astype(np.intp)
+        # Truncation rounds (-1, 0) to 0, so test the signs on the floats
+        outside = (xy[:, 0] < 0) | (x >= self.width) | (xy[:, 1] < 0) | (y >= self.height)
+        # Flat indices are much faster to gather than (y, x) pairs
+        flat = y * self.width + x
+        flat[outside] = 0
+        values = np.asarray(self.dist).reshape(-1).take(flat)
+        values[outside] = 0
+        return values
+
+    def clearances(self, xy):
+        """Clearances in meters of (n, 2) pixel coordinates"""
+        return self.lookup(xy) / CLEARANCE_SCALE * self.resolution
+
+    def safe_points(self, xy, margin=DEFAULT_SAFETY_MARGIN):
+        """is_safe of (n, 2) pixel coordinates, as a boolean array"""
+        return self.lookup(xy) >= self.threshold(margin)
+
+    def is_safe(self, x, y, margin=DEFAULT_SAFETY_MARGIN):
+        """True if pixel (x, y) is free and at least margin meters from any obstacle"""
+        if x < 0 or y < 0:
+            return False
+        x = int(x)
+        y = int(y)
+        if x >= self.width or y >= self.height:
+            return False
+        return self.dist[y, x] >= self.threshold(margin)
+
+    def safe_mask(self, margin=DEFAULT_SAFETY_MARGIN):
+        """Boolean image of the pixels at least margin meters from any obstacle"""
+        return np.asarray(self.dist) >= self.threshold(margin)
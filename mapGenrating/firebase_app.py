@@ -0,0 +1,25 @@
+import os
+import threading
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Firebase service account key
+CREDENTIAL_PATH = os.path.join(ROOT_DIR, "pathPlannig", "auth.json")
+DATABASE_URL = 'https://oceancleaner-741db-default-rtdb.firebaseio.com/'
+
+_init_lock = threading.Lock()
+
+
+def get_database(credential_path=CREDENTIAL_PATH, database_url=DATABASE_URL):
+    """
+    Return the firebase_admin db module, initializing the default app on
+    first use. firebase_admin is only imported here, so modules using
+    Firebase can be imported (and tested) without it.
+    """
+    import firebase_admin
+    from firebase_admin import credentials, db
+    # Background threads may ask for the database at the same time
+    with _init_lock:
+        if not firebase_admin._apps:
+            cred = credentials.Certificate(credential_path)
+            firebase_admin.initialize_app(cred, {'databaseURL': database_url})
+    return db
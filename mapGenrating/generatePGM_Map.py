@@ -1,6 +1,18 @@
 import cv2
-from pyproj import Proj, Transformer
 import numpy as np
+import os
+import shutil
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mapGenrating.geodesy import UtmGeoreference, to_utm
+from mapGenrating.instrumentation import timed
+from mapGenrating.map_cache import map_cache_key
+from mapGenrating.map_metadata import (metadata_georeference, read_map_metadata,
+                                       write_map_metadata)
+from mapGenrating.pgm_io import create_pgm
+
+# Gazebo simulation copy of the last generated map
+GAZEBO_MAP_PATH = "/home/fedi/asv_ws/src/asv_wave_sim/asv_wave_sim_gazebo/maps/map.pgm"
 
 def get_utm_zone(lon, lat):
     """
@@ -27,71 +39,108 @@ def get_utm_zone(lon, lat):
     
     return zone_number, zone_letter
 
-def generate_map(coordinates, output_path="map.pgm", resolution=0.05):
+def get_polygon_utm_zone(coordinates):
+    """
+    Determine the UTM zone of a polygon from the center of its coordinates
+    """
+    center_lon = sum(point["lng"] for point in coordinates) / len(coordinates)
+    center_lat = sum(point["lat"] for point in coordinates) / len(coordinates)
+    return get_utm_zone(center_lon, center_lat)
+
+def get_border_thickness(resolution, border_width=0.5):
+    """
+    Border thickness in pixels for a border width in meters
+    """
+    return int(border_width / resolution)
+
+def project_polygon(coordinates, resolution=0.05):
+    """
+    Project a polygon to the UTM zone of its center, all points in one call
+    Returns the (n, 2) UTM points and the UtmGeoreference of its map
+    """
+    lngs = np.array([point["lng"] for point in coordinates], dtype=np.float64)
+    lats = np.array([point["lat"] for point in coordinates], dtype=np.float64)
+    zone_number, zone_letter = get_polygon_utm_zone(coordinates)
+    utm_points = to_utm(lngs, lats, zone_number, zone_letter)
+    georef = UtmGeoreference.from_utm_points(utm_points, zone_number, zone_letter, resolution)
+    return utm_points, georef
+
+def generate_map(coordinates, output_path="map.pgm", resolution=0.05, border_width=0.5,
+                 export_gazebo=True, progress=None):
     """
     Generate a PGM map from a list of coordinates
     coordinates: list of dicts with 'lat' and 'lng' keys
     output_path: path to save the generated map
     resolution: map resolution in meters per pixel
+    border_width: width of the occupied border in meters
+    export_gazebo: also copy the map to the Gazebo maps directory
+    progress: optional callback called with the completed fraction (0 to 1)
+        between the generation steps, may raise to abort the generation
     """
-    # Calculate the center point of the coordinates
-    center_lon = sum(point["lng"] for point in coordinates) / len(coordinates)
-    center_lat = sum(point["lat"] for point in coordinates) / len(coordinates)
-    
-    # Get the appropriate UTM zone
-    zone_number, zone_letter = get_utm_zone(center_lon, center_lat)
-    print(f"Using UTM Zone {zone_number}{zone_letter}")
-    
-    # Create UTM projection for the detected zone
-    utm_proj = Proj(proj="utm", zone=zone_number, ellps="WGS84", south=(zone_letter == 'S'))
-    
-    # Convert to UTM (meters)
-    utm_points = [utm_proj(point["lng"], point["lat"]) for point in coordinates]
-    utm_points = np.array(utm_points)
-
-    # Calculate map bounds
-    min_x, min_y = np.min(utm_points, axis=0)
-    max_x, max_y = np.max(utm_points, axis=0)
-    print("Min", min_x, min_y)
-    print("Max", max_x, max_y)
+    # Project to UTM (meters) and get the map bounds
+    with timed("generate_map.projection"):
+        utm_points, georef = project_polygon(coordinates, resolution)
+    print(f"Using UTM Zone {georef.zone_number}{georef.zone_letter}")
+    print("Min", georef.origin_x, georef.origin_y)
+    print("Max", *np.max(utm_points, axis=0))
 
     # Map parameters
-    width_m = max_x - min_x
-    height_m = max_y - min_y
-    width_px = int(width_m / resolution)
-    height_px = int(height_m / resolution)
+    width_px = georef.width_px
+    height_px = georef.height_px
 
-    # Create map layers
-    free_space_layer = np.zeros((height_px, width_px), dtype=np.uint8)  # Interior=255
-    border_layer = np.zeros((height_px, width_px), dtype=np.uint8)      # Border=255 (temporary)
+    # Convert UTM to pixel coordinates (Y-axis flipped)
+    pixel_points = georef.utm_to_pixels(utm_points).reshape(1, -1, 2)
 
-    # Convert UTM to pixel coordinates
-    pixel_points = [(
-        int((x - min_x) / resolution),
-        height_px - int((y - min_y) / resolution)  # Flip Y-axis
-    ) for (x, y) in utm_points]
-    pixel_points = np.array([pixel_points], dtype=np.int32)
+    # Create final map (default=unknown, 205) as a memmap of the output PGM and
+    # rasterize straight into it, the border is drawn last so it overwrites
+    # the interior like before
+    if progress:
+        progress(0.05)
+    with timed("generate_map.create"):
+        grid = create_pgm(output_path, height_px, width_px, fill=205)
+    if progress:
+        progress(0.3)
 
-    # Draw filled polygon (interior, 255=free)
-    cv2.fillPoly(free_space_layer, pixel_points, color=255)
+    with timed("generate_map.rasterize"):
+        # Draw filled polygon (interior, 255=free)
+        cv2.fillPoly(grid, pixel_points, color=255)
+        if progress:
+            progress(0.7)
 
-    # Draw border (temporary 255, thickness=50cm)
-    border_thickness = int(0.5 / resolution)  # 50cm thick border
-    cv2.polylines(border_layer, pixel_points, isClosed=True, 
-                  color=255, thickness=border_thickness)
+        # Draw border (0=occupied, thickness=50cm by default)
+        border_thickness = get_border_thickness(resolution, border_width)
+        cv2.polylines(grid, pixel_points, isClosed=True,
+                      color=0, thickness=border_thickness)
+    if progress:
+        progress(0.8)
 
-    # Create final map (default=unknown, 205)
-    grid = np.full((height_px, width_px), 205, dtype=np.uint8)
-    grid[free_space_layer == 255] = 255  # Interior=free (255)
-    grid[border_layer == 255] = 0        # Border=occupied (0)
-
-    # Save PGM
-    cv2.imwrite(output_path, grid)
-    # Also save to the Gazebo maps directory
-    gazebo_map_path = "/home/fedi/asv_ws/src/asv_wave_sim/asv_wave_sim_gazebo/maps/map.pgm"
-    cv2.imwrite(gazebo_map_path, grid)
+    with timed("generate_map.write"):
+        # Save PGM
+        grid.flush()
+        del grid
+        # Save the georeference next to it, as a ROS map YAML
+        polygon_hash = map_cache_key(coordinates, resolution, border_thickness,
+                                     (georef.zone_number, georef.zone_letter))
+        write_map_metadata(output_path, georef, polygon_hash)
+        if progress:
+            progress(0.95)
+        # Also save to the Gazebo maps directory
+        if export_gazebo:
+            export_gazebo_map(output_path)
+    if progress:
+        progress(1.0)
     return output_path
 
+def export_gazebo_map(map_path, gazebo_map_path=GAZEBO_MAP_PATH):
+    """Copy a generated map and its metadata to the Gazebo maps directory when it exists"""
+    if os.path.isdir(os.path.dirname(gazebo_map_path)):
+        shutil.copyfile(map_path, gazebo_map_path)
+        metadata = read_map_metadata(map_path)
+        if metadata is not None:
+            # Rewritten rather than copied, the image name changes
+            write_map_metadata(gazebo_map_path, metadata_georeference(metadata),
+                               metadata.get("polygon_hash"))
+
 if __name__ == "__main__":
     # Example usage
     from map_data import MAPS_DATA
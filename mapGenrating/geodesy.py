@@ -0,0 +1,80 @@
+from functools import lru_cache
+
+import numpy as np
+from pyproj import Transformer
+
+
+def utm_epsg(zone_number, zone_letter):
+    """EPSG code of a WGS84 UTM zone ('N' or 'S' hemisphere)"""
+    return (32700 if zone_letter == 'S' else 32600) + int(zone_number)
+
+@lru_cache(maxsize=32)
+def get_transformer(zone_number, zone_letter, inverse=False):
+    """
+    Cached WGS84 <-> UTM transformer, creating one costs far more than
+    projecting a few thousand points with it
+    inverse: UTM to WGS84 instead of WGS84 to UTM
+    """
+    wgs84 = "EPSG:4326"
+    utm = f"EPSG:{utm_epsg(zone_number, zone_letter)}"
+    if inverse:
+        return Transformer.from_crs(utm, wgs84, always_xy=True)
+    return Transformer.from_crs(wgs84, utm, always_xy=True)
+
+def to_utm(lngs, lats, zone_number, zone_letter):
+    """Project arrays of longitudes and latitudes, returns an (n, 2) array of UTM x, y"""
+    x, y = get_transformer(zone_number, zone_letter).transform(
+        np.asarray(lngs, dtype=np.float64), np.asarray(lats, dtype=np.float64))
+    return np.column_stack((np.atleast_1d(x), np.atleast_1d(y)))
+
+def to_wgs84(xs, ys, zone_number, zone_letter):
+    """Back-project arrays of UTM x, y, returns an (n, 2) array of longitudes, latitudes"""
+    lngs, lats = get_transformer(zone_number, zone_letter, inverse=True).transform(
+        np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64))
+    return np.column_stack((np.atleast_1d(lngs), np.atleast_1d(lats)))
+
+class UtmGeoreference:
+    """
+    Position of a generated map on the earth: its UTM zone, the UTM
+    coordinates of its bottom-left corner and its size in pixels.
+    Pixel rows grow downwards, UTM y upwards.
+    """
+
+    def __init__(self, zone_number, zone_letter, origin_x, origin_y, resolution, width_px, height_px):
+        self.zone_number = zone_number
+        self.zone_letter = zone_letter
+        self.origin_x = float(origin_x)
+        self.origin_y = float(origin_y)
+        self.resolution = resolution
+        self.width_px = width_px
+        self.height_px = height_px
+
+    @classmethod
+    def from_utm_points(cls, utm_points, zone_number, zone_letter, resolution):
+        """Georeference of the map spanning the bounding box of (n, 2) UTM points"""
+        min_x, min_y = np.min(utm_points, axis=0)
+        max_x, max_y = np.max(utm_points, axis=0)
+        width_px = int((max_x - min_x) / resolution)
+        height_px = int((max_y - min_y) / resolution)
+        return cls(zone_number, zone_letter, min_x, min_y, resolution, width_px, height_px)
+
+    def utm_to_pixels(self, utm_points):
+        """(n, 2) int32 pixel coordinates of UTM points, truncated like the map rasterization"""
+        utm_points = np.asarray(utm_points, dtype=np.float64).reshape(-1, 2)
+        pixels = np.empty(utm_points.shape, dtype=np.int32)
+        pixels[:, 0] = ((utm_points[:, 0] - self.origin_x) / self.resolution).astype(np.int32)
+        pixels[:, 1] = self.height_px - ((utm_points[:, 1] - self.origin_y) / self.resolution).astype(np.int32)
+        return pixels
+
+    def pixels_to_utm(self, xy):
+        """(n, 2) UTM x, y of (n, 2) pixel coordinates"""
+        xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+        utm = np.empty_like(xy)
+        utm[:, 0] = self.origin_x + xy[:, 0] * self.resolution
+        utm[:, 1] = self.origin_y + (self.height_px - xy[:, 1]) * self.resolution
+        return utm
+
+    def pixels_to_wgs84(self, xy):
+        """(n, 2) longitudes, latitudes of (n, 2) pixel coordinates"""
+        utm = self.pixels_to_utm(xy)
+        return to_wgs84(utm[:, 0], utm[:, 1], self.zone_number, self.zone_letter)
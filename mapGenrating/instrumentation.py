@@ -0,0 +1,198 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+# Set to 1 to collect timings and counters from the start
+METRICS_ENV = "PLANNER_METRICS"
+# Set to a directory to also profile the captured stages (cProfile and
+# tracemalloc), the .prof files are written there
+PROFILE_ENV = "PLANNER_PROFILE"
+# Functions listed in the summary of every profiled stage
+PROFILE_TOP_FUNCTIONS = 15
+
+
+class _NullTimer:
+    """Context manager doing nothing, handed out while metrics are disabled"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class _Timer:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.add_time(self.name, time.perf_counter() - self.start)
+        return False
+
+class _Capture:
+    """Times a stage and, when nothing else is being captured, profiles it"""
+    __slots__ = ("metrics", "name", "timer", "profiler", "tracing")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+        self.timer = _Timer(metrics, name)
+        self.profiler = None
+        self.tracing = False
+
+    def __enter__(self):
+        # One capture at a time: tracemalloc is process wide and nested
+        # profilers would replace each other
+        if self.metrics.capture_lock.acquire(blocking=False):
+            self.profiler = cProfile.Profile()
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.tracing = True
+            tracemalloc.reset_peak()
+            self.profiler.enable()
+        self.timer.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.__exit__(*exc)
+        if self.profiler is not None:
+            self.profiler.disable()
+            _, peak = tracemalloc.get_traced_memory()
+            if self.tracing:
+                tracemalloc.stop()
+            self.metrics.capture_lock.release()
+            self.metrics.add_profile(self.name, self.profiler, peak)
+        return False
+
+class Metrics:
+    """
+    Thread safe wall time and call statistics of named stages, event
+    counters and optional profiles of whole stages. Disabled metrics hand
+    out a shared no-op timer, so instrumented code costs a flag check.
+    """
+
+    def __init__(self, enabled=False, profile_dir=None):
+        self.enabled = enabled
+        self.profile_dir = profile_dir  # Profiling is on when set
+        self.lock = threading.Lock()
+        self.capture_lock = threading.Lock()
+        self.timings = {}  # name -> [calls, total seconds, max seconds, last seconds]
+        self.counters = {}  # name -> count
+        self.profiles = []  # Summaries of the profiled stages, oldest first
+
+    def timed(self, name):
+        """Context manager adding the time spent in its block to name"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def capture(self, name):
+        """Like timed, and also profiles the block when profiling is on"""
+        if not self.enabled:
+            return _NULL_TIMER
+        if self.profile_dir is None:
+            return _Timer(self, name)
+        return _Capture(self, name)
+
+    def count(self, name, amount=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_time(self, name, seconds):
+        with self.lock:
+            timing = self.timings.get(name)
+            if timing is None:
+                self.timings[name] = [1, seconds, seconds, seconds]
+            else:
+                timing[0] += 1
+                timing[1] += seconds
+                timing[2] = max(timing[2], seconds)
+                timing[3] = seconds
+
+    def add_profile(self, name, profiler, peak_bytes):
+        """Write the stats of a profiled stage and keep a summary of its hottest functions"""
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        path = None
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            path = os.path.join(self.profile_dir, f"{name}-{stamp}.prof")
+            profiler.dump_stats(path)
+        except OSError as e:
+            print(f"Could not write the profile of {name}: {e}")
+            path = None
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+        with self.lock:
+            self.profiles.append({
+                "name": name,
+                "time": stamp,
+                "path": path,
+                "peak_mb": round(peak_bytes / 2 ** 20, 3),
+                "top": text.getvalue(),
+            })
+
+    def snapshot(self):
+        """Copy of the metrics as a JSON friendly dict"""
+        with self.lock:
+            return {
+                "enabled": self.enabled,
+                "profiling": self.profile_dir is not None,
+                "timings": {
+                    name: {"calls": calls, "total_s": round(total, 6), "mean_s": round(total / calls, 6),
+                           "max_s": round(longest, 6), "last_s": round(last, 6)}
+                    for name, (calls, total, longest, last) in sorted(self.timings.items())
+                },
+                "counters": dict(sorted(self.counters.items())),
+                "profiles": list(self.profiles),
+            }
+
+    def reset(self):
+        with self.lock:
+            self.timings.clear()
+            self.counters.clear()
+            self.profiles.clear()
+
+    def dump(self, path):
+        """Write the snapshot to a JSON file"""
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        return path
+
+def _from_environment():
+    profile_dir = os.environ.get(PROFILE_ENV) or None
+    enabled = os.environ.get(METRICS_ENV, "") not in ("", "0") or profile_dir is not None
+    return Metrics(enabled, profile_dir)
+
+# Process wide metrics, used through the functions below
+metrics = _from_environment()
+
+def timed(name):
+    return metrics.timed(name)
+
+def capture(name):
+    return metrics.capture(name)
+
+def count(name, amount=1):
+    metrics.count(name, amount)
+
+def set_enabled(enabled, profile_dir=None):
+    """Turn the metrics on or off, profiling too when profile_dir is given"""
+    metrics.enabled = enabled
+    metrics.profile_dir = profile_dir if enabled else None
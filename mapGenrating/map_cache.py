@@ -0,0 +1,141 @@
+import contextlib
+import glob
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from mapGenrating.map_metadata import map_is_current
+
+# Default size bound of the cache directory
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+
+def map_cache_key(coordinates, resolution, border_thickness, utm_zone):
+    """
+    Content hash identifying a generated map
+    coordinates: list of dicts with 'lat' and 'lng' keys
+    border_thickness: border thickness in pixels
+    utm_zone: (zone_number, zone_letter)
+    """
+    payload = json.dumps({
+        "coordinates": [[point["lat"], point["lng"]] for point in coordinates],
+        "resolution": resolution,
+        "border_thickness": border_thickness,
+        "utm_zone": f"{utm_zone[0]}{utm_zone[1]}",
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class MapCache:
+    """
+    Size-bounded LRU cache of generated PGM maps, stored as <key>.pgm in
+    cache_dir. Any other file named <key>.* is treated as belonging to the
+    same entry and evicted with it. Files of keys missing from the index,
+    left by a generation that did not finish, are removed on startup.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, "index.json")
+        os.makedirs(cache_dir, exist_ok=True)
+        # key -> {"name": ..., "size": ...}, least recently used first
+        self.entries = OrderedDict()
+        self.load_index()
+        self.lock = threading.Lock()
+        self.key_locks = {}
+        self.sweep()
+
+    def load_index(self):
+        try:
+            with open(self.index_path) as f:
+                entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            entries = []
+        for entry in entries:
+            if os.path.exists(self.path_for(entry["key"])):
+                self.entries[entry["key"]] = {"name": entry.get("name"), "size": entry.get("size", 0)}
+
+    def save_index(self):
+        entries = [dict(key=key, **entry) for key, entry in self.entries.items()]
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entries, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def sweep(self):
+        """Remove the files of keys that are not in the index"""
+        for path in glob.glob(os.path.join(self.cache_dir, "*.*")):
+            name = os.path.basename(path)
+            if not name.startswith("index.") and name.split(".", 1)[0] not in self.entries:
+                os.remove(path)
+
+    def discard(self, key):
+        """Remove the files written for a key that is not in the index"""
+        for path in glob.glob(os.path.join(self.cache_dir, f"{key}.*")):
+            os.remove(path)
+
+    @contextlib.contextmanager
+    def writing(self, key):
+        """
+        Context for generating the files of key at path_for(key), from any
+        thread: generations of the same key wait for each other, and the
+        files of one that raises (or is cancelled) are removed
+        """
+        with self.lock:
+            key_lock = self.key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            try:
+                yield self.path_for(key)
+            except BaseException:
+                self.discard(key)
+                raise
+
+    def path_for(self, key):
+        """Path the PGM for key is (or will be) stored at"""
+        return os.path.join(self.cache_dir, f"{key}.pgm")
+
+    def entry_size(self, key):
+        return sum(os.path.getsize(path) for path in glob.glob(os.path.join(self.cache_dir, f"{key}.*")))
+
+    def total_size(self):
+        return sum(entry["size"] for entry in self.entries.values())
+
+    def get(self, key):
+        """Return the cached map path for key and mark it recently used, or None"""
+        if key not in self.entries:
+            return None
+        path = self.path_for(key)
+        # The sidecar of the map records the key it was generated for
+        if not map_is_current(path, key):
+            del self.entries[key]
+            self.save_index()
+            return None
+        self.entries.move_to_end(key)
+        self.save_index()
+        return path
+
+    def put(self, key, name=None):
+        """Register the map written at path_for(key) and evict old entries"""
+        self.entries[key] = {"name": name, "size": self.entry_size(key)}
+        self.entries.move_to_end(key)
+        self.evict()
+        self.save_index()
+        return self.path_for(key)
+
+    def refresh(self, key):
+        """Update the recorded size of key after files were added next to its PGM"""
+        if key in self.entries:
+            self.entries[key]["size"] = self.entry_size(key)
+            self.evict()
+            self.save_index()
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        # The most recently used entry is never evicted, even if it alone is too big
+        while len(self.entries) > 1 and self.total_size() > self.max_bytes:
+            key, _ = self.entries.popitem(last=False)
+            # Unlinking keeps any open memmap of the file valid
+            for path in glob.glob(os.path.join(self.cache_dir, f"{key}.*")):
+                os.remove(path)
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import threading
+
+from mapGenrating.firebase_app import CREDENTIAL_PATH, DATABASE_URL, get_database
+
+# Database location of the map catalog
+FIREBASE_MAPS_PATH = 'navigation/Maps'
+
+
+def format_map(map_id, map_obj):
+    """
+    Format one raw catalog entry to match the MAPS_DATA structure
+    Returns (name, coordinates)
+    """
+    name = map_obj.get("name", f"Map_{map_id}")
+    coords = []
+    for coord in map_obj.get("coordinates", []):
+        if isinstance(coord, dict):
+            coords.append({
+                "lat": coord.get("lat"),
+                "lng": coord.get("long") if "long" in coord else coord.get("lng")
+            })
+        # Skip non-dict coordinate entries
+    return name, coords
+
+def entry_etag(map_obj):
+    """Content hash of a raw catalog entry, used as ETag by local backends"""
+    return hashlib.sha256(json.dumps(map_obj, sort_keys=True).encode("utf-8")).hexdigest()
+
+class FirebaseMapBackend:
+    """
+    Map catalog stored in the Firebase realtime database. firebase_admin is
+    only imported and initialized on the first request.
+    """
+
+    def __init__(self, credential_path=CREDENTIAL_PATH, database_url=DATABASE_URL, maps_path=FIREBASE_MAPS_PATH):
+        self.credential_path = credential_path
+        self.database_url = database_url
+        self.maps_path = maps_path
+
+    def reference(self):
+        db = get_database(self.credential_path, self.database_url)
+        return db.reference(self.maps_path)
+
+    def list_ids(self):
+        """Ids of the maps in the catalog, without downloading their content"""
+        return list((self.reference().get(shallow=True) or {}).keys())
+
+    def fetch(self, map_id, etag=None):
+        """
+        Download one map unless it still matches etag
+        Returns (changed, map_obj, etag)
+        """
+        ref = self.reference().child(map_id)
+        if etag is None:
+            map_obj, etag = ref.get(etag=True)
+            return True, map_obj, etag
+        return ref.get_if_changed(etag)
+
+class JsonMapBackend:
+    """
+    Local stand-in for FirebaseMapBackend reading a JSON file with the same
+    layout as the database ({map_id: {"name": ..., "coordinates": [...]}})
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        with open(self.path) as f:
+            return json.load(f) or {}
+
+    def list_ids(self):
+        return list(self.load().keys())
+
+    def fetch(self, map_id, etag=None):
+        map_obj = self.load().get(map_id)
+        new_etag = entry_etag(map_obj)
+        if etag == new_etag:
+            return False, None, etag
+        return True, map_obj, new_etag
+
+class MapCatalog:
+    """
+    Map catalog served from a local snapshot file, so it is available at once,
+    and synchronized with a remote backend on demand.
+
+    The snapshot keeps the ETag of every entry; a refresh lists the remote ids
+    and only downloads entries that were added or changed since.
+    """
+
+    def __init__(self, snapshot_path, backend=None, defaults=None):
+        self.snapshot_path = snapshot_path
+        self.backend = backend
+        self.defaults = dict(defaults or {})
+        self.entries = {}  # map_id -> {"name": ..., "coordinates": [...], "etag": ...}
+        self.listeners = []
+        self.lock = threading.Lock()
+        self.refresh_thread = None
+        self.load_snapshot()
+
+    def load_snapshot(self):
+        try:
+            with open(self.snapshot_path) as f:
+                entries = json.load(f).get("maps", {})
+        except (FileNotFoundError, json.JSONDecodeError, AttributeError):
+            entries = {}
+        with self.lock:
+            self.entries = entries
+
+    def save_snapshot(self):
+        with self.lock:
+            payload = {"maps": dict(self.entries)}
+        os.makedirs(os.path.dirname(os.path.abspath(self.snapshot_path)), exist_ok=True)
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(payload, f, indent=2)
+        os.replace(tmp_path, self.snapshot_path)
+
+    def maps(self):
+        """{name: coordinates} of the default maps updated with the catalog"""
+        maps = dict(self.defaults)
+        with self.lock:
+            for entry in self.entries.values():
+                maps[entry["name"]] = entry["coordinates"]
+        return maps
+
+    def names(self):
+        return list(self.maps().keys())
+
+    def coordinates(self, map_name):
+        return self.maps().get(map_name, [])
+
+    def add_listener(self, callback):
+        """Call callback(catalog) after every refresh that changed the catalog"""
+        self.listeners.append(callback)
+
+    def refresh(self):
+        """
+        Synchronize the snapshot with the backend
+        Returns True if the catalog changed
+        """
+        if self.backend is None:
+            return False
+        remote_ids = self.backend.list_ids()
+        with self.lock:
+            known = dict(self.entries)
+        updated = {}
+        for map_id in remote_ids:
+            etag = known.get(map_id, {}).get("etag")
+            changed, map_obj, etag = self.backend.fetch(map_id, etag)
+            if changed and map_obj:
+                name, coords = format_map(map_id, map_obj)
+                updated[map_id] = {"name": name, "coordinates": coords, "etag": etag}
+        removed = set(known) - set(remote_ids)
+        if not updated and not removed:
+            return False
+
+        with self.lock:
+            for map_id in removed:
+                self.entries.pop(map_id, None)
+            self.entries.update(updated)
+        self.save_snapshot()
+        for callback in self.listeners:
+            callback(self)
+        return True
+
+    def refresh_async(self):
+        """Run refresh in a background thread, errors are only reported"""
+        if self.refresh_thread is not None and self.refresh_thread.is_alive():
+            return self.refresh_thread
+
+        def run():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error refreshing map catalog: {str(e)}")
+
+        self.refresh_thread = threading.Thread(target=run, name="map-catalog-refresh", daemon=True)
+        self.refresh_thread.start()
+        return self.refresh_thread
@@ -1,16 +1,18 @@
-import firebase_admin
-from firebase_admin import credentials, db
+import os
+import sys
 
-# Firebase configuration (commented out - to be implemented manually)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mapGenrating.firebase_app import CREDENTIAL_PATH, ROOT_DIR
+from mapGenrating.map_catalog import FirebaseMapBackend, JsonMapBackend, MapCatalog, format_map
 
-cred = credentials.Certificate("/home/fedi/Desktop/navigation2/navigation_system/pathPlannig/auth.json")
-firebase_admin.initialize_app(cred, {
-    'databaseURL': 'https://oceancleaner-741db-default-rtdb.firebaseio.com/'
-})
+# Local copy of the catalog, loaded at startup before any network access
+CATALOG_SNAPSHOT_PATH = os.path.join(ROOT_DIR, "maps", "catalog.json")
+# Set to a JSON file with the database layout to use it instead of Firebase
+CATALOG_JSON_ENV = "MAP_CATALOG_JSON"
 
 def get_maps_from_firebase():
-    ref = db.reference('navigation/Maps')
-    return ref.get()
+    return FirebaseMapBackend(CREDENTIAL_PATH).reference().get()
+
 def fetch_and_format_maps_from_firebase():
     """
     Fetch maps from Firebase and format them to match MAPS_DATA structure:
@@ -21,17 +23,7 @@ def fetch_and_format_maps_from_firebase():
         return formatted_maps
 
     for map_id, map_obj in raw_maps.items():
-        name = map_obj.get("name", f"Map_{map_id}")
-        coords = []
-        for coord in map_obj.get("coordinates", []):
-            if isinstance(coord, dict):
-                coords.append({
-                    "lat": coord.get("lat"),
-                    "lng": coord.get("long") if "long" in coord else coord.get("lng")
-                })
-            else:
-                # Skip or handle non-dict coordinate entries
-                continue
+        name, coords = format_map(map_id, map_obj)
         formatted_maps[name] = coords
     return formatted_maps
 
@@ -90,15 +82,33 @@ MAPS_DATA = {
         }
     ]
 }
-# Update MAPS_DATA with maps from Firebase if available
-MAPS_DATA.update(fetch_and_format_maps_from_firebase())
-# Uncomment the line below to fetch maps from Firebase only
-# MAPS_DATA = fetch_and_format_maps_from_firebase()
+# Shared catalog, created on first use
+_catalog = None
+
+def default_backend():
+    """Firebase backend, or the local JSON stand-in if MAP_CATALOG_JSON is set"""
+    json_path = os.environ.get(CATALOG_JSON_ENV)
+    if json_path:
+        return JsonMapBackend(json_path)
+    return FirebaseMapBackend(CREDENTIAL_PATH)
+
+def get_catalog(backend=None):
+    """
+    Shared map catalog: MAPS_DATA updated with the maps of the local snapshot.
+    Call refresh_async() on it to sync with the backend in the background.
+    backend: replaces the catalog backend when given
+    """
+    global _catalog
+    if _catalog is None:
+        _catalog = MapCatalog(CATALOG_SNAPSHOT_PATH, default_backend(), defaults=MAPS_DATA)
+    if backend is not None:
+        _catalog.backend = backend
+    return _catalog
+
 def get_available_maps():
     """Get list of available map names"""
-    return list(MAPS_DATA.keys())
+    return get_catalog().names()
 
 def get_map_coordinates(map_name):
     """Get coordinates for a specific map"""
-    return MAPS_DATA.get(map_name, [])
-
+    return get_catalog().coordinates(map_name)
@@ -0,0 +1,88 @@
+import os
+
+from mapGenrating.geodesy import UtmGeoreference
+
+# map_server thresholds matching the PGM values (0 occupied, 205 unknown, 255 free)
+OCCUPIED_THRESH = 0.65
+FREE_THRESH = 0.196
+
+
+def metadata_path(map_path):
+    """Path of the YAML sidecar of a map: same name with a .yaml extension"""
+    return os.path.splitext(map_path)[0] + ".yaml"
+
+def write_map_metadata(map_path, georef, polygon_hash=None):
+    """
+    Write the ROS map_server YAML of a map, with its georeference
+    georef: UtmGeoreference of the map
+    polygon_hash: map_cache_key of the polygon the map was generated from
+    """
+    lines = [
+        "# Map metadata (ROS map_server format)",
+        f"image: {os.path.basename(map_path)}",
+        f"resolution: {georef.resolution}",
+        # Map frame origin at the bottom-left corner, like the waypoint meters
+        "origin: [0.0, 0.0, 0.0]",
+        "negate: 0",
+        f"occupied_thresh: {OCCUPIED_THRESH}",
+        f"free_thresh: {FREE_THRESH}",
+        "# Georeference: UTM coordinates of the bottom-left corner",
+        f"utm_zone: {georef.zone_number}{georef.zone_letter}",
+        f"utm_origin: [{georef.origin_x!r}, {georef.origin_y!r}]",
+        f"width: {georef.width_px}",
+        f"height: {georef.height_px}",
+    ]
+    if polygon_hash:
+        lines.append(f'polygon_hash: "{polygon_hash}"')
+    path = metadata_path(map_path)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
+    return path
+
+def parse_value(text):
+    """Scalar or flow list value of the YAML subset written by write_map_metadata"""
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] == '"':
+        return text[1:-1]
+    if text.startswith("[") and text.endswith("]"):
+        return [parse_value(item) for item in text[1:-1].split(",") if item.strip()]
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text
+
+def read_map_metadata(map_path):
+    """Metadata of a map as a dict, or None when it has no sidecar"""
+    try:
+        with open(metadata_path(map_path)) as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return None
+    metadata = {}
+    for line in lines:
+        line = line.split("#", 1)[0]
+        if ":" not in line:
+            continue
+        key, value = line.split(":", 1)
+        metadata[key.strip()] = parse_value(value)
+    return metadata
+
+def metadata_georeference(metadata):
+    """UtmGeoreference described by map metadata, None if it is not georeferenced"""
+    if not metadata or "utm_zone" not in metadata or "utm_origin" not in metadata:
+        return None
+    zone = str(metadata["utm_zone"])
+    origin_x, origin_y = metadata["utm_origin"]
+    return UtmGeoreference(int(zone[:-1]), zone[-1], origin_x, origin_y,
+                           metadata["resolution"], metadata.get("width"), metadata.get("height"))
+
+def map_is_current(map_path, polygon_hash):
+    """True if the map exists and its sidecar says it was generated for polygon_hash"""
+    if not os.path.exists(map_path):
+        return False
+    metadata = read_map_metadata(map_path)
+    return metadata is not None and metadata.get("polygon_hash") == polygon_hash
@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+
+# Rows written per block when filling a new map, keeps the dirty pages small
+FILL_BLOCK_ROWS = 1024
+
+
+def pgm_header(width, height, maxval=255):
+    """Binary (P5) PGM header, same layout as cv2.imwrite produces"""
+    return f"P5\n{width} {height}\n{maxval}\n".encode("ascii")
+
+def read_pgm_header(path):
+    """
+    Parse the header of a binary PGM file
+    Returns (width, height, maxval, data_offset)
+    """
+    with open(path, "rb") as f:
+        head = f.read(1024)
+    if head[:2] != b"P5":
+        raise ValueError(f"Not a binary PGM (P5) file: {path}")
+
+    fields = []
+    pos = 2
+    while len(fields) < 3:
+        # Skip whitespace and comments between header fields
+        while pos < len(head) and (head[pos:pos + 1].isspace() or head[pos:pos + 1] == b"#"):
+            if head[pos:pos + 1] == b"#":
+                while pos < len(head) and head[pos:pos + 1] not in (b"\n", b"\r"):
+                    pos += 1
+            else:
+                pos += 1
+        end = pos
+        while end < len(head) and head[end:end + 1].isdigit():
+            end += 1
+        if end == pos:
+            raise ValueError(f"Malformed PGM header: {path}")
+        fields.append(int(head[pos:end]))
+        pos = end
+    # Exactly one whitespace character separates the header from the data
+    width, height, maxval = fields
+    return width, height, maxval, pos + 1
+
+def create_pgm(path, height, width, fill=None):
+    """
+    Create a P5 PGM file of the given size and return a writable memmap of its
+    pixels. Rows written to the returned array go straight to the file.
+    fill: optional value the pixels are initialized to, written block by block
+    """
+    if height <= 0 or width <= 0:
+        raise ValueError(f"Invalid map size {width}x{height}")
+    header = pgm_header(width, height)
+    # Unlink instead of truncating so memmaps of a previous version of the
+    # map stay valid (they keep the old inode) instead of faulting
+    if os.path.exists(path):
+        os.remove(path)
+    with open(path, "wb") as f:
+        f.write(header)
+        f.truncate(len(header) + height * width)
+    grid = np.memmap(path, dtype=np.uint8, mode="r+", offset=len(header),
+                     shape=(height, width))
+    if fill is not None:
+        for row0 in range(0, height, FILL_BLOCK_ROWS):
+            grid[row0:row0 + FILL_BLOCK_ROWS] = fill
+    return grid
+
+def load_pgm(path, mode="r"):
+    """
+    Map an 8-bit binary PGM file into memory without reading it
+    mode: numpy.memmap mode, "r" for a shared read-only view, "c" for
+          copy-on-write or "r+" to modify the file in place
+    """
+    width, height, maxval, offset = read_pgm_header(path)
+    if maxval > 255:
+        raise ValueError(f"Only 8-bit PGM files are supported: {path}")
+    return np.memmap(path, dtype=np.uint8, mode=mode, offset=offset,
+                     shape=(height, width))
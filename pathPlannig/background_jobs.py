@@ -0,0 +1,82 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+class JobCancelled(Exception):
+    """Raised inside a job by its progress callback once the job was cancelled"""
+
+class JobSignals(QObject):
+    # Created in the GUI thread, so the slots run there even though the
+    # signals are emitted from the worker thread
+    progress = pyqtSignal(int)  # percent done
+    finished = pyqtSignal(object)  # return value of the job function
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+class Job:
+    """
+    Runs fn(*args, progress=callback, **kwargs) on a JobPool thread.
+
+    fn reports its completed fraction through the callback, which also
+    raises JobCancelled after cancel() so the job stops at the next report.
+    Exactly one of finished, failed or cancelled is emitted at the end.
+    """
+
+    def __init__(self, fn, *args, **kwargs):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = JobSignals()
+        self.cancel_event = threading.Event()
+        self.last_percent = -1
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def is_cancelled(self):
+        return self.cancel_event.is_set()
+
+    def report(self, fraction):
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+        percent = int(min(max(fraction, 0.0), 1.0) * 100)
+        # Only emit when the shown value changes, planners report very often
+        if percent != self.last_percent:
+            self.last_percent = percent
+            self.signals.progress.emit(percent)
+
+    def run(self):
+        try:
+            if self.cancel_event.is_set():
+                raise JobCancelled()
+            result = self.fn(*self.args, progress=self.report, **self.kwargs)
+        except JobCancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        else:
+            if self.cancel_event.is_set():
+                self.signals.cancelled.emit()
+            else:
+                self.signals.finished.emit(result)
+
+class JobPool:
+    """
+    Worker threads for Jobs. These are Python threads rather than a
+    QThreadPool: pyproj keeps per-thread state that breaks when a thread
+    not started by Python runs a second job.
+    """
+
+    def __init__(self, max_workers=2):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+
+    def start(self, job):
+        # The executor keeps the job alive until it has run, even if its
+        # owner dropped it after cancelling
+        self.executor.submit(job.run)
+        return job
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Headless batch map generation and coverage planning.
+
+Generates the PGM map of every requested area and plans its coverage path
+in a pool of worker processes, then writes the waypoints next to the map.
+Imports neither PyQt5 nor firebase_admin, so it can run on a build server:
+
+    python3 pathPlannig/batch_plan.py lake.json other_lake.json -o plans/
+    python3 pathPlannig/batch_plan.py --maps "Paris Area 1" -o plans/
+
+A polygon file holds either a list of {"lat": ..., "lng": ...} points (the
+area is named after the file) or a {name: [points]} catalog like MAPS_DATA.
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mapGenrating.clearance import DEFAULT_SAFETY_MARGIN, ClearanceMap
+from mapGenrating.generatePGM_Map import generate_map, get_border_thickness, get_polygon_utm_zone
+from mapGenrating.instrumentation import METRICS_ENV, metrics, set_enabled, timed
+from mapGenrating.map_cache import map_cache_key
+from mapGenrating.map_metadata import map_is_current, metadata_georeference, read_map_metadata
+from mapGenrating.pgm_io import load_pgm
+from pathPlannig.coverage_eval import DEFAULT_SWATH_WIDTH, evaluate_coverage, evaluate_paths_coverage
+from pathPlannig.coverage_planner import default_start, plan_path, repair_path
+from pathPlannig.fleet_planner import plan_fleet
+from pathPlannig.path_postprocess import DEFAULT_TOLERANCE_M
+from pathPlannig.path_validation import blocked_segments
+from pathPlannig.waypoint_store import WaypointStore
+
+# Command line names of the planners in coverage_planner.PLANNER_MODES
+CLI_PLANNERS = {
+    "lawnmower": "Lawnmower",
+    "boustrophedon": "Boustrophedon Cells",
+    "sweep-angle": "Optimized Sweep Angle",
+}
+
+
+def safe_name(name):
+    """File name friendly version of a map name"""
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("_") or "map"
+
+def load_polygons(path):
+    """Read a polygon file, returns a {name: coordinates} dict"""
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        return data
+    return {os.path.splitext(os.path.basename(path))[0]: data}
+
+def plan_area(name, coordinates, output_dir, resolution=0.05, planner="Lawnmower", start=None,
+              wgs84=False, safety_margin=DEFAULT_SAFETY_MARGIN, swath_width=DEFAULT_SWATH_WIDTH,
+              tolerance_m=DEFAULT_TOLERANCE_M, turn_radius_m=0.0, vessels=1, angle_workers=None):
+    """
+    Generate the map of one area and plan its coverage path.
+    wgs84: also write the lat/lng of every waypoint
+    safety_margin: meters kept from borders and land
+    swath_width: meters cleaned along every leg, for the coverage summary
+    tolerance_m: largest distance in meters of a dropped waypoint to the path
+    turn_radius_m: turning radius of the boat in meters, 0 keeps sharp corners
+    vessels: split the area between this many vessels, one waypoint file each
+    angle_workers: processes evaluating the sweep angles, see evaluate_angles
+    Returns a summary dict with the written map and waypoint file paths,
+    and the timings and counters of the area when metrics are enabled.
+    """
+    started = time.perf_counter()
+    # Worker processes are reused, only report this area
+    metrics.reset()
+    base = os.path.join(output_dir, safe_name(name))
+    map_path = f"{base}.pgm"
+    # Maps already generated for this polygon are reused
+    polygon_hash = map_cache_key(coordinates, resolution, get_border_thickness(resolution),
+                                 get_polygon_utm_zone(coordinates))
+    reused = map_is_current(map_path, polygon_hash)
+    if not reused:
+        # generate_map reports progress on stdout, keep stdout for the summaries
+        with contextlib.redirect_stdout(sys.stderr):
+            generate_map(coordinates, output_path=map_path,
+                         resolution=resolution, export_gazebo=False)
+    with timed("load_map"):
+        map_img = load_pgm(map_path)
+        clearance = ClearanceMap.load_or_compute(map_path, map_img, resolution)
+    height, width = map_img.shape
+
+    if vessels > 1:
+        return plan_vessels(name, map_path, map_img, clearance, base, vessels, resolution, planner,
+                            wgs84, safety_margin, swath_width, tolerance_m, turn_radius_m,
+                            reused, started)
+    if start is None:
+        start = default_start(clearance, safety_margin)
+    waypoints = WaypointStore()
+    if start is not None:
+        with contextlib.redirect_stdout(sys.stderr):
+            points = plan_path(map_img, *start, planner=planner, clearance=clearance,
+                               safety_margin=safety_margin, tolerance_m=tolerance_m,
+                               turn_radius_m=turn_radius_m, workers=angle_workers)
+        waypoints.extend(repair_path(clearance, points, safety_margin))
+
+    waypoints_path = f"{base}_waypoints.yaml"
+    with timed("export_waypoints"), open(waypoints_path, "w") as f:
+        georef = metadata_georeference(read_map_metadata(map_path)) if wgs84 else None
+        f.write(waypoints.to_yaml(resolution, height, georef=georef))
+    summary = {
+        "map_name": name,
+        "map_path": map_path,
+        "map_reused": reused,
+        "waypoints_path": waypoints_path,
+        "waypoints": len(waypoints),
+        # Legs between waypoints that cross land, should be 0
+        "blocked_legs": len(blocked_segments(clearance, waypoints.xy)),
+        "coverage": evaluate_coverage(map_img, waypoints.xy, swath_width, resolution).summary(),
+        "width": width,
+        "height": height,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    add_metrics(summary)
+    return summary
+
+def plan_vessels(name, map_path, map_img, clearance, base, vessels, resolution, planner, wgs84,
+                 safety_margin, swath_width, tolerance_m, turn_radius_m, reused, started):
+    """
+    Split the area of plan_area between vessels and write one waypoint
+    file per vessel, <base>_vessel<n>_waypoints.yaml
+    Returns the summary of the area with a "vessels" list.
+    """
+    height, width = map_img.shape
+    # Areas already run in parallel, the regions of one area are planned in turn
+    with contextlib.redirect_stdout(sys.stderr):
+        results = plan_fleet(map_path, vessels, planner, resolution, safety_margin,
+                             tolerance_m=tolerance_m, turn_radius_m=turn_radius_m, workers=1)
+    georef = metadata_georeference(read_map_metadata(map_path)) if wgs84 else None
+    paths = []
+    vessel_summaries = []
+    for result in results:
+        waypoints = WaypointStore()
+        waypoints.extend(result["points"])
+        waypoints_path = f"{base}_vessel{result['vessel'] + 1}_waypoints.yaml"
+        with timed("export_waypoints"), open(waypoints_path, "w") as f:
+            f.write(waypoints.to_yaml(resolution, height, georef=georef))
+        paths.append(waypoints.xy)
+        vessel_summaries.append({
+            "vessel": result["vessel"] + 1,
+            "waypoints_path": waypoints_path,
+            "waypoints": len(waypoints),
+            "area_m2": result["area_m2"],
+            "blocked_legs": len(blocked_segments(clearance, waypoints.xy)),
+        })
+    summary = {
+        "map_name": name,
+        "map_path": map_path,
+        "map_reused": reused,
+        "vessels": vessel_summaries,
+        "waypoints": sum(vessel["waypoints"] for vessel in vessel_summaries),
+        "blocked_legs": sum(vessel["blocked_legs"] for vessel in vessel_summaries),
+        "coverage": evaluate_paths_coverage(map_img, paths, swath_width, resolution).summary(),
+        "width": width,
+        "height": height,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    add_metrics(summary)
+    return summary
+
+def add_metrics(summary):
+    """Add the timings and counters of the area to its summary when metrics are enabled"""
+    if metrics.enabled:
+        snapshot = metrics.snapshot()
+        summary["metrics"] = {"timings": snapshot["timings"], "counters": snapshot["counters"],
+                              "profiles": [profile["path"] for profile in snapshot["profiles"]]}
+
+def plan_areas(areas, output_dir, resolution=0.05, planner="Lawnmower", workers=None, wgs84=False,
+               safety_margin=DEFAULT_SAFETY_MARGIN, swath_width=DEFAULT_SWATH_WIDTH,
+               tolerance_m=DEFAULT_TOLERANCE_M, turn_radius_m=0.0, vessels=1, angle_workers=None):
+    """
+    Run plan_area for every (name, coordinates) pair across a process pool.
+    Yields one summary per area as they finish; failed areas carry an "error".
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    # Spawned workers: a forked one inherits the locks of the pool threads
+    # and hangs when it starts its own processes for the sweep angles
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = {
+            executor.submit(plan_area, name, coordinates, output_dir, resolution, planner,
+                            wgs84=wgs84, safety_margin=safety_margin, swath_width=swath_width,
+                            tolerance_m=tolerance_m, turn_radius_m=turn_radius_m, vessels=vessels,
+                            angle_workers=angle_workers): name
+            for name, coordinates in areas
+        }
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                yield {"map_name": futures[future], "error": str(e)}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate maps and coverage paths without the GUI")
+    parser.add_argument("polygons", nargs="*", help="polygon or catalog JSON files")
+    parser.add_argument("--catalog", help="catalog JSON file ({name: [points]}) to pick --maps from "
+                        "(default: the local map catalog snapshot)")
+    parser.add_argument("--maps", nargs="+", default=[], help="names of the catalog maps to plan")
+    parser.add_argument("-o", "--output-dir", default="plans", help="directory for maps and waypoints")
+    parser.add_argument("--resolution", type=float, default=0.05, help="map resolution in meters per pixel")
+    parser.add_argument("--planner", choices=sorted(CLI_PLANNERS), default="lawnmower")
+    parser.add_argument("--safety-margin", type=float, default=DEFAULT_SAFETY_MARGIN,
+                        help="meters kept from borders and land")
+    parser.add_argument("--swath-width", type=float, default=DEFAULT_SWATH_WIDTH,
+                        help="meters cleaned along every leg, for the coverage summary")
+    parser.add_argument("--simplify-tolerance", type=float, default=DEFAULT_TOLERANCE_M,
+                        help="meters a dropped collinear waypoint may be off the path, 0 keeps them all")
+    parser.add_argument("--turn-radius", type=float, default=0.0,
+                        help="round the turns to this radius in meters (default: sharp corners)")
+    parser.add_argument("--vessels", type=int, default=1,
+                        help="split every area between this many vessels, one waypoint file each")
+    parser.add_argument("--metrics", action="store_true",
+                        help="add stage timings and counters to every summary")
+    parser.add_argument("--wgs84", action="store_true", help="add WGS84 lat/lng to the waypoints")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--angle-workers", type=int, default=None,
+                        help="processes evaluating the sweep angles of an area, 1 evaluates them in its "
+                        "worker (default: more only for large evaluations)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.metrics:
+        # Through the environment as well, for workers that do not fork
+        os.environ[METRICS_ENV] = "1"
+        set_enabled(True)
+    areas = []
+    for path in args.polygons:
+        areas.extend(load_polygons(path).items())
+    if args.maps:
+        if args.catalog:
+            catalog = load_polygons(args.catalog)
+        else:
+            # Local snapshot of the map catalog, plus the built-in maps
+            from mapGenrating.map_data import get_catalog
+            catalog = get_catalog().maps()
+        missing = [name for name in args.maps if name not in catalog]
+        if missing:
+            print(f"Unknown maps: {', '.join(missing)}", file=sys.stderr)
+            return 2
+        areas.extend((name, catalog[name]) for name in args.maps)
+    if not areas:
+        print("Nothing to plan, give polygon files or --maps", file=sys.stderr)
+        return 2
+
+    failed = 0
+    for summary in plan_areas(areas, args.output_dir, args.resolution,
+                              CLI_PLANNERS[args.planner], args.workers, args.wgs84,
+                              args.safety_margin, args.swath_width, args.simplify_tolerance,
+                              args.turn_radius, max(1, args.vessels), args.angle_workers):
+        print(json.dumps(summary))
+        failed += "error" in summary
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
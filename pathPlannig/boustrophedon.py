@@ -0,0 +1,296 @@
+from collections import deque
+
+import numpy as np
+
+from mapGenrating.clearance import DEFAULT_SAFETY_MARGIN, ClearanceMap
+from mapGenrating.instrumentation import count, timed
+from pathPlannig.row_spans import RowSpanIndex
+
+
+class Cell:
+    """A y-monotone region of free space with exactly one interval per row"""
+
+    def __init__(self, cell_id, y_top):
+        self.id = cell_id
+        self.y_top = y_top
+        self.starts = []
+        self.ends = []
+        self.neighbors = {}  # neighbour id -> (x, y) portal point on the shared boundary
+
+    @property
+    def y_bottom(self):
+        return self.y_top + len(self.starts) - 1
+
+    def span(self, y):
+        i = y - self.y_top
+        return self.starts[i], self.ends[i]
+
+    def contains(self, x, y):
+        if y < self.y_top or y > self.y_bottom:
+            return False
+        start, end = self.span(y)
+        return start <= x <= end
+
+
+def decompose(span_index):
+    """
+    Split the free space described by a RowSpanIndex into boustrophedon cells.
+
+    Rows are swept top to bottom once. A cell continues while its interval
+    overlaps exactly one interval of the next row and vice versa; any other
+    change in connectivity (split, merge, island) closes the touching cells
+    and opens new ones, which are linked in the adjacency graph. The cost is
+    linear in the total number of row intervals.
+    """
+    cells = []
+    prev_spans = np.empty((0, 2), dtype=np.int32)
+    prev_cells = []
+
+    for y in range(span_index.height):
+        spans = span_index.row_spans(y)
+        n_prev = len(prev_spans)
+        n_curr = len(spans)
+
+        # Fast path: a single interval continuing a single interval
+        if (n_prev == 1 and n_curr == 1 and prev_spans[0, 0] <= spans[0, 1]
+                and spans[0, 0] <= prev_spans[0, 1]):
+            cell = prev_cells[0]
+            cell.starts.append(int(spans[0, 0]))
+            cell.ends.append(int(spans[0, 1]))
+            prev_spans = spans
+            continue
+
+        # Overlapping (prev, curr) interval pairs via a two pointer merge
+        overlaps = []
+        i = j = 0
+        while i < n_prev and j < n_curr:
+            if prev_spans[i, 0] <= spans[j, 1] and spans[j, 0] <= prev_spans[i, 1]:
+                overlaps.append((i, j))
+            if prev_spans[i, 1] < spans[j, 1]:
+                i += 1
+            else:
+                j += 1
+        prev_degree = [0] * n_prev
+        curr_degree = [0] * n_curr
+        for i, j in overlaps:
+            prev_degree[i] += 1
+            curr_degree[j] += 1
+
+        curr_cells = [None] * n_curr
+        for i, j in overlaps:
+            if prev_degree[i] == 1 and curr_degree[j] == 1:
+                curr_cells[j] = prev_cells[i]
+        for j in range(n_curr):
+            if curr_cells[j] is None:
+                curr_cells[j] = Cell(len(cells), y)
+                cells.append(curr_cells[j])
+            curr_cells[j].starts.append(int(spans[j, 0]))
+            curr_cells[j].ends.append(int(spans[j, 1]))
+        for i, j in overlaps:
+            above, below = prev_cells[i], curr_cells[j]
+            if above is not below:
+                x = (max(prev_spans[i, 0], spans[j, 0]) + min(prev_spans[i, 1], spans[j, 1])) / 2.0
+                portal = (float(x), y - 0.5)
+                above.neighbors[below.id] = portal
+                below.neighbors[above.id] = portal
+
+        prev_spans = spans
+        prev_cells = curr_cells
+    return cells
+
+
+class BoustrophedonPlanner:
+    """
+    Coverage planner that sweeps each boustrophedon cell of the free space
+    separately, so non-convex shorelines and islands are handled without
+    sweeping across land. Cells are visited in adjacency graph order, and
+    every move between sweep lines and between cells runs through the
+    cells, so no leg leaves the safe water.
+    """
+
+    def __init__(self, map_img, clearance=None, safety_margin=DEFAULT_SAFETY_MARGIN,
+                 vertical_step=60, min_step=10.0):
+        """
+        clearance: ClearanceMap of map_img, computed if not given
+        safety_margin: distance in meters kept from borders and land
+        """
+        self.map_img = map_img
+        self.height, self.width = map_img.shape
+        self.vertical_step = vertical_step  # 60 pixels = 3m
+        self.min_step = min_step  # Minimum 0.5m (10 pixels)
+        self.clearance = clearance if clearance is not None else ClearanceMap.compute(map_img)
+        self.safety_margin = safety_margin
+        # Cells of the free space shrunk by the safety margin, so every
+        # point inside them keeps the margin from borders and land
+        with timed("boustrophedon.decompose"):
+            self.span_index = RowSpanIndex(self.clearance.safe_mask(safety_margin))
+            self.cells = decompose(self.span_index)
+        count("boustrophedon.cells", len(self.cells))
+
+    def find_cell(self, x, y):
+        """Return the cell containing (x, y), or the closest one by row distance"""
+        # Truncated like the pixel lookups of ClearanceMap
+        y_int = int(y)
+        best = None
+        best_dist = None
+        for cell in self.cells:
+            if cell.contains(int(x), y_int):
+                return cell
+            row = min(max(y_int, cell.y_top), cell.y_bottom)
+            start, end = cell.span(row)
+            dist = (row - y) ** 2 + (min(max(x, start), end) - x) ** 2
+            if best_dist is None or dist < best_dist:
+                best, best_dist = cell, dist
+        return best
+
+    def sweep_rows(self, cell):
+        """Rows of the sweep lines inside a cell, from its top to its bottom"""
+        top = cell.y_top
+        bottom = cell.y_bottom
+        rows = list(range(top, bottom + 1, self.vertical_step))
+        if bottom - rows[-1] > self.vertical_step / 2:
+            rows.append(bottom)
+        return rows
+
+    def climb(self, cell, x, y_from, y_to):
+        """
+        Points leading from (x, y_from) to row y_to without leaving a cell:
+        vertical legs at a column inside the spans of all the rows they
+        cross, joined by moves along a row where the cell shifts sideways
+        too far for a single vertical leg. (x, y_from) must be in the cell.
+        Returns the points after (x, y_from), the last one on row y_to.
+        """
+        step = 1 if y_to > y_from else -1
+        points = []
+        y = y_from
+        while y != y_to:
+            lo, hi = cell.span(y)
+            y_next = y
+            # Consecutive rows of a cell always overlap, so this goes at least one row
+            while y_next != y_to:
+                start, end = cell.span(y_next + step)
+                if start > hi or end < lo:
+                    break
+                lo = max(lo, start)
+                hi = min(hi, end)
+                y_next += step
+            x_next = float(min(max(x, lo), hi))
+            if x_next != x:
+                points.append((x_next, float(y)))
+            points.append((x_next, float(y_next)))
+            x = x_next
+            y = y_next
+        return points
+
+    def sweep_cell(self, cell, x_current, y_current):
+        """
+        Lawnmower points covering one cell, entered from the end nearest to
+        the current position. When the current position is in the cell,
+        the way to the first sweep line runs through the cell too.
+        """
+        rows = self.sweep_rows(cell)
+        if abs(rows[-1] - y_current) < abs(rows[0] - y_current):
+            rows.reverse()
+        start, end = cell.span(rows[0])
+        direction = 1.0 if abs(x_current - start) <= abs(x_current - end) else -1.0
+
+        points = []
+        if cell.contains(int(x_current), int(y_current)):
+            points.extend(self.climb(cell, x_current, int(y_current), rows[0]))
+        for i, y in enumerate(rows):
+            x_min, x_max = cell.span(y)
+            x_from, x_to = (x_min, x_max) if direction > 0 else (x_max, x_min)
+            if i > 0:
+                # Turn: move to the next line inside the cell before sweeping it
+                points.extend(self.climb(cell, points[-1][0], rows[i - 1], y))
+                x_from = points[-1][0]
+            available_width = abs(x_to - x_from)
+            num_points = min(4, int(available_width // self.min_step) + 1)  # Up to 4 points
+            if num_points > 1:
+                step = (x_to - x_from) / (num_points - 1)
+                line = [(float(x_from + i * step), float(y)) for i in range(num_points)]
+            else:
+                line = [(float(x_from), float(y))]
+            if points and line[0] == points[-1]:
+                line = line[1:]
+            points.extend(line)
+            direction = -direction
+        return points
+
+    def transit(self, path_ids, x, y):
+        """
+        Points leading from (x, y), in the first cell of path_ids, through
+        the cells in path_ids: inside every cell to the row next to the
+        portal, then across the portal into the first row of the next cell
+        """
+        points = []
+        y = int(y)
+        for a, b in zip(path_ids, path_ids[1:]):
+            cell = self.cells[a]
+            portal_x, portal_y = cell.neighbors[b]
+            # Portals lie half a row below the last row or above the first row of a cell
+            below = portal_y > cell.y_bottom
+            exit_row = cell.y_bottom if below else cell.y_top
+            points.extend(self.climb(cell, x, y, exit_row))
+            if portal_x != x:
+                points.append((portal_x, float(exit_row)))
+            y = exit_row + 1 if below else exit_row - 1
+            x = portal_x
+            points.append((x, float(y)))
+        return points
+
+    def route(self, source_id, visited):
+        """
+        Breadth-first search over the adjacency graph for the closest (in hops)
+        unvisited cell; returns the cell id path or None.
+        """
+        parents = {source_id: None}
+        queue = deque([source_id])
+        while queue:
+            cell_id = queue.popleft()
+            if cell_id not in visited:
+                path = []
+                while cell_id is not None:
+                    path.append(cell_id)
+                    cell_id = parents[cell_id]
+                return path[::-1]
+            for neighbor_id in sorted(self.cells[cell_id].neighbors):
+                if neighbor_id not in parents:
+                    parents[neighbor_id] = cell_id
+                    queue.append(neighbor_id)
+        return None
+
+    def generate_path(self, x0, y0, progress=None):
+        """
+        Sweep every cell connected to the one containing (x0, y0), starting with it
+        progress: optional callback called with the fraction of cells swept,
+            may raise to abort the planning
+        """
+        points = [(float(x0), float(y0))]
+        if not self.cells:
+            return points
+        x_current, y_current = float(x0), float(y0)
+        current = self.find_cell(x_current, y_current)
+        visited = set()
+        while current is not None:
+            visited.add(current.id)
+            if progress:
+                progress(len(visited) / len(self.cells))
+            sweep = self.sweep_cell(current, x_current, y_current)
+            points.extend(sweep)
+            if sweep:
+                x_current, y_current = sweep[-1]
+
+            path_ids = self.route(current.id, visited)
+            if path_ids is None:
+                # The cells left are not connected to these: reaching them
+                # means leaving the safe water, so they are not swept
+                if len(visited) < len(self.cells):
+                    count("boustrophedon.unreachable_cells", len(self.cells) - len(visited))
+                break
+            transit = self.transit(path_ids, x_current, y_current)
+            points.extend(transit)
+            if transit:
+                x_current, y_current = transit[-1]
+            current = self.cells[path_ids[-1]]
+        return points
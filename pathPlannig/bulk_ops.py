@@ -0,0 +1,113 @@
+import multiprocessing
+import multiprocessing.util
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+# Worker processes are spawned once and kept for the next calls: a spawned
+# worker imports NumPy, OpenCV and the planner modules (and PyQt5 under the
+# GUI), which costs more than most tasks
+_pool_lock = threading.Lock()
+_pool = None
+_pool_workers = 0
+_pool_finalizer = None
+
+
+def block_reduce(image, cell, ufunc, fill, dtype, transform=None):
+    """
+    Reduce every cell x cell block of a 2D array with a NumPy ufunc
+    (np.minimum, np.add, ...), a band of rows at a time so that a
+    memmapped array is never fully loaded
+    fill: value of the missing pixels of the blocks cut by the array edge,
+        neutral for ufunc
+    transform: optional function applied to every band of rows first
+    Returns the (ceil(height / cell), ceil(width / cell)) grid.
+    """
+    height, width = image.shape
+    grid_width = -(-width // cell)
+    padded = np.full(grid_width * cell, fill, dtype=dtype)
+    grid = np.empty((-(-height // cell), grid_width), dtype=dtype)
+    for row, y in enumerate(range(0, height, cell)):
+        band = np.asarray(image[y:y + cell])
+        if transform is not None:
+            band = transform(band)
+        padded[:width] = ufunc.reduce(band, axis=0)
+        grid[row] = ufunc.reduce(padded.reshape(grid_width, cell), axis=1)
+    return grid
+
+def shared_pool(workers):
+    """
+    The long-lived pool of worker processes, created again when the number
+    of workers changes. Workers start as tasks come in, not all at once.
+    """
+    global _pool, _pool_workers, _pool_finalizer
+    with _pool_lock:
+        if _pool_finalizer is None:
+            # A worker process joins its children before the threading exit
+            # hook that would stop this pool runs, so inside a worker (a
+            # batch area) the pool is stopped by a multiprocessing finalizer.
+            # Its priority puts it before the finalizers of the pool queues
+            # (10), which would drop the stop messages to the workers.
+            _pool_finalizer = multiprocessing.util.Finalize(None, shutdown_pool, exitpriority=100)
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            # Spawned workers, forking a process with GUI and worker threads is unsafe
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+def shutdown_pool():
+    """Stop the shared pool and wait for its workers to exit"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+def discard_pool(pool):
+    """Drop a pool whose worker died, the next call starts a new one"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def run_in_processes(fn, tasks, workers=None, progress=None):
+    """
+    fn(*task) for every task, in the shared pool of worker processes
+    workers: processes to use (default: all cores), 1 runs the tasks in the
+        calling process
+    progress: optional callback called with the fraction of tasks done,
+        may raise to abort: the tasks not started yet are cancelled
+    Returns the results in task order.
+    """
+    tasks = list(tasks)
+    workers = workers or os.cpu_count() or 1
+    if min(workers, len(tasks)) <= 1:
+        results = []
+        for task in tasks:
+            results.append(fn(*task))
+            if progress:
+                progress(len(results) / len(tasks))
+        return results
+    results = [None] * len(tasks)
+    pool = shared_pool(workers)
+    futures = {}
+    try:
+        futures = {pool.submit(fn, *task): index for index, task in enumerate(tasks)}
+        for done, future in enumerate(as_completed(futures), 1):
+            results[futures[future]] = future.result()
+            if progress:
+                progress(done / len(tasks))
+    except BrokenProcessPool:
+        discard_pool(pool)
+        raise
+    finally:
+        # Aborted or failed, the pool stays up for the next call
+        for future in futures:
+            future.cancel()
+    return results
@@ -0,0 +1,196 @@
+import math
+
+import cv2
+import numpy as np
+
+from pathPlannig.path_validation import segment_chunks
+
+# The map is evaluated on a grid of at most this many cells
+MAX_GRID_CELLS = 1 << 22
+# Default width in meters of the strip cleaned by the collector
+DEFAULT_SWATH_WIDTH = 3.0
+# Uncovered water smaller than this is not reported as a gap
+MIN_GAP_AREA_M2 = 1.0
+# Heatmap colors (RGBA) by number of passes: uncovered water, once, twice or more
+HEATMAP_COLORS = np.array([[230, 40, 40, 140], [40, 200, 80, 90], [255, 170, 0, 140]], dtype=np.uint8)
+# Grid rows of the swaths rasterized at once, bounds the memory of long plans
+CHUNK_ROWS = 1 << 20
+
+
+def grid_cell(shape, swath_px, max_cells=MAX_GRID_CELLS):
+    """Pixels per evaluation cell: small enough for the swath, few enough cells for the map"""
+    height, width = shape
+    cell = max(1, int(math.ceil(math.sqrt(height * width / max_cells))))
+    return max(1, min(cell, int(swath_px // 4)))
+
+def water_grid(map_img, cell, free_value=255):
+    """Cells of the evaluation grid that are mostly free water"""
+    height, width = map_img.shape
+    # 255 on free pixels, in a single pass over the map
+    free = cv2.compare(np.ascontiguousarray(map_img), free_value, cv2.CMP_EQ)
+    if cell == 1:
+        return free > 0
+    # Area averaging: cells are water when at least half their pixels are
+    small = cv2.resize(free, (-(-width // cell), -(-height // cell)), interpolation=cv2.INTER_AREA)
+    return small >= 128
+
+def swath_slabs(points, swath_px, cell):
+    """
+    Rectangles swept by every leg of a path, in evaluation grid coordinates
+    with the cell centers on whole numbers. Legs sweep a rectangle without
+    end caps: where the slab across the leg (within half the swath of its
+    line) meets the slab along it (between its ends). On row y, each slab
+    spans x from low + slope * y to high + slope * y, or all of the row
+    when its sides are parallel to the rows.
+    Returns the top and bottom y of every rectangle and the (n, 2) low,
+    high and slope arrays of its two slabs, for the legs that have a length.
+    """
+    p1 = points[:-1] / cell - 0.5
+    direction = points[1:] / cell - 0.5 - p1
+    length = np.hypot(direction[:, 0], direction[:, 1])
+    moving = length > 0
+    p1 = p1[moving]
+    length = length[moving]
+    unit = direction[moving] / length[:, None]
+    half = swath_px / cell / 2.0
+    # Unit normals of the slab sides: across the leg, then along it
+    normals = np.stack((unit[:, ::-1] * [-1.0, 1.0], unit), axis=1)
+    offsets = np.einsum("nsk,nk->ns", normals, p1)
+    lower = offsets - np.column_stack((np.full(len(p1), half), np.zeros(len(p1))))
+    upper = offsets + np.column_stack((np.full(len(p1), half), length))
+    # Solve lower <= nx * x + ny * y <= upper for x
+    nx = normals[:, :, 0]
+    level = np.abs(nx) < 1e-9
+    nx = np.where(level, 1.0, nx)
+    slope = np.where(level, 0.0, -normals[:, :, 1] / nx)
+    low = np.where(level, -np.inf, np.where(nx > 0, lower, upper) / nx)
+    high = np.where(level, np.inf, np.where(nx > 0, upper, lower) / nx)
+    # The corners stick out half the swath times |ux| above and below the leg
+    spread = np.abs(unit[:, 0]) * half
+    ends_y = np.column_stack((p1[:, 1], p1[:, 1] + unit[:, 1] * length))
+    return ends_y.min(axis=1) - spread, ends_y.max(axis=1) + spread, low, high, slope
+
+class CoverageEvaluation:
+    """
+    Swath coverage of a waypoint path on a map: for every cell of a grid
+    over the map, the number of legs whose swath covers it. Legs sweep a
+    rectangle swath_width wide, without end caps, so consecutive legs
+    along a sweep line do not count as overlap.
+    """
+
+    def __init__(self, passes, water, cell, resolution, swath_width):
+        self.passes = passes  # uint16 grid: swaths covering every cell
+        self.water = water  # bool grid: cells of free water
+        self.cell = cell  # map pixels per grid cell
+        self.resolution = resolution
+        self.swath_width = swath_width
+
+    @property
+    def cell_area(self):
+        return (self.cell * self.resolution) ** 2
+
+    def coverage_percent(self):
+        """Share of the water covered at least once"""
+        water = np.count_nonzero(self.water)
+        if water == 0:
+            return 0.0
+        return 100.0 * np.count_nonzero(self.water & (self.passes > 0)) / water
+
+    def overlap_percent(self):
+        """Share of the covered water covered more than once"""
+        covered = np.count_nonzero(self.water & (self.passes > 0))
+        if covered == 0:
+            return 0.0
+        return 100.0 * np.count_nonzero(self.water & (self.passes > 1)) / covered
+
+    def gaps(self, min_area_m2=MIN_GAP_AREA_M2):
+        """
+        Connected uncovered water regions of at least min_area_m2, largest first
+        Returns dicts with the area in m2, and the center and bounding box in map pixels.
+        """
+        uncovered = (self.water & (self.passes == 0)).astype(np.uint8)
+        count, _, stats, centroids = cv2.connectedComponentsWithStats(uncovered, connectivity=8)
+        gaps = []
+        for label in range(1, count):
+            area = stats[label, cv2.CC_STAT_AREA] * self.cell_area
+            if area < min_area_m2:
+                continue
+            x, y, w, h = (int(v) * self.cell for v in stats[label, :4])
+            cx, cy = (centroids[label] + 0.5) * self.cell
+            gaps.append({"area_m2": round(float(area), 2), "center": (float(cx), float(cy)),
+                         "bbox": (x, y, w, h)})
+        gaps.sort(key=lambda gap: gap["area_m2"], reverse=True)
+        return gaps
+
+    def summary(self, min_area_m2=MIN_GAP_AREA_M2):
+        gaps = self.gaps(min_area_m2)
+        return {
+            "swath_width_m": self.swath_width,
+            "coverage_percent": round(float(self.coverage_percent()), 2),
+            "overlap_percent": round(float(self.overlap_percent()), 2),
+            "water_m2": round(float(np.count_nonzero(self.water) * self.cell_area), 1),
+            "gaps": len(gaps),
+            "largest_gap_m2": gaps[0]["area_m2"] if gaps else 0.0,
+        }
+
+    def heatmap(self):
+        """RGBA image of the grid: red gaps, green covered once, orange overlap, clear land"""
+        levels = np.minimum(self.passes, 2)
+        rgba = HEATMAP_COLORS[levels]
+        rgba[~self.water] = 0
+        return rgba
+
+def add_swaths(passes, points, swath_px, cell, chunk_rows=CHUNK_ROWS):
+    """
+    Add one pass to every cell of passes whose center is under the swath of
+    a waypoint path. Every swath adds +1 at the start and -1 past the end
+    of its interval on each row it crosses, and a cumulative sum along the
+    rows turns these into pass counts: the cost follows the rows crossed by
+    the swaths, not the areas of their bounding boxes, whatever the sweep
+    direction.
+    """
+    if len(points) < 2:
+        return
+    top, bottom, low, high, slope = swath_slabs(points, swath_px, cell)
+    rows, cols = passes.shape
+    first = np.maximum(np.ceil(top), 0).astype(np.int64)
+    counts = np.maximum(np.minimum(np.floor(bottom), rows - 1).astype(np.int64) - first + 1, 0)
+    # One extra column for the ends of the intervals reaching the last one
+    changes = np.zeros(rows * (cols + 1), dtype=np.int32)
+    for start, stop in segment_chunks(counts, chunk_rows):
+        n = counts[start:stop]
+        if n.sum() == 0:
+            continue
+        # Row of every (leg, row) pair of the chunk
+        row = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n - first[start:stop], n)
+        # Sides of both slabs on these rows: low and high of slab 0, then of slab 1
+        low0, high0, low1, high1 = (np.repeat(bound[start:stop, s], n) + np.repeat(slope[start:stop, s], n) * row
+                                    for s in (0, 1) for bound in (low, high))
+        left = np.maximum(np.ceil(np.maximum(low0, low1)), 0)
+        right = np.minimum(np.floor(np.minimum(high0, high1)), cols - 1)
+        inside = left <= right
+        index = row[inside] * (cols + 1)
+        changes += np.bincount(index + left[inside].astype(np.int64), minlength=len(changes))
+        changes -= np.bincount(index + right[inside].astype(np.int64) + 1, minlength=len(changes))
+    passes += np.cumsum(changes.reshape(rows, cols + 1)[:, :cols], axis=1).astype(passes.dtype)
+
+def evaluate_coverage(map_img, points, swath_width=DEFAULT_SWATH_WIDTH, resolution=0.05,
+                      max_cells=MAX_GRID_CELLS):
+    """
+    Rasterize the swath of every leg of a waypoint path onto a grid over
+    the map and count the passes over every cell
+    points: (n, 2) waypoint pixel coordinates, in path order
+    swath_width: width in meters of the strip cleaned along every leg
+    """
+    return evaluate_paths_coverage(map_img, [points], swath_width, resolution, max_cells)
+
+def evaluate_paths_coverage(map_img, paths, swath_width=DEFAULT_SWATH_WIDTH, resolution=0.05,
+                            max_cells=MAX_GRID_CELLS):
+    """Like evaluate_coverage for several paths swept together, such as one per vessel"""
+    swath_px = swath_width / resolution
+    cell = grid_cell(map_img.shape, swath_px, max_cells)
+    water = water_grid(map_img, cell)
+    passes = np.zeros(water.shape, dtype=np.uint16)
+    for points in paths:
+        add_swaths(passes, np.asarray(points, dtype=np.float64).reshape(-1, 2), swath_px, cell)
+    return CoverageEvaluation(passes, water, cell, resolution, swath_width)
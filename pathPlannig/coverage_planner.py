@@ -0,0 +1,201 @@
+import numpy as np
+
+from mapGenrating.clearance import DEFAULT_SAFETY_MARGIN, ClearanceMap
+from mapGenrating.instrumentation import capture, count, timed
+from pathPlannig.path_postprocess import DEFAULT_TOLERANCE_M, postprocess_path
+from pathPlannig.path_validation import segment_is_blocked
+from pathPlannig.router import Router
+from pathPlannig.row_spans import RowSpanIndex
+from pathPlannig.boustrophedon import BoustrophedonPlanner
+from pathPlannig.sweep_optimizer import SweepAnglePlanner
+
+
+class CoveragePathPlanner:
+    def __init__(self, map_img, clearance=None, safety_margin=DEFAULT_SAFETY_MARGIN):
+        """
+        clearance: ClearanceMap of map_img, computed if not given
+        safety_margin: distance in meters kept from borders and land
+        """
+        self.map_img = map_img
+        self.height, self.width = map_img.shape
+        self.clearance = clearance if clearance is not None else ClearanceMap.compute(map_img)
+        self.safety_margin = safety_margin
+        # Intervals of every row that are safety_margin away from obstacles, built once per map
+        self.span_index = RowSpanIndex(self.clearance.safe_mask(safety_margin))
+    
+    def is_safe(self, x, y):
+        # Truncated by the ClearanceMap, like filter_navigable and the leg checks
+        return self.clearance.is_safe(x, y, self.safety_margin)
+    
+    def leg_is_safe(self, p1, p2):
+        return not segment_is_blocked(self.clearance, p1, p2, self.safety_margin)
+    
+    def get_navigable_range(self, y):
+        return self.span_index.row_range(int(y))
+    
+    def generate_path(self, x0, y0, progress=None):
+        """
+        progress: optional callback called with the completed fraction (0 to 1)
+            once per sweep row, may raise to abort the planning
+        """
+        points = [(float(x0), float(y0))]
+        x_current = float(x0)
+        y_current = float(y0)
+        direction = 1.0  # 1.0 for right, -1.0 for left
+        min_step = 10.0  # Minimum 0.5m (10 pixels)
+        vertical_step = 60.0  # 60 pixels = 3m
+        while True:
+            if progress and y0 > 0:
+                # Rows are swept upwards from y0 to the top of the map
+                progress(min(max((y0 - y_current) / y0, 0.0), 1.0))
+            # Get navigable range for current y
+            y_int = int(y_current)
+            if y_int < 0 or y_int >= self.height:
+                break
+            x_min, x_max = self.get_navigable_range(y_current)
+            if x_min is None or x_max is None:
+                break
+            # Calculate dynamic spacing based on navigable width
+            if direction > 0:
+                # The range already keeps the safety margin from the borders
+                x_start = max(x_current, x_min)
+                x_end = x_max
+                if x_end <= x_start:
+                    break
+                available_width = x_end - x_start
+                num_points = min(4, int(available_width // min_step) + 1)  # Up to 4 points
+                if num_points > 1:
+                    step = available_width / (num_points - 1)
+                    for i in range(num_points):
+                        x_candidate = x_start + i * step
+                        if self.is_safe(x_candidate, y_current) and \
+                                self.leg_is_safe(points[-1], (x_candidate, y_current)):
+                            points.append((x_candidate, y_current))
+                        else:
+                            break
+                    if len(points) > len(points) - num_points:
+                        x_current = points[-1][0]
+                elif num_points == 1:
+                    x_candidate = x_start
+                    if self.is_safe(x_candidate, y_current) and \
+                            self.leg_is_safe(points[-1], (x_candidate, y_current)):
+                        points.append((x_candidate, y_current))
+                        x_current = x_candidate
+            else:
+                x_start = min(x_current, x_max)
+                x_end = x_min
+                if x_end >= x_start:
+                    break
+                available_width = x_start - x_end
+                num_points = min(4, int(available_width // min_step) + 1)  # Up to 4 points
+                if num_points > 1:
+                    step = available_width / (num_points - 1)
+                    for i in range(num_points):
+                        x_candidate = x_start - i * step
+                        if self.is_safe(x_candidate, y_current) and \
+                                self.leg_is_safe(points[-1], (x_candidate, y_current)):
+                            points.append((x_candidate, y_current))
+                        else:
+                            break
+                    if len(points) > len(points) - num_points:
+                        x_current = points[-1][0]
+                elif num_points == 1:
+                    x_candidate = x_start
+                    if self.is_safe(x_candidate, y_current) and \
+                            self.leg_is_safe(points[-1], (x_candidate, y_current)):
+                        points.append((x_candidate, y_current))
+                        x_current = x_candidate
+            # Move up
+            y_next = y_current - vertical_step
+            if y_next < 0:
+                break
+            # Check if there's navigable area at y_next
+            x_min_next, x_max_next = self.get_navigable_range(y_next)
+            if x_min_next is None or x_max_next is None:
+                break
+            # Turn point above the current one, moved along the row into the
+            # navigable range of the next row if needed
+            x_turn = float(min(max(x_current, x_min_next), x_max_next))
+            turn = [(x_turn, y_current), (x_turn, y_next)] if x_turn != x_current else [(x_turn, y_next)]
+            if not self.is_safe(x_turn, y_next) or \
+                    not all(self.leg_is_safe(a, b) for a, b in zip([points[-1]] + turn, turn)):
+                break
+            points.extend(turn)
+            x_current = x_turn
+            y_current = y_next
+            direction = -direction
+        return points
+
+
+# Coverage planners selectable from the GUI and the batch planner
+PLANNER_MODES = {
+    "Lawnmower": CoveragePathPlanner,
+    "Boustrophedon Cells": BoustrophedonPlanner,
+    "Optimized Sweep Angle": SweepAnglePlanner,
+}
+
+
+def plan_path(map_img, x0, y0, planner="Lawnmower", progress=None, clearance=None,
+              safety_margin=DEFAULT_SAFETY_MARGIN, tolerance_m=DEFAULT_TOLERANCE_M, turn_radius_m=0.0,
+              workers=None):
+    """
+    Plan a coverage path from (x0, y0) with one of the PLANNER_MODES, then
+    drop its collinear waypoints and round its turns (see postprocess_path)
+    progress: optional callback called with the completed fraction (0 to 1)
+    clearance: ClearanceMap of map_img, computed if not given
+    safety_margin: distance in meters kept from borders and land
+    tolerance_m: largest distance in meters of a dropped waypoint to the path, 0 keeps them all
+    turn_radius_m: turning radius of the boat in meters, 0 keeps sharp corners
+    workers: processes evaluating the sweep angles of "Optimized Sweep Angle",
+        see evaluate_angles (default: decided by the size of the evaluation)
+    """
+    name = "plan_path." + planner.lower().replace(" ", "_")
+    planner_class = PLANNER_MODES[planner]
+    options = {"workers": workers} if planner_class is SweepAnglePlanner else {}
+    with capture(name):
+        with timed(name + ".setup"):
+            planner = planner_class(map_img, clearance=clearance, safety_margin=safety_margin, **options)
+        with timed(name + ".sweep"):
+            points = planner.generate_path(x0, y0, progress=progress)
+        count(name + ".raw_waypoints", len(points))
+        with timed(name + ".postprocess"):
+            points = postprocess_path(points, planner.clearance.resolution, tolerance_m, turn_radius_m,
+                                      planner.clearance, safety_margin)
+    count(name + ".waypoints", len(points))
+    return [tuple(point) for point in points.tolist()]
+
+def filter_navigable(clearance, points, safety_margin=0.0):
+    """Keep the (x, y) points that are on free pixels at least safety_margin meters from obstacles"""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    return points[clearance.safe_points(points, safety_margin)]
+
+def repair_path(clearance, points, safety_margin=DEFAULT_SAFETY_MARGIN, router=None):
+    """
+    Make a planned path fit to save: drop its points closer than
+    safety_margin to borders and land (filter_navigable), then route the
+    legs left leaving the safe water around land (Router.route_path).
+    Legs that cannot be routed are kept, blocked_segments reports them.
+    router: Router of the map for safety_margin, made here if not given
+    Returns the new (n, 2) path.
+    """
+    points = filter_navigable(clearance, points, safety_margin)
+    if router is None:
+        router = Router(clearance, safety_margin)
+    return router.route_path(points)
+
+def default_start(clearance, safety_margin=DEFAULT_SAFETY_MARGIN, inset=20):
+    """
+    Starting point for a coverage run when none is given: near the left end
+    of the lowest rows of safe water, since the planners sweep upwards
+    inset: pixels to move inside the safe water, away from its lowest tip
+    """
+    span_index = RowSpanIndex(clearance.safe_mask(safety_margin))
+    rows = np.flatnonzero(np.diff(span_index.row_ptr))
+    if len(rows) == 0:
+        return None
+    y = max(int(rows[-1]) - inset, int(rows[0]))
+    x_min, x_max = span_index.row_range(y)
+    while x_min is None:
+        y += 1
+        x_min, x_max = span_index.row_range(y)
+    return float(min(x_min + inset, (x_min + x_max) / 2.0)), float(y)
@@ -0,0 +1,215 @@
+import math
+
+import cv2
+import numpy as np
+
+from mapGenrating.clearance import DEFAULT_SAFETY_MARGIN, ClearanceMap
+from mapGenrating.instrumentation import timed
+from mapGenrating.pgm_io import load_pgm
+from pathPlannig.bulk_ops import block_reduce, run_in_processes
+from pathPlannig.coverage_planner import default_start, plan_path, repair_path
+from pathPlannig.path_postprocess import DEFAULT_TOLERANCE_M
+
+# The free water is split on a grid of at most this many cells
+MAX_GRID_CELLS = 1 << 18
+# Weighted Voronoi split: balancing rounds, and the area imbalance at which it stops
+VORONOI_ITERATIONS = 200
+VORONOI_TOLERANCE = 0.02
+# Parts of a region smaller than this are left out, like the gaps of coverage_eval
+MIN_PART_AREA_M2 = 1.0
+
+
+def safe_counts(clearance, safety_margin, cell):
+    """Number of safe pixels in every cell x cell block of a map"""
+    threshold = clearance.threshold(safety_margin)
+    return block_reduce(clearance.dist, cell, np.add, 0, np.uint32,
+                        transform=lambda band: band >= threshold)
+
+def split_bands(counts, vessels, launch_rows=None):
+    """
+    Sweep line split: bands of whole grid rows holding about the same safe
+    area each, counted from the top
+    launch_rows: optional grid row of every vessel's launch point, vessels
+        launching further down get the lower bands
+    Returns the labels grid, 0 on land and vessel + 1 in the water.
+    """
+    row_area = counts.sum(axis=1).astype(np.float64)
+    cumulative = np.cumsum(row_area)
+    # Band of every row: how many equal shares of the area lie above it
+    band = np.minimum((cumulative - row_area / 2) * vessels // max(cumulative[-1], 1), vessels - 1)
+    # Vessel of every band, top to bottom
+    owners = np.arange(vessels) if launch_rows is None else np.argsort(launch_rows, kind="stable")
+    labels = np.where(counts > 0, owners[band.astype(np.intp)][:, None] + 1, 0)
+    return labels.astype(np.uint8)
+
+def split_voronoi(counts, seeds, iterations=VORONOI_ITERATIONS, tolerance=VORONOI_TOLERANCE):
+    """
+    Voronoi split seeded at the launch points, balanced by area: every
+    water cell goes to the seed with the smallest distance minus the seed
+    weight, and the weights of the vessels with too much area are lowered
+    until every region holds about the same area. The distance term keeps
+    regions close to their launch point, so transits stay short.
+    seeds: (vessels, 2) launch points in grid cells (column, row)
+    Returns the labels grid, 0 on land and vessel + 1 in the water.
+    """
+    seeds = np.asarray(seeds, dtype=np.float64).reshape(-1, 2)
+    vessels = len(seeds)
+    rows, cols = np.nonzero(counts)
+    area = counts[rows, cols].astype(np.float64)
+    target = area.sum() / vessels
+    distances = np.hypot(cols[:, None] + 0.5 - seeds[:, 0], rows[:, None] + 0.5 - seeds[:, 1])
+    weights = np.zeros(vessels)
+    # Weight steps in cells, about the radius of one region
+    step = math.sqrt(len(area) / vessels)
+    for _ in range(iterations):
+        owner = np.argmin(distances - weights, axis=1)
+        share = np.bincount(owner, weights=area, minlength=vessels) / target
+        if np.abs(share - 1.0).max() <= tolerance:
+            break
+        weights -= step * np.clip(share - 1.0, -1.0, 1.0) * 0.5
+        step *= 0.97
+    labels = np.zeros(counts.shape, dtype=np.uint8)
+    labels[rows, cols] = owner + 1
+    return labels
+
+def region_bounds(labels, vessel, cell, shape):
+    """Pixel bounding box (x0, y0, x1, y1) of the cells of a vessel, or None"""
+    rows, cols = np.nonzero(labels == vessel + 1)
+    if len(rows) == 0:
+        return None
+    height, width = shape
+    return (int(cols.min()) * cell, int(rows.min()) * cell,
+            min((int(cols.max()) + 1) * cell, width), min((int(rows.max()) + 1) * cell, height))
+
+def region_clearance(clearance, labels, vessel, cell, bounds):
+    """
+    Distance field of the bounding box of a region, cleared outside it.
+    Distances inside are kept, so sweeps run right up to the region edge
+    instead of keeping the safety margin from the neighbouring regions.
+    """
+    x0, y0, x1, y1 = bounds
+    owned = (labels[y0 // cell:-(-y1 // cell), x0 // cell:-(-x1 // cell)] == vessel + 1).astype(np.uint8)
+    mask = np.repeat(np.repeat(owned, cell, axis=0), cell, axis=1)[:y1 - y0, :x1 - x0]
+    dist = np.where(mask > 0, np.asarray(clearance.dist[y0:y1, x0:x1]), 0).astype(np.uint16)
+    return ClearanceMap(dist, clearance.resolution)
+
+def region_parts(region, safety_margin, min_area_px):
+    """
+    Connected parts of the safe water of a region, largest first, as
+    (x, y, ClearanceMap) crops of the region cleared outside the part.
+    A region split by land or by its own shape has several, which the
+    planners cannot join without leaving the region.
+    min_area_px: smaller parts are dropped
+    """
+    safe = region.safe_mask(safety_margin).astype(np.uint8)
+    # 4-connected, like the rows of the boustrophedon cells
+    _, labels, stats, _ = cv2.connectedComponentsWithStats(safe, connectivity=4)
+    parts = []
+    for label in (np.argsort(-stats[1:, cv2.CC_STAT_AREA], kind="stable") + 1).tolist():
+        if stats[label, cv2.CC_STAT_AREA] < min_area_px:
+            break
+        x, y, w, h = (int(v) for v in stats[label, :4])
+        dist = np.where(labels[y:y + h, x:x + w] == label, region.dist[y:y + h, x:x + w], 0)
+        parts.append((x, y, ClearanceMap(dist.astype(np.uint16), region.resolution)))
+    return parts
+
+def plan_region(map_path, resolution, labels, cell, vessel, planner="Boustrophedon Cells",
+                safety_margin=DEFAULT_SAFETY_MARGIN, launch=None, tolerance_m=DEFAULT_TOLERANCE_M,
+                turn_radius_m=0.0):
+    """
+    Coverage path of the region of one vessel, run in a worker process.
+    The map and its cached distance field are memory-mapped from map_path
+    rather than sent to the worker. Every part of the region is planned on
+    its own, the largest or the one nearest the launch point first, then
+    the one nearest the end of the path so far.
+    launch: optional launch point of the vessel, routed to the region first
+    Returns a dict with the vessel, its waypoints and its area in m2.
+    """
+    map_img = load_pgm(map_path)
+    clearance = ClearanceMap.load_or_compute(map_path, map_img, resolution)
+    result = {"vessel": vessel, "points": [], "area_m2": 0.0}
+    bounds = region_bounds(labels, vessel, cell, map_img.shape)
+    if bounds is None:
+        return result
+    x0, y0, x1, y1 = bounds
+    region = region_clearance(clearance, labels, vessel, cell, bounds)
+    result["area_m2"] = round(float(np.count_nonzero(region.safe_mask(safety_margin))) * resolution ** 2, 1)
+    parts = region_parts(region, safety_margin, MIN_PART_AREA_M2 / resolution ** 2)
+    if not parts:
+        return result
+    # Starts in map pixels
+    starts = [np.add(default_start(part, safety_margin), (x0 + x, y0 + y)) for x, y, part in parts]
+    pieces = []
+    position = launch
+    with timed("fleet.plan_region"):
+        while parts:
+            index = 0 if position is None else int(np.argmin([math.dist(position, start) for start in starts]))
+            x, y, part = parts.pop(index)
+            start = starts.pop(index) - (x0 + x, y0 + y)
+            part_map = np.where(part.dist > 0, 255, 0).astype(np.uint8)
+            # Regions already run in parallel, their sweep angles are evaluated in turn
+            points = plan_path(part_map, *start, planner=planner, clearance=part, safety_margin=safety_margin,
+                               tolerance_m=tolerance_m, turn_radius_m=turn_radius_m, workers=1)
+            pieces.append(np.asarray(points, dtype=np.float64).reshape(-1, 2) + (x0 + x, y0 + y))
+            position = pieces[-1][-1]
+    points = np.vstack(pieces)
+    if launch is not None:
+        # Transit from the launch point
+        points = np.vstack(([launch], points))
+    # Checked on the whole map, points a pixel past the part edge are fine.
+    # The moves between the parts and the launch transit are routed around land.
+    points = repair_path(clearance, points, safety_margin)
+    result["points"] = [tuple(point) for point in points.tolist()]
+    return result
+
+def partition(clearance, vessels, safety_margin=DEFAULT_SAFETY_MARGIN, launch_points=None,
+              method=None, max_cells=MAX_GRID_CELLS):
+    """
+    Split the safe water of a map between vessels
+    launch_points: optional (x, y) launch point of every vessel in pixels
+    method: "voronoi" (needs a launch point per vessel) or "bands", by
+        default voronoi when there are launch points for every vessel
+    Returns the labels grid (0 on land, vessel + 1 in the water) and its cell size in pixels.
+    """
+    cell = max(1, int(math.ceil(math.sqrt(clearance.width * clearance.height / max_cells))))
+    counts = safe_counts(clearance, safety_margin, cell)
+    launches = None
+    if launch_points is not None and len(launch_points) >= vessels:
+        launches = np.asarray(launch_points[:vessels], dtype=np.float64).reshape(-1, 2) / cell
+    if method is None:
+        method = "bands" if launches is None else "voronoi"
+    if method == "voronoi":
+        if launches is None:
+            raise ValueError("The voronoi split needs a launch point per vessel")
+        return split_voronoi(counts, launches), cell
+    if method != "bands":
+        raise ValueError(f"Unknown split method: {method}")
+    return split_bands(counts, vessels, None if launches is None else launches[:, 1]), cell
+
+def plan_fleet(map_path, vessels, planner="Boustrophedon Cells", resolution=0.05,
+               safety_margin=DEFAULT_SAFETY_MARGIN, launch_points=None, tolerance_m=DEFAULT_TOLERANCE_M,
+               turn_radius_m=0.0, method=None, workers=None, progress=None):
+    """
+    Split the free water of a map into one region per vessel, balanced by
+    area, and plan the coverage of every region in its own worker process
+    map_path: PGM map, its distance field is cached next to it
+    launch_points: optional (x, y) launch point of every vessel in pixels,
+        seeds the split and gets a route to the vessel's first waypoint
+    method: how the water is split, see partition
+    workers: processes to use, 1 plans in the calling process
+    progress: optional callback called with the fraction of regions planned
+    Returns one dict per vessel, in vessel order, with its "points" and "area_m2".
+    """
+    map_img = load_pgm(map_path)
+    # Computed once here, the workers memory-map the cached field
+    clearance = ClearanceMap.load_or_compute(map_path, map_img, resolution)
+    with timed("fleet.partition"):
+        labels, cell = partition(clearance, vessels, safety_margin, launch_points, method)
+    tasks = []
+    for vessel in range(vessels):
+        launch = None
+        if launch_points is not None and vessel < len(launch_points):
+            launch = tuple(float(v) for v in launch_points[vessel])
+        tasks.append((map_path, resolution, labels, cell, vessel, planner, safety_margin, launch,
+                      tolerance_m, turn_radius_m))
+    return run_in_processes(plan_region, tasks, workers, progress)
@@ -5,54 +5,43 @@ import cv2
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QGraphicsView, 
                             QGraphicsScene, QGraphicsPixmapItem, QVBoxLayout,
                             QWidget, QPushButton, QLabel, QHBoxLayout, QComboBox,
-                            QMessageBox, QLineEdit, QGridLayout)
+                            QMessageBox, QLineEdit, QGridLayout, QGraphicsItem,
+                            QProgressBar, QDoubleSpinBox, QSpinBox, QCheckBox, QTableWidget,
+                            QTableWidgetItem, QPlainTextEdit, QFileDialog, QHeaderView)
 from PyQt5.QtGui import QPixmap, QImage, QPen, QColor, QWheelEvent, QPainter
-from PyQt5.QtCore import Qt, QPointF
+from PyQt5.QtCore import Qt, QPointF, QRectF, QLineF, QTimer, pyqtSignal
 import math
 import os
 import json
+from collections import OrderedDict
 from datetime import datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from mapGenrating.map_data import get_available_maps, get_map_coordinates
-from mapGenrating.generatePGM_Map import generate_map
+from mapGenrating.map_data import get_available_maps, get_map_coordinates, get_catalog
+from mapGenrating.clearance import DEFAULT_SAFETY_MARGIN, ClearanceMap
+from mapGenrating.generatePGM_Map import (generate_map, export_gazebo_map,
+                                          get_polygon_utm_zone, get_border_thickness)
+from mapGenrating.instrumentation import capture, count, metrics, set_enabled, timed
+from mapGenrating.map_cache import MapCache, map_cache_key
+from mapGenrating.map_metadata import metadata_georeference, read_map_metadata
+from mapGenrating.pgm_io import load_pgm
+from pathPlannig.background_jobs import Job, JobPool
+from pathPlannig.coverage_eval import DEFAULT_SWATH_WIDTH, evaluate_paths_coverage
+from pathPlannig.coverage_planner import PLANNER_MODES, filter_navigable, plan_path
+from pathPlannig.fleet_planner import plan_fleet
+from pathPlannig.map_pyramid import MapPyramid
+from pathPlannig.path_validation import blocked_segments, first_blocked_segment, segment_is_blocked
+from pathPlannig.router import Router
+from pathPlannig.upload_queue import (UploadQueue, default_backend as default_upload_backend, plan_key,
+                                     vessel_key)
+from pathPlannig.user_auth import check_user_credentials
+from pathPlannig.waypoint_store import WaypointStore
 import subprocess
 
-# Firebase configuration (commented out - to be implemented manually)
-
-import firebase_admin
-from firebase_admin import credentials, db
-
-def initialize_firebase():
-    # Check if Firebase app is already initialized
-    if not firebase_admin._apps:
-        cred = credentials.Certificate("auth.json")
-        firebase_admin.initialize_app(cred, {
-            'databaseURL': 'https://oceancleaner-741db-default-rtdb.firebaseio.com'
-        })
-        
-def upload_waypoints_to_firebase(waypoints_data):
-    ref = db.reference('navigation/coverage_path_planning')
-    ref.push(waypoints_data)
-
-def check_user_credentials(username, password):
-    """Check user credentials against Firebase database"""
-    try:
-        initialize_firebase()
-        ref = db.reference('users')
-        users = ref.get()
-        
-        if not users:
-            return False, None
-            
-        for user_id, user_data in users.items():
-            if user_data.get('username') == username and user_data.get('password') == password:
-                # Check if user is admin
-                is_admin = user_data.get('privileges') == 'admin'
-                return True, is_admin
-        return False, None
-    except Exception as e:
-        print(f"Error checking credentials: {str(e)}")
-        return False, None
+# Path colors of the vessels of a fleet plan, reused when there are more vessels
+VESSEL_COLORS = [(0, 120, 255), (255, 140, 0), (200, 0, 200), (0, 200, 200), (255, 215, 0), (140, 70, 20)]
+# While the map pyramid is built, a level at most this much finer is drawn
+# instead of the one the zoom asks for, each level finer draws 4x the tiles
+MAX_FALLBACK_LEVELS = 1
 
 class LoginWindow(QMainWindow):
     def __init__(self):
@@ -254,192 +243,450 @@ class NavigationManager:
     def __init__(self, grid_size=0.5, resolution=0.05):
         self.grid_size = grid_size
         self.resolution = resolution
-        self.waypoints = []
+        self.waypoints = WaypointStore()  # Pixel coordinates with a spatial index
         self.map_img = None
         self.height = 0
         self.width = 0
         self.current_map_name = None
+        self.map_pyramid = None
+        self.map_metadata = None
+        self.georef = None  # UtmGeoreference of the map, for WGS84 waypoints
+        self.clearance = None  # ClearanceMap of the map
+        self.safety_margin = DEFAULT_SAFETY_MARGIN  # Meters kept from borders and land
+        self.router = None  # Router of the map, created on first use
+        self.map_path = None
+        self.vessel_waypoints = []  # One WaypointStore per vessel of a fleet plan
     
     def load_map(self, map_path):
         """Load a map from file"""
-        self.map_img = cv2.imread(map_path, cv2.IMREAD_GRAYSCALE)
+        with timed("load_map.read"):
+            try:
+                # Zero-copy read-only view of the PGM, shared with the planner
+                self.map_img = load_pgm(map_path)
+            except FileNotFoundError:
+                self.map_img = None
+            except ValueError:
+                # Not an 8-bit binary PGM, let OpenCV decode it
+                self.map_img = cv2.imread(map_path, cv2.IMREAD_GRAYSCALE)
         if self.map_img is None:
             raise FileNotFoundError(f"Could not load map file: {map_path}")
+        self.map_path = map_path
         self.height, self.width = self.map_img.shape
-        self.waypoints = []  # Clear waypoints when loading new map
+        # Georeference from the map YAML sidecar, when there is one
+        self.map_metadata = read_map_metadata(map_path)
+        self.georef = metadata_georeference(self.map_metadata)
+        # Distance field for the clearance checks, cached next to the map,
+        # at the resolution the map was generated with
+        resolution = self.resolution
+        if self.map_metadata and "resolution" in self.map_metadata:
+            resolution = float(self.map_metadata["resolution"])
+        with timed("load_map.clearance"):
+            self.clearance = ClearanceMap.load_or_compute(map_path, self.map_img, resolution)
+        self.router = None
+        # Downsampled levels for display, the window builds them in the background
+        self.map_pyramid = MapPyramid(self.map_img)
+        self.clear_waypoints()  # Clear waypoints when loading new map
         return True
     
     def add_waypoint(self, x, y):
-        if y < 0 or y >= self.height or x < 0 or x >= self.width:
-            return False
-        pixel_value = self.map_img[int(y)][int(x)]
-        if pixel_value != 255:  # Only white pixels (255) are navigable
+        if self.clearance is None or not self.clearance.is_safe(x, y, self.safety_margin):
             return False
-        self.waypoints.append(QPointF(x, y))
+        self.waypoints.append(x, y)
         return True
     
-    def remove_nearest_waypoint(self, x, y):
+    def get_router(self):
+        """Router of the map for the current safety margin"""
+        if self.router is None or self.router.safety_margin != self.safety_margin:
+            self.router = Router(self.clearance, self.safety_margin)
+        return self.router
+    
+    def add_routed_waypoint(self, x, y):
+        """
+        Append a waypoint, with the turns of the shortest route around land
+        from the previous waypoint before it. Returns the number of
+        waypoints added, 0 if (x, y) is not safe or cannot be reached.
+        """
         if not self.waypoints:
-            return
-        distances = [(p.x() - x)**2 + (p.y() - y)**2 for p in self.waypoints]
-        if distances:
-            nearest_idx = distances.index(min(distances))
-            del self.waypoints[nearest_idx]
+            return 1 if self.add_waypoint(x, y) else 0
+        if self.clearance is None or not self.clearance.is_safe(x, y, self.safety_margin):
+            return 0
+        route = self.get_router().route(self.waypoints[-1], (x, y))
+        if route is None:
+            return 0
+        self.waypoints.extend(route[1:])
+        return len(route) - 1
+    
+    def add_waypoints(self, points):
+        """
+        Append many (x, y) points at once, skipping those outside the map or
+        closer than the safety margin to borders and land. Returns the number of waypoints added.
+        """
+        if self.map_img is None:
+            return 0
+        navigable = filter_navigable(self.clearance, points, self.safety_margin)
+        self.waypoints.extend(navigable)
+        return len(navigable)
+    
+    def add_planned_path(self, points):
+        """
+        Append a planned path like add_waypoints, with the legs leaving the
+        safe water (the one from the last waypoint too) routed around land,
+        see coverage_planner.repair_path. Returns the number of waypoints added.
+        """
+        if self.map_img is None:
+            return 0
+        points = filter_navigable(self.clearance, points, self.safety_margin)
+        if self.waypoints and len(points):
+            # The last waypoint is kept as it is, only the legs after it are repaired
+            points = self.get_router().route_path(np.vstack(([self.waypoints[-1]], points)))[1:]
+        else:
+            points = self.get_router().route_path(points)
+        self.waypoints.extend(points)
+        return len(points)
+    
+    def remove_nearest_waypoint(self, x, y):
+        """Remove the waypoint closest to (x, y), returns its index or None"""
+        nearest_idx = self.waypoints.nearest(x, y)
+        if nearest_idx is not None:
+            self.waypoints.remove(nearest_idx)
+        return nearest_idx
     
     def clear_waypoints(self):
-        self.waypoints = []
+        self.waypoints.clear()
+        self.vessel_waypoints = []
+    
+    def set_vessel_paths(self, paths):
+        """Replace the fleet plan by one (n, 2) waypoint path per vessel"""
+        self.vessel_waypoints = []
+        for points in paths:
+            store = WaypointStore()
+            store.extend(points)
+            self.vessel_waypoints.append(store)
     
     def get_waypoints(self):
         return self.waypoints
     
-    def save_waypoints(self, filename="waypoints.yaml"):
-        if not self.waypoints:
-            return
-        waypoints_meters = []
-        for p in self.waypoints:
-            x = p.x() * self.resolution
-            y = (self.height - p.y()) * self.resolution
-            waypoints_meters.append((x, y))
-        with open(filename, "w") as f:
-            f.write("# Boat navigation waypoints\n")
-            f.write("waypoints:\n")
-            for i, (x, y) in enumerate(waypoints_meters):
-                f.write(f"  - point{x:.2f}_{y:.2f}:\n")
-                f.write(f"      x: {x:.2f}\n")
-                f.write(f"      y: {y:.2f}\n")
-                f.write(f"      name: wp{i+1}\n")
-    
-    def get_waypoints_data(self):
-        """Get waypoints data in a format suitable for Firebase"""
-        if not self.waypoints:
+    def blocked_legs(self):
+        """Indices of the legs between waypoints that leave the free water, leg i ending at waypoint i + 1"""
+        if self.clearance is None:
+            return np.empty(0, dtype=np.int64)
+        return blocked_segments(self.clearance, self.waypoints.xy)
+    
+    def leg_is_blocked(self, index):
+        """True if the leg from waypoint index to waypoint index + 1 leaves the free water"""
+        if self.clearance is None:
+            return False
+        return segment_is_blocked(self.clearance, self.waypoints[index], self.waypoints[index + 1])
+    
+    def first_blocked_leg(self):
+        """Index of the first leg leaving the free water, None if the whole path is in water"""
+        if self.clearance is None:
+            return None
+        return first_blocked_segment(self.clearance, self.waypoints.xy)
+    
+    def save_waypoints(self, filename="waypoints.yaml", wgs84=False):
+        """Write the waypoints, and every vessel path of a fleet plan to <name>_vessel<n>.yaml"""
+        georef = self.georef if wgs84 else None
+        if self.waypoints:
+            with open(filename, "w") as f:
+                f.write(self.waypoints.to_yaml(self.resolution, self.height, georef=georef))
+        base, ext = os.path.splitext(filename)
+        for vessel, waypoints in enumerate(self.vessel_waypoints):
+            with open(f"{base}_vessel{vessel + 1}{ext}", "w") as f:
+                f.write(waypoints.to_yaml(self.resolution, self.height, georef=georef))
+    
+    def get_waypoints_data(self, vessel=None):
+        """
+        Get waypoints data in a format suitable for Firebase
+        vessel: index of a vessel of the fleet plan, instead of the waypoints
+        """
+        waypoints = self.waypoints if vessel is None else self.vessel_waypoints[vessel]
+        if not waypoints:
             return None
             
-        waypoints_meters = []
-        for i, p in enumerate(self.waypoints, 1):  # Start enumeration from 1
-            x = p.x() * self.resolution
-            y = (self.height - p.y()) * self.resolution
-            waypoints_meters.append({
-                "point_number": i,
-                "point_name": f"point{i}",
-                "x": round(x, 2),
-                "y": round(y, 2)
-            })
+        # Also in WGS84 when the map is georeferenced
+        waypoints_meters = waypoints.to_records(self.resolution, self.height, georef=self.georef)
             
-        return {
+        data = {
             "map_name": self.current_map_name,
             "timestamp": datetime.now().isoformat(),
             "waypoints": waypoints_meters,
             "resolution": self.resolution,
             "grid_size": self.grid_size
         }
+        if vessel is not None:
+            data["vessel"] = vessel + 1
+            data["vessels"] = len(self.vessel_waypoints)
+        return data
 
-class CoveragePathPlanner:
-    def __init__(self, map_img):
-        self.map_img = map_img
-        self.height, self.width = map_img.shape
-    
-    def get_navigable_range(self, y):
-        y_int = int(round(y))
-        if y_int < 0 or y_int >= self.height:
-            return None, None
-        x_min = None
-        x_max = None
-        for x in range(self.width):
-            if self.map_img[y_int, x] == 255:
-                if x_min is None:
-                    x_min = x
-                x_max = x
-        return x_min, x_max
-    
-    def generate_path(self, x0, y0):
-        points = [(float(x0), float(y0))]
-        x_current = float(x0)
-        y_current = float(y0)
-        direction = 1.0  # 1.0 for right, -1.0 for left
-        min_step = 10.0  # Minimum 0.5m (10 pixels)
-        vertical_step = 60.0  # 60 pixels = 3m
-        while True:
-            # Get navigable range for current y
-            y_int = int(round(y_current))
-            if y_int < 0 or y_int >= self.height:
-                break
-            x_min, x_max = self.get_navigable_range(y_current)
-            if x_min is None or x_max is None:
-                break
-            # Calculate dynamic spacing based on navigable width
-            if direction > 0:
-                x_start = max(x_current, x_min + 20)  # Start at least 1m from left border
-                x_end = x_max - 10  # Stop 0.5m from right border
-                if x_end <= x_start:
-                    break
-                available_width = x_end - x_start
-                num_points = min(4, int(available_width // min_step) + 1)  # Up to 4 points
-                if num_points > 1:
-                    step = available_width / (num_points - 1)
-                    for i in range(num_points):
-                        x_candidate = x_start + i * step
-                        x_int = int(round(x_candidate))
-                        y_int = int(round(y_current))
-                        if 0 <= x_int < self.width and self.map_img[y_int, x_int] == 255:
-                            points.append((x_candidate, y_current))
-                        else:
-                            break
-                    if len(points) > len(points) - num_points:
-                        x_current = points[-1][0]
-                elif num_points == 1:
-                    x_candidate = x_start
-                    x_int = int(round(x_candidate))
-                    y_int = int(round(y_current))
-                    if 0 <= x_int < self.width and self.map_img[y_int, x_int] == 255:
-                        points.append((x_candidate, y_current))
-                        x_current = x_candidate
-            else:
-                x_start = min(x_current, x_max - 20)  # Start at least 1m from right border
-                x_end = x_min + 10  # Stop 0.5m from left border
-                if x_end >= x_start:
-                    break
-                available_width = x_start - x_end
-                num_points = min(4, int(available_width // min_step) + 1)  # Up to 4 points
-                if num_points > 1:
-                    step = available_width / (num_points - 1)
-                    for i in range(num_points):
-                        x_candidate = x_start - i * step
-                        x_int = int(round(x_candidate))
-                        y_int = int(round(y_current))
-                        if 0 <= x_int < self.width and self.map_img[y_int, x_int] == 255:
-                            points.append((x_candidate, y_current))
-                        else:
-                            break
-                    if len(points) > len(points) - num_points:
-                        x_current = points[-1][0]
-                elif num_points == 1:
-                    x_candidate = x_start
-                    x_int = int(round(x_candidate))
-                    y_int = int(round(y_current))
-                    if 0 <= x_int < self.width and self.map_img[y_int, x_int] == 255:
-                        points.append((x_candidate, y_current))
-                        x_current = x_candidate
-            # Move up
-            y_next = y_current - vertical_step
-            if y_next < 0:
-                break
-            # Check if there's navigable area at y_next
-            x_min_next, x_max_next = self.get_navigable_range(y_next)
-            if x_min_next is None or x_max_next is None:
-                break
-            points.append((x_current, y_next))
-            y_current = y_next
-            direction = -direction
-        return points
+class MapTileItem(QGraphicsItem):
+    """Draws a map from its MapPyramid, only the tiles exposed at the current zoom level"""
+    def __init__(self, pyramid, cache_size=256):
+        super().__init__()
+        self.pyramid = pyramid
+        self.cache_size = cache_size
+        self.tile_cache = OrderedDict()  # (level, tx, ty) -> QPixmap, least recently used first
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption)
+        # Grey levels as RGB, with occupied (0) border pixels in red
+        self.lut = np.repeat(np.arange(256, dtype=np.uint8)[:, None], 3, axis=1)
+        self.lut[0] = (255, 0, 0)
+    
+    def boundingRect(self):
+        return QRectF(0, 0, self.pyramid.width, self.pyramid.height)
+    
+    def tile_pixmap(self, level, tx, ty):
+        key = (level, tx, ty)
+        pixmap = self.tile_cache.get(key)
+        if pixmap is not None:
+            self.tile_cache.move_to_end(key)
+            return pixmap
+        count("scene.tiles_rendered")
+        rgb = np.ascontiguousarray(self.lut[self.pyramid.tile(level, tx, ty)])
+        height, width = rgb.shape[:2]
+        qimg = QImage(rgb.data, width, height, 3 * width, QImage.Format_RGB888)
+        pixmap = QPixmap.fromImage(qimg.copy())
+        self.tile_cache[key] = pixmap
+        if len(self.tile_cache) > self.cache_size:
+            self.tile_cache.popitem(last=False)
+        return pixmap
+    
+    def paint(self, painter, option, widget=None):
+        lod = option.levelOfDetailFromTransform(painter.worldTransform())
+        exposed = option.exposedRect.intersected(self.boundingRect())
+        if exposed.isEmpty():
+            return
+        # Levels are built by a background job, never here in the GUI thread
+        wanted = self.pyramid.level_for_scale(lod)
+        level = self.pyramid.built_level(wanted)
+        if wanted - level > MAX_FALLBACK_LEVELS:
+            # Unknown (205) until the level is built, update() repaints then
+            painter.fillRect(exposed, QColor(205, 205, 205))
+            return
+        scale = 2 ** level
+        span = self.pyramid.tile_size * scale  # Scene pixels covered by one tile
+        cols, rows = self.pyramid.tile_grid(level)
+        tx0 = max(int(exposed.left() // span), 0)
+        tx1 = min(int(exposed.right() // span), cols - 1)
+        ty0 = max(int(exposed.top() // span), 0)
+        ty1 = min(int(exposed.bottom() // span), rows - 1)
+        # Coarse tiles may overhang the map by less than one level pixel
+        painter.setClipRect(self.boundingRect(), Qt.IntersectClip)
+        for ty in range(ty0, ty1 + 1):
+            for tx in range(tx0, tx1 + 1):
+                pixmap = self.tile_pixmap(level, tx, ty)
+                target = QRectF(tx * span, ty * span, pixmap.width() * scale, pixmap.height() * scale)
+                painter.drawPixmap(target, pixmap, QRectF(pixmap.rect()))
+
+class GridItem(QGraphicsItem):
+    """Grid overlay drawing only the lines in the exposed area, hidden when too dense to see"""
+    def __init__(self, width, height, spacing, pen, min_screen_spacing=4):
+        super().__init__()
+        self.width = width
+        self.height = height
+        self.spacing = spacing
+        self.pen = pen
+        self.min_screen_spacing = min_screen_spacing
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption)
+    
+    def boundingRect(self):
+        return QRectF(0, 0, self.width, self.height)
+    
+    def paint(self, painter, option, widget=None):
+        if self.spacing <= 0:
+            return
+        lod = option.levelOfDetailFromTransform(painter.worldTransform())
+        if self.spacing * lod < self.min_screen_spacing:
+            return
+        exposed = option.exposedRect.intersected(self.boundingRect())
+        x_first = int(math.ceil(exposed.left() / self.spacing)) * self.spacing
+        y_first = int(math.ceil(exposed.top() / self.spacing)) * self.spacing
+        lines = [QLineF(x, 0, x, self.height)
+                 for x in range(x_first, min(int(exposed.right()) + 1, self.width), self.spacing)]
+        lines += [QLineF(0, y, self.width, y)
+                  for y in range(y_first, min(int(exposed.bottom()) + 1, self.height), self.spacing)]
+        painter.setPen(self.pen)
+        painter.drawLines(lines)
+
+class PathItem(QGraphicsItem):
+    """
+    Whole waypoint path (legs, direction arrows, markers and labels) drawn by a
+    single item with batched drawLines calls. Leg and arrow geometry is cached
+    and updated incrementally when one waypoint is added or removed.
+    """
+    def __init__(self, resolution, label_margin=120, color=(0, 255, 0)):
+        super().__init__()
+        self.resolution = resolution
+        self.label_margin = label_margin  # Room for text labels around the points
+        self.points = np.empty((0, 2), dtype=np.float64)
+        self.leg_lines = []    # One QLineF per leg
+        self.leg_arrows = []   # Per leg: shaft and two head strokes (empty for zero length legs)
+        self.arrow_lines = None  # Flattened leg_arrows, rebuilt lazily after changes
+        self.leg_blocked = []  # Per leg: True if it leaves the free water
+        self.blocked_lines = None  # Lines of the blocked legs, rebuilt lazily after changes
+        self.bounds = QRectF()
+        self.path_pen = QPen(QColor(*color))  # Green lines for the path by default
+        self.path_pen.setWidth(2)
+        self.arrow_pen = QPen(Qt.black)
+        self.blocked_pen = QPen(QColor(255, 0, 0))  # Red over legs crossing land
+        self.blocked_pen.setWidth(3)
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption)
+        self.setZValue(1)  # Above the coverage heatmap
+    
+    @staticmethod
+    def leg_geometry(p1, p2):
+        """Leg line and arrow strokes at the leg middle"""
+        leg = QLineF(p1[0], p1[1], p2[0], p2[1])
+        dx = p2[0] - p1[0]
+        dy = p2[1] - p1[1]
+        length = math.sqrt(dx**2 + dy**2)
+        if length == 0:
+            return leg, []
+        dx /= length
+        dy /= length
+        mid_x = (p1[0] + p2[0]) / 2
+        mid_y = (p1[1] + p2[1]) / 2
+        arrow_length = 10
+        arrow_size = 5
+        end_x = mid_x + arrow_length / 2 * dx
+        end_y = mid_y + arrow_length / 2 * dy
+        angle = math.atan2(dy, dx)
+        return leg, [
+            QLineF(mid_x - arrow_length / 2 * dx, mid_y - arrow_length / 2 * dy, end_x, end_y),
+            QLineF(end_x, end_y,
+                   end_x - arrow_size * math.cos(angle + math.pi / 6),
+                   end_y - arrow_size * math.sin(angle + math.pi / 6)),
+            QLineF(end_x, end_y,
+                   end_x - arrow_size * math.cos(angle - math.pi / 6),
+                   end_y - arrow_size * math.sin(angle - math.pi / 6)),
+        ]
+    
+    def update_bounds(self):
+        self.prepareGeometryChange()
+        if len(self.points) == 0:
+            self.bounds = QRectF()
+            return
+        x_min, y_min = self.points.min(axis=0)
+        x_max, y_max = self.points.max(axis=0)
+        m = self.label_margin
+        self.bounds = QRectF(x_min - m, y_min - m, x_max - x_min + 2 * m, y_max - y_min + 2 * m)
+    
+    def set_points(self, points, blocked=()):
+        """
+        Replace the whole path
+        blocked: indices of the legs leaving the free water
+        """
+        self.points = np.array(points, dtype=np.float64).reshape(-1, 2)
+        geometry = [self.leg_geometry(p1, p2) for p1, p2 in zip(self.points[:-1], self.points[1:])]
+        self.leg_lines = [leg for leg, _ in geometry]
+        self.leg_arrows = [arrows for _, arrows in geometry]
+        self.leg_blocked = [False] * len(self.leg_lines)
+        for i in blocked:
+            self.leg_blocked[i] = True
+        self.arrow_lines = None
+        self.blocked_lines = None
+        self.update_bounds()
+        self.update()
+    
+    def append_point(self, x, y, blocked=False):
+        """
+        Add a waypoint at the end of the path
+        blocked: True if the leg to the new waypoint leaves the free water
+        """
+        self.points = np.vstack((self.points, [[x, y]]))
+        if len(self.points) > 1:
+            leg, arrows = self.leg_geometry(self.points[-2], self.points[-1])
+            self.leg_lines.append(leg)
+            self.leg_arrows.append(arrows)
+            self.leg_blocked.append(blocked)
+            self.arrow_lines = None
+            self.blocked_lines = None
+        self.update_bounds()
+        self.update()
+    
+    def remove_point(self, index, blocked=False):
+        """
+        Remove waypoint index, joining its neighbours with a single leg
+        blocked: True if that joining leg leaves the free water
+        """
+        n = len(self.points)
+        if index < 0 or index >= n:
+            return
+        self.points = np.delete(self.points, index, axis=0)
+        # Legs index-1 (into the point) and index (out of it) are replaced
+        first_leg = max(index - 1, 0)
+        last_leg = min(index, n - 2)
+        replacement = []
+        if 0 < index < n - 1:
+            replacement = [self.leg_geometry(self.points[index - 1], self.points[index])]
+        self.leg_lines[first_leg:last_leg + 1] = [leg for leg, _ in replacement]
+        self.leg_arrows[first_leg:last_leg + 1] = [arrows for _, arrows in replacement]
+        self.leg_blocked[first_leg:last_leg + 1] = [blocked] * len(replacement)
+        self.arrow_lines = None
+        self.blocked_lines = None
+        self.update_bounds()
+        self.update()
+    
+    def boundingRect(self):
+        return self.bounds
+    
+    def paint(self, painter, option, widget=None):
+        if len(self.points) == 0:
+            return
+        lod = option.levelOfDetailFromTransform(painter.worldTransform())
+        exposed = option.exposedRect
+        
+        painter.setPen(self.path_pen)
+        painter.drawLines(self.leg_lines)
+        if self.blocked_lines is None:
+            self.blocked_lines = [leg for leg, blocked in zip(self.leg_lines, self.leg_blocked) if blocked]
+        if self.blocked_lines:
+            painter.setPen(self.blocked_pen)
+            painter.drawLines(self.blocked_lines)
+        if self.arrow_lines is None:
+            self.arrow_lines = [line for arrows in self.leg_arrows for line in arrows]
+        painter.setPen(self.arrow_pen)
+        painter.drawLines(self.arrow_lines)
+        
+        # Markers and labels only for the points in the exposed area
+        visible = np.flatnonzero(
+            (self.points[:, 0] >= exposed.left() - self.label_margin) &
+            (self.points[:, 0] <= exposed.right() + self.label_margin) &
+            (self.points[:, 1] >= exposed.top() - self.label_margin) &
+            (self.points[:, 1] <= exposed.bottom() + self.label_margin))
+        marker_color = QColor(0, 100, 0)  # Other waypoints in darker green
+        painter.setPen(QPen(marker_color))
+        painter.setBrush(marker_color)
+        for i in visible[visible > 0]:
+            painter.drawEllipse(QPointF(*self.points[i]), 5, 5)
+        if visible.size and visible[0] == 0:
+            # Starting point (first waypoint) in blue
+            painter.setPen(QPen(Qt.blue))
+            painter.setBrush(QColor(0, 0, 255))
+            painter.drawEllipse(QPointF(*self.points[0]), 5, 5)
+        
+        # Text stays unreadable (and slow) when zoomed far out
+        if lod < 0.5:
+            return
+        painter.setPen(QPen(Qt.red))
+        for i in visible:
+            x, y = self.points[i]
+            painter.drawText(QRectF(x + 10, y - 10, 100, 30), Qt.AlignLeft | Qt.AlignTop, str(i + 1))
+        painter.setPen(QPen(Qt.black))
+        for i in visible[visible < len(self.leg_lines)]:
+            leg = self.leg_lines[i]
+            dist_m = leg.length() * self.resolution
+            mid = leg.center()
+            painter.drawText(QRectF(mid.x(), mid.y() - 10, 100, 30), Qt.AlignLeft | Qt.AlignTop,
+                             f"{dist_m:.2f} m")
 
 class PathVisualizer:
     def __init__(self, scene, navigation_manager):
         self.scene = scene
         self.nav_manager = navigation_manager
         self.grid_items = []
-        self.waypoint_items = []
-        self.path_items = []
-        self.arrow_items = []
+        self.path_item = None
+        self.coverage_item = None
+        self.vessel_items = []  # One PathItem per vessel of a fleet plan
     
     def clear_all(self):
         """Clear all visual elements from the scene"""
@@ -450,23 +697,12 @@ class PathVisualizer:
                     self.scene.removeItem(item)
             self.grid_items.clear()
             
-            # Clear waypoint items
-            for item in self.waypoint_items:
-                if item and item.scene():
-                    self.scene.removeItem(item)
-            self.waypoint_items.clear()
-            
-            # Clear path items
-            for item in self.path_items:
-                if item and item.scene():
-                    self.scene.removeItem(item)
-            self.path_items.clear()
-            
-            # Clear arrow items
-            for item in self.arrow_items:
-                if item and item.scene():
-                    self.scene.removeItem(item)
-            self.arrow_items.clear()
+            # Clear the path item
+            if self.path_item and self.path_item.scene():
+                self.scene.removeItem(self.path_item)
+            self.path_item = None
+            self.hide_coverage()
+            self.clear_vessel_paths()
         except Exception as e:
             print(f"Error clearing items: {str(e)}")
     
@@ -480,110 +716,72 @@ class PathVisualizer:
         
         grid_spacing_px = int(self.nav_manager.grid_size / self.nav_manager.resolution)
         
-        for x in range(0, self.nav_manager.width, grid_spacing_px):
-            line = self.scene.addLine(x, 0, x, self.nav_manager.height, pen)
-            self.grid_items.append(line)
-        
-        for y in range(0, self.nav_manager.height, grid_spacing_px):
-            line = self.scene.addLine(0, y, self.nav_manager.width, y, pen)
-            self.grid_items.append(line)
+        # One item drawing only the visible lines instead of an item per line
+        grid = GridItem(self.nav_manager.width, self.nav_manager.height, grid_spacing_px, pen)
+        self.scene.addItem(grid)
+        self.grid_items.append(grid)
     
-    def draw_waypoints(self):
-        for item in self.waypoint_items:
-            self.scene.removeItem(item)
-        self.waypoint_items.clear()
-        
-        for i, point in enumerate(self.nav_manager.get_waypoints()):
-            # Starting point (first waypoint) in blue
-            if i == 0:
-                circle = self.scene.addEllipse(point.x()-5, point.y()-5, 10, 10, 
-                                             QPen(Qt.blue), QColor(0, 0, 255))
-            else:
-                # Other waypoints in darker green
-                circle = self.scene.addEllipse(point.x()-5, point.y()-5, 10, 10, 
-                                             QPen(QColor(0, 100, 0)), QColor(0, 100, 0))
-            self.waypoint_items.append(circle)
-            
-            text = self.scene.addText(str(i+1))
-            text.setPos(point.x()+10, point.y()-10)
-            text.setDefaultTextColor(Qt.red)
-            self.waypoint_items.append(text)
+    def ensure_path_item(self):
+        if self.path_item is None:
+            self.path_item = PathItem(self.nav_manager.resolution)
+            self.scene.addItem(self.path_item)
+        return self.path_item
     
-    def draw_path(self):
-        for item in self.path_items:
-            self.scene.removeItem(item)
-        self.path_items.clear()
-        
+    def waypoint_added(self, count=1):
+        """Draw the count waypoints just appended to the navigation manager"""
         waypoints = self.nav_manager.get_waypoints()
-        if len(waypoints) < 2:
-            return
-        
-        pen = QPen(QColor(0, 255, 0))  # Green lines for path
-        pen.setWidth(2)
-        
-        for i in range(len(waypoints) - 1):
-            p1 = waypoints[i]
-            p2 = waypoints[i+1]
-            line = self.scene.addLine(p1.x(), p1.y(), p2.x(), p2.y(), pen)
-            self.path_items.append(line)
-            dx = p2.x() - p1.x()
-            dy = p2.y() - p1.y()
-            dist_px = math.sqrt(dx**2 + dy**2)
-            dist_m = dist_px * self.nav_manager.resolution
-            mid_x = (p1.x() + p2.x()) / 2
-            mid_y = (p1.y() + p2.y()) / 2
-            text = self.scene.addText(f"{dist_m:.2f} m")
-            text.setPos(mid_x, mid_y - 10)
-            text.setDefaultTextColor(Qt.black)
-            self.path_items.append(text)
-    
-    def draw_arrows(self):
-        for item in self.arrow_items:
-            self.scene.removeItem(item)
-        self.arrow_items.clear()
-        waypoints = self.nav_manager.get_waypoints()
-        if len(waypoints) < 2:
-            return
-        for i in range(len(waypoints) - 1):
-            p1 = waypoints[i]
-            p2 = waypoints[i+1]
-            mid_x = (p1.x() + p2.x()) / 2
-            mid_y = (p1.y() + p2.y()) / 2
-            dx = p2.x() - p1.x()
-            dy = p2.y() - p1.y()
-            length = math.sqrt(dx**2 + dy**2)
-            if length == 0:
-                continue
-            dx /= length
-            dy /= length
-            arrow_length = 10
-            arrow_start_x = mid_x - arrow_length / 2 * dx
-            arrow_start_y = mid_y - arrow_length / 2 * dy
-            arrow_end_x = mid_x + arrow_length / 2 * dx
-            arrow_end_y = mid_y + arrow_length / 2 * dy
-            shaft = self.scene.addLine(arrow_start_x, arrow_start_y,
-                                      arrow_end_x, arrow_end_y,
-                                      QPen(Qt.black))
-            self.arrow_items.append(shaft)
-            arrow_size = 5
-            angle = math.atan2(dy, dx)
-            head1_x = arrow_end_x - arrow_size * math.cos(angle + math.pi / 6)
-            head1_y = arrow_end_y - arrow_size * math.sin(angle + math.pi / 6)
-            head2_x = arrow_end_x - arrow_size * math.cos(angle - math.pi / 6)
-            head2_y = arrow_end_y - arrow_size * math.sin(angle - math.pi / 6)
-            head1 = self.scene.addLine(arrow_end_x, arrow_end_y,
-                                      head1_x, head1_y,
-                                      QPen(Qt.black))
-            head2 = self.scene.addLine(arrow_end_x, arrow_end_y,
-                                      head2_x, head2_y,
-                                      QPen(Qt.black))
-            self.arrow_items.append(head1)
-            self.arrow_items.append(head2)
+        for index in range(len(waypoints) - count, len(waypoints)):
+            x, y = waypoints[index]
+            blocked = index > 0 and self.nav_manager.leg_is_blocked(index - 1)
+            self.ensure_path_item().append_point(x, y, blocked)
+    
+    def waypoint_removed(self, index):
+        """Drop waypoint index from the drawing"""
+        # The neighbours of the removed waypoint are now joined by leg index - 1
+        blocked = 0 < index < len(self.nav_manager.get_waypoints()) and \
+            self.nav_manager.leg_is_blocked(index - 1)
+        self.ensure_path_item().remove_point(index, blocked)
     
     def update_display(self):
-        self.draw_waypoints()
-        self.draw_path()
-        self.draw_arrows()
+        """Redraw the whole path from the navigation manager"""
+        with timed("scene.update_display"):
+            self.ensure_path_item().set_points(self.nav_manager.get_waypoints().xy,
+                                               self.nav_manager.blocked_legs())
+    
+    def clear_vessel_paths(self):
+        for item in self.vessel_items:
+            if item.scene():
+                self.scene.removeItem(item)
+        self.vessel_items = []
+    
+    def update_vessel_display(self):
+        """Redraw the vessel paths of the fleet plan, each in its own color"""
+        self.clear_vessel_paths()
+        for vessel, waypoints in enumerate(self.nav_manager.vessel_waypoints):
+            item = PathItem(self.nav_manager.resolution, color=VESSEL_COLORS[vessel % len(VESSEL_COLORS)])
+            blocked = blocked_segments(self.nav_manager.clearance, waypoints.xy)
+            item.set_points(waypoints.xy, blocked)
+            self.scene.addItem(item)
+            self.vessel_items.append(item)
+    
+    def show_coverage(self, evaluation):
+        """Draw the heatmap of a CoverageEvaluation over the map, below the path"""
+        rgba = np.ascontiguousarray(evaluation.heatmap())
+        height, width = rgba.shape[:2]
+        image = QImage(rgba.data, width, height, 4 * width, QImage.Format_RGBA8888)
+        # fromImage copies the pixels, rgba can go away afterwards
+        pixmap = QPixmap.fromImage(image)
+        if self.coverage_item is None:
+            self.coverage_item = QGraphicsPixmapItem()
+            self.coverage_item.setZValue(0.5)
+            self.scene.addItem(self.coverage_item)
+        self.coverage_item.setPixmap(pixmap)
+        self.coverage_item.setScale(evaluation.cell)
+    
+    def hide_coverage(self):
+        if self.coverage_item and self.coverage_item.scene():
+            self.scene.removeItem(self.coverage_item)
+        self.coverage_item = None
 
 class CustomGraphicsView(QGraphicsView):
     def __init__(self, scene):
@@ -591,6 +789,8 @@ class CustomGraphicsView(QGraphicsView):
         self.setMouseTracking(True)
         self.setTransformationAnchor(QGraphicsView.AnchorUnderMouse)
         self.setResizeAnchor(QGraphicsView.AnchorUnderMouse)
+        # Repaint only the exposed region so only visible map tiles are drawn
+        self.setViewportUpdateMode(QGraphicsView.SmartViewportUpdate)
         self.nav_manager = None  # Will be set by MapNavigator
     
     def set_nav_manager(self, nav_manager):
@@ -633,7 +833,129 @@ class CustomGraphicsView(QGraphicsView):
         else:
             super().mousePressEvent(event)
 
+class MetricsPanel(QWidget):
+    """
+    Debug window with the timings and counters of mapGenrating.instrumentation,
+    refreshed every second while shown, and the hottest functions of the last
+    profiled stage
+    """
+    def __init__(self, profile_dir, parent=None):
+        super().__init__(parent, Qt.Window)
+        self.setWindowTitle("Metrics")
+        self.resize(640, 520)
+        self.profile_dir = profile_dir  # Where the .prof files go when profiling
+        layout = QVBoxLayout(self)
+        
+        controls = QHBoxLayout()
+        self.enabled_check = QCheckBox("Collect metrics")
+        self.enabled_check.setChecked(metrics.enabled)
+        self.enabled_check.toggled.connect(self.apply_settings)
+        self.profile_check = QCheckBox("Profile stages")
+        self.profile_check.setToolTip("cProfile and tracemalloc over map generation and path planning, "
+                                      f"saved to {profile_dir}")
+        self.profile_check.setChecked(metrics.profile_dir is not None)
+        self.profile_check.toggled.connect(self.apply_settings)
+        self.profile_check.setEnabled(metrics.enabled)
+        self.reset_btn = QPushButton("Reset")
+        self.reset_btn.clicked.connect(self.reset)
+        self.save_btn = QPushButton("Save JSON")
+        self.save_btn.clicked.connect(self.save)
+        controls.addWidget(self.enabled_check)
+        controls.addWidget(self.profile_check)
+        controls.addStretch()
+        controls.addWidget(self.reset_btn)
+        controls.addWidget(self.save_btn)
+        layout.addLayout(controls)
+        
+        self.table = QTableWidget(0, 5)
+        self.table.setHorizontalHeaderLabels(["Stage / counter", "Calls", "Total ms", "Mean ms", "Max ms"])
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.verticalHeader().hide()
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.table, 2)
+        
+        self.profile_text = QPlainTextEdit()
+        self.profile_text.setReadOnly(True)
+        self.profile_text.setPlaceholderText("Profiles of the captured stages show up here")
+        layout.addWidget(self.profile_text, 1)
+        
+        self.timer = QTimer(self)
+        self.timer.setInterval(1000)
+        self.timer.timeout.connect(self.refresh)
+    
+    def showEvent(self, event):
+        self.refresh()
+        self.timer.start()
+        super().showEvent(event)
+    
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+    
+    def apply_settings(self):
+        enabled = self.enabled_check.isChecked()
+        set_enabled(enabled, self.profile_dir if self.profile_check.isChecked() else None)
+        self.profile_check.setEnabled(enabled)
+        self.refresh()
+    
+    def reset(self):
+        metrics.reset()
+        self.refresh()
+    
+    def save(self):
+        default = os.path.join(os.path.dirname(self.profile_dir),
+                               f"metrics-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+        path, _ = QFileDialog.getSaveFileName(self, "Save metrics", default, "JSON files (*.json)")
+        if path:
+            metrics.dump(path)
+    
+    def refresh(self):
+        snapshot = metrics.snapshot()
+        rows = [(name, timing["calls"], timing["total_s"], timing["mean_s"], timing["max_s"])
+                for name, timing in snapshot["timings"].items()]
+        rows += [(name, value, None, None, None) for name, value in snapshot["counters"].items()]
+        self.table.setRowCount(len(rows))
+        for row, (name, calls, total, mean, longest) in enumerate(rows):
+            values = [name, str(calls)] + ["" if value is None else f"{value * 1e3:.1f}"
+                                           for value in (total, mean, longest)]
+            for column, value in enumerate(values):
+                self.table.setItem(row, column, QTableWidgetItem(value))
+        if snapshot["profiles"]:
+            profile = snapshot["profiles"][-1]
+            self.profile_text.setPlainText(f"{profile['name']} | peak {profile['peak_mb']:.1f} MB traced | "
+                                           f"{profile['path']}\n{profile['top']}")
+
+def generate_map_with_clearance(coordinates, output_path, resolution, border_width, progress=None):
+    """
+    generate_map followed by the distance field of the map, for the map job.
+    The map is exported to Gazebo separately, once it is shown.
+    """
+    with capture("generate_map"):
+        map_path = generate_map(coordinates, output_path=output_path, resolution=resolution,
+                                border_width=border_width, export_gazebo=False,
+                                progress=(lambda fraction: progress(0.5 * fraction)) if progress else None)
+        # The slowest stage on large maps, reports and checks for cancel every band
+        ClearanceMap.load_or_compute(map_path, load_pgm(map_path), resolution,
+                                     progress=(lambda fraction: progress(0.5 + 0.5 * fraction)) if progress else None)
+    if progress:
+        progress(1.0)
+    return map_path
+
+def generate_cached_map(map_cache, cache_key, coordinates, resolution, border_width, progress=None):
+    """generate_map_with_clearance into the map cache, a failed or cancelled generation leaves no files"""
+    with map_cache.writing(cache_key) as output_path:
+        return generate_map_with_clearance(coordinates, output_path, resolution, border_width, progress)
+
+def export_gazebo_job(map_path, progress=None):
+    """export_gazebo_map for a job, copying a large map takes a while"""
+    export_gazebo_map(map_path)
+
 class MapNavigator(QMainWindow):
+    # Emitted from the catalog refresh thread, delivered in the GUI thread
+    catalog_changed = pyqtSignal()
+    # Emitted from the upload thread: plan key, status, message
+    upload_status = pyqtSignal(str, str, str)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Boat Navigation Waypoint Planner")
@@ -642,6 +964,9 @@ class MapNavigator(QMainWindow):
         # Create maps directory if it doesn't exist
         self.maps_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "maps")
         os.makedirs(self.maps_dir, exist_ok=True)
+        # Generated maps are cached by content under maps/cache
+        self.map_cache = MapCache(os.path.join(self.maps_dir, "cache"))
+        self.border_width = 0.5  # 50cm border around the area
         
         self.nav_manager = NavigationManager(grid_size=0.5, resolution=0.05)
         self.current_map_name = None
@@ -655,7 +980,33 @@ class MapNavigator(QMainWindow):
         # Flag to track if mission has been started
         self.mission_started = False
         
+        # Map generation and path planning run on worker threads, at most
+        # one job of each kind at a time
+        self.job_pool = JobPool()
+        # Gazebo exports run one at a time, so the last map shown is the one exported
+        self.export_pool = JobPool(max_workers=1)
+        # Coarse map levels are built on their own thread, a running plan
+        # does not delay the zoomed out display
+        self.pyramid_pool = JobPool(max_workers=1)
+        self.map_job = None
+        self.path_job = None
+        self.pyramid_job = None
+        
         self.init_ui()
+        
+        # The selector starts from the local catalog snapshot, maps added
+        # or changed remotely show up once the background refresh is done
+        self.catalog_changed.connect(self.update_map_selector)
+        catalog = get_catalog()
+        catalog.add_listener(lambda _catalog: self.catalog_changed.emit())
+        catalog.refresh_async()
+        
+        # Waypoint uploads go through a persistent outbox, plans left over
+        # from a previous run are sent as well
+        self.upload_queue = UploadQueue(os.path.join(self.maps_dir, "outbox"), default_upload_backend())
+        self.upload_status.connect(self.on_upload_status)
+        self.upload_queue.add_listener(self.upload_status.emit)
+        self.upload_queue.start()
     
     def init_ui(self):
         central_widget = QWidget()
@@ -675,6 +1026,11 @@ class MapNavigator(QMainWindow):
         self.generate_map_btn = QPushButton("Generate Map")
         self.generate_map_btn.clicked.connect(self.generate_selected_map)
         
+        # Cancel button for the background map generation and path planning
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.clicked.connect(self.cancel_jobs)
+        self.cancel_btn.setEnabled(False)
+        
         # Add upload waypoints button (next to generate map)
         self.upload_btn = QPushButton("Upload Waypoints")
         self.upload_btn.clicked.connect(self.upload_waypoints)
@@ -736,10 +1092,17 @@ class MapNavigator(QMainWindow):
         self.end_mission_btn.clicked.connect(self.end_mission)
         self.end_mission_btn.setEnabled(False)  # Initially disabled
         
+        # Timings, counters and profiles of the slow stages
+        self.metrics_panel = MetricsPanel(os.path.join(self.maps_dir, "profiles"), self)
+        self.metrics_btn = QPushButton("Metrics")
+        self.metrics_btn.clicked.connect(self.metrics_panel.show)
+        
         # Add buttons to top control layout
         top_control_layout.addWidget(self.map_selector)
         top_control_layout.addWidget(self.generate_map_btn)
+        top_control_layout.addWidget(self.cancel_btn)
         top_control_layout.addWidget(self.upload_btn)
+        top_control_layout.addWidget(self.metrics_btn)
         top_control_layout.addStretch()  # Add stretch to push mission buttons to the right
         top_control_layout.addWidget(self.start_mission_btn)
         top_control_layout.addWidget(self.end_mission_btn)
@@ -771,16 +1134,69 @@ class MapNavigator(QMainWindow):
         self.save_btn = QPushButton("Save Waypoints")
         self.save_btn.clicked.connect(self.save_waypoints)
         
+        # Add coverage planner selection dropdown
+        self.planner_selector = QComboBox()
+        self.planner_selector.addItems(list(PLANNER_MODES.keys()))
+        
+        # Distance kept from borders and land by waypoints and planned paths
+        self.safety_margin_spin = QDoubleSpinBox()
+        self.safety_margin_spin.setPrefix("Margin: ")
+        self.safety_margin_spin.setSuffix(" m")
+        self.safety_margin_spin.setRange(0.0, 10.0)
+        self.safety_margin_spin.setSingleStep(0.25)
+        self.safety_margin_spin.setValue(self.nav_manager.safety_margin)
+        self.safety_margin_spin.valueChanged.connect(self.set_safety_margin)
+        
+        # Planned paths get rounded turns of the boat's turning radius, 0 for sharp corners
+        self.turn_radius_spin = QDoubleSpinBox()
+        self.turn_radius_spin.setPrefix("Turn radius: ")
+        self.turn_radius_spin.setSuffix(" m")
+        self.turn_radius_spin.setRange(0.0, 20.0)
+        self.turn_radius_spin.setSingleStep(0.5)
+        self.turn_radius_spin.setValue(0.0)
+        
+        # More than one vessel splits the water between them, the first
+        # waypoints are their launch points when there is one per vessel
+        self.vessels_spin = QSpinBox()
+        self.vessels_spin.setPrefix("Vessels: ")
+        self.vessels_spin.setRange(1, 16)
+        self.vessels_spin.setToolTip("Split the coverage between vessels, each with its own path; "
+                                     "place one waypoint per vessel to set their launch points")
+        
+        # Clicked waypoints are joined to the previous one by a route around land
+        self.auto_route_check = QCheckBox("Auto-route")
+        self.auto_route_check.setToolTip("Route around land from the previous waypoint when clicking")
+        
         self.create_path_btn = QPushButton("Create Path Planning")
         self.create_path_btn.clicked.connect(self.create_coverage_path)
         
+        # Swath coverage of the waypoints, shown as a heatmap over the map
+        self.swath_width_spin = QDoubleSpinBox()
+        self.swath_width_spin.setPrefix("Swath: ")
+        self.swath_width_spin.setSuffix(" m")
+        self.swath_width_spin.setRange(0.25, 20.0)
+        self.swath_width_spin.setSingleStep(0.25)
+        self.swath_width_spin.setValue(DEFAULT_SWATH_WIDTH)
+        self.swath_width_spin.valueChanged.connect(self.update_status)
+        
+        self.coverage_check = QCheckBox("Show Coverage")
+        self.coverage_check.setToolTip("Gaps in red, covered once in green, overlap in orange")
+        self.coverage_check.toggled.connect(self.update_status)
+        
         # Add buttons to bottom control layout
         bottom_control_layout.addWidget(self.zoom_in_btn)
         bottom_control_layout.addWidget(self.zoom_out_btn)
         bottom_control_layout.addWidget(self.reset_zoom_btn)
         bottom_control_layout.addWidget(self.clear_btn)
         bottom_control_layout.addWidget(self.save_btn)
+        bottom_control_layout.addWidget(self.planner_selector)
+        bottom_control_layout.addWidget(self.vessels_spin)
+        bottom_control_layout.addWidget(self.safety_margin_spin)
+        bottom_control_layout.addWidget(self.turn_radius_spin)
+        bottom_control_layout.addWidget(self.auto_route_check)
         bottom_control_layout.addWidget(self.create_path_btn)
+        bottom_control_layout.addWidget(self.swath_width_spin)
+        bottom_control_layout.addWidget(self.coverage_check)
         
         # Disable buttons until map is loaded
         self.set_buttons_enabled(False)
@@ -791,16 +1207,26 @@ class MapNavigator(QMainWindow):
         
         self.status_label = QLabel("Please select a map and click 'Generate Map' to begin")
         
+        # Progress of the running background job
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setMaximumWidth(200)
+        self.progress_bar.hide()
+        
+        status_layout = QHBoxLayout()
+        status_layout.addWidget(self.status_label, 1)
+        status_layout.addWidget(self.progress_bar)
+        
         main_layout.addWidget(self.view)
-        main_layout.addWidget(self.status_label)
+        main_layout.addLayout(status_layout)
         
         self.view.centerOn(self.scene.sceneRect().center())
     
     def setup_empty_scene(self):
         """Setup an empty scene with a message"""
         try:
-            self.scene.clear()
             self.path_visualizer.clear_all()
+            self.scene.clear()
             # Add a text item to indicate no map is loaded
             text = self.scene.addText("No map loaded.\nPlease select a map and click 'Generate Map'")
             text.setDefaultTextColor(Qt.gray)
@@ -820,60 +1246,82 @@ class MapNavigator(QMainWindow):
             self.clear_btn.setEnabled(enabled)
             self.save_btn.setEnabled(enabled)
             self.create_path_btn.setEnabled(enabled)
+            self.planner_selector.setEnabled(enabled)
+            self.vessels_spin.setEnabled(enabled)
+            self.safety_margin_spin.setEnabled(enabled)
+            self.turn_radius_spin.setEnabled(enabled)
+            self.swath_width_spin.setEnabled(enabled)
+            self.coverage_check.setEnabled(enabled)
             self.upload_btn.setEnabled(enabled)
             self.start_mission_btn.setEnabled(enabled and not self.mission_started)
             self.end_mission_btn.setEnabled(enabled and self.mission_started)
         except Exception as e:
             print(f"Error setting button states: {str(e)}")
     
+    def update_map_selector(self):
+        """Reload the map names into the selector, keeping the selection"""
+        current = self.map_selector.currentText()
+        self.map_selector.blockSignals(True)
+        self.map_selector.clear()
+        self.map_selector.addItems(get_available_maps())
+        if current:
+            self.map_selector.setCurrentText(current)
+        self.map_selector.blockSignals(False)
+    
     def on_map_selected(self, index):
         """Handle map selection from dropdown"""
         self.current_map_name = self.map_selector.currentText()
+        # A map generation still running is for the previous selection
+        self.cancel_job(self.map_job)
         self.status_label.setText(f"Selected map: {self.current_map_name}. Click 'Generate Map' to create it.")
     
     def upload_waypoints(self):
-        """Upload waypoints to Firebase"""
+        """Queue the waypoints, and every vessel path of a fleet plan, for upload to Firebase"""
         try:
-            # Get waypoints data
+            # Get waypoints data, each vessel path goes to a plan key of its own
+            plans = []
             waypoints_data = self.nav_manager.get_waypoints_data()
+            if waypoints_data:
+                plans.append((plan_key(waypoints_data["map_name"]), waypoints_data))
+            for vessel in range(len(self.nav_manager.vessel_waypoints)):
+                vessel_data = self.nav_manager.get_waypoints_data(vessel)
+                if vessel_data:
+                    plans.append((vessel_key(vessel_data["map_name"], vessel), vessel_data))
             
-            if not waypoints_data:
+            if not plans:
                 QMessageBox.warning(self, "No Waypoints", 
                                   "Please add some waypoints before uploading.")
                 return
             
-            # Print data that would be uploaded (for testing)
-            print("Preparing to upload waypoints data:")
-            print(json.dumps(waypoints_data, indent=2))
-            
-            # Show confirmation dialog
-            reply = QMessageBox.question(self, 'Confirm Upload',
-                                       f'Upload {len(waypoints_data["waypoints"])} waypoints to Firebase?',
+            # Show confirmation dialog, warning about legs crossing land
+            total = sum(len(data["waypoints"]) for _, data in plans)
+            if self.nav_manager.vessel_waypoints:
+                question = f'Upload {total} waypoints in {len(plans)} paths to Firebase?'
+            else:
+                question = f'Upload {total} waypoints to Firebase?'
+            warning = self.blocked_leg_warning()
+            if warning:
+                question = f'{warning}.\n\n{question}'
+            reply = QMessageBox.question(self, 'Confirm Upload', question,
                                        QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
             
             if reply == QMessageBox.Yes:
-                # Firebase upload code (commented out - to be implemented manually)
-                
-                try:
-                    initialize_firebase()
-                    upload_waypoints_to_firebase(waypoints_data)
-                    QMessageBox.information(self, "Success", 
-                                          "Waypoints uploaded successfully!")
-                except Exception as e:
-                    QMessageBox.critical(self, "Upload Error", 
-                                       f"Failed to upload waypoints: {str(e)}")
-                
-                
-                # For testing, just print success message
-                print("Waypoints would be uploaded to Firebase here")
-                QMessageBox.information(self, "Test Mode", 
-                                      "In test mode: Waypoints would be uploaded to Firebase.\n" +
-                                      "Check console for data that would be uploaded.")
+                # Saved to the outbox at once, the sender uploads it in the
+                # background and keeps retrying while offline
+                for key, data in plans:
+                    self.upload_queue.enqueue(key, data)
+                    print(f"Queued {len(data['waypoints'])} waypoints for upload as {key}")
+                self.status_label.setText(f"Queued {total} waypoints for upload")
                 
         except Exception as e:
             QMessageBox.critical(self, "Error", 
                                f"An error occurred while preparing waypoints: {str(e)}")
     
+    def on_upload_status(self, key, status, message):
+        """Progress of the background upload, delivered in the GUI thread"""
+        print(f"Upload {key}: {message}")
+        self.status_label.setText(message)
+    
     def generate_selected_map(self):
         """Generate map for the selected area"""
         if not hasattr(self, 'current_map_name'):
@@ -886,24 +1334,83 @@ class MapNavigator(QMainWindow):
             return
         
         try:
-            # Disable all buttons during map generation
-            self.set_buttons_enabled(False)
+            # A new map replaces any generation still running
+            self.cancel_job(self.map_job)
             
-            # Clear existing scene and items
-            self.scene.clear()
-            self.path_visualizer.clear_all()
-            self.nav_manager.waypoints = []
-            
-            # Generate map filename based on map name
-            map_filename = f"{self.current_map_name.replace(' ', '_')}.pgm"
-            self.current_map_path = os.path.join(self.maps_dir, map_filename)
+            # Reuse the cached map if this polygon was already generated
+            resolution = self.nav_manager.resolution
+            cache_key = map_cache_key(coordinates, resolution,
+                                      get_border_thickness(resolution, self.border_width),
+                                      get_polygon_utm_zone(coordinates))
+            cached_path = self.map_cache.get(cache_key)
+            if cached_path:
+                self.show_map(cached_path, self.current_map_name, "cached")
+                self.export_to_gazebo(cached_path)
+                # Maps cached before clearances existed get their distance field now
+                self.map_cache.refresh(cache_key)
+                return
             
-            # Generate the map
-            generate_map(coordinates, output_path=self.current_map_path)
+            # Generate the map in the background, the current map stays
+            # visible with its buttons disabled until the new one is loaded
+            self.set_buttons_enabled(False)
+            map_name = self.current_map_name
+            job = Job(generate_cached_map, self.map_cache, cache_key, coordinates, resolution,
+                      self.border_width)
+            job.signals.finished.connect(
+                lambda map_path, job=job: self.on_map_generated(job, cache_key, map_name, map_path))
+            job.signals.failed.connect(
+                lambda error, job=job: self.on_map_job_ended(job, f"Error generating map: {error}"))
+            job.signals.cancelled.connect(
+                lambda job=job: self.on_map_job_ended(job, f"Cancelled generating map {map_name}"))
+            self.start_job(job, f"Generating map {map_name}")
+            self.map_job = job
+        except Exception as e:
+            self.status_label.setText(f"Error generating map: {str(e)}")
+            self.set_buttons_enabled(False)
+    
+    def on_map_generated(self, job, cache_key, map_name, map_path):
+        # Cached even when superseded, its files would otherwise never be evicted
+        self.map_cache.put(cache_key, name=map_name)
+        if job is not self.map_job:
+            return  # Superseded by a newer generation
+        self.map_job = None
+        self.show_map(map_path, map_name, "generated")
+        self.export_to_gazebo(map_path)
+        self.end_job_progress()
+    
+    def export_to_gazebo(self, map_path):
+        """Copy the shown map to the Gazebo maps directory in the background"""
+        job = Job(export_gazebo_job, map_path)
+        job.signals.failed.connect(lambda error: print(f"Error exporting map to Gazebo: {error}"))
+        self.export_pool.start(job)
+    
+    def on_map_job_ended(self, job, message):
+        """A map generation failed or was cancelled"""
+        if job is not self.map_job:
+            return
+        self.map_job = None
+        self.status_label.setText(message)
+        self.set_buttons_enabled(self.nav_manager.map_img is not None)
+        self.end_job_progress()
+    
+    def show_map(self, map_path, map_name, source):
+        """Replace the displayed map, its waypoints are cleared"""
+        # Planning on the previous map and its display are no longer needed
+        self.cancel_job(self.path_job)
+        self.cancel_pyramid_job()
+        try:
+            # Clear existing scene and items, tracked items first since
+            # clear() deletes them underneath the visualizer
+            self.path_visualizer.clear_all()
+            self.scene.clear()
+            self.nav_manager.clear_waypoints()
+            self.current_map_path = map_path
             
             # Load the generated map
-            if self.nav_manager.load_map(self.current_map_path):
-                self.nav_manager.current_map_name = self.current_map_name
+            with timed("load_map"):
+                loaded = self.nav_manager.load_map(self.current_map_path)
+            if loaded:
+                self.nav_manager.current_map_name = map_name
                 # Create a new scene
                 self.scene = QGraphicsScene()
                 self.view.setScene(self.scene)
@@ -911,13 +1418,63 @@ class MapNavigator(QMainWindow):
                 self.view.set_nav_manager(self.nav_manager)  # Update nav_manager reference
                 self.setup_scene()
                 self.set_buttons_enabled(True)
-                self.status_label.setText(f"Generated and loaded map: {self.current_map_name}")
+                self.status_label.setText(f"Loaded {source} map: {map_name}")
             else:
                 self.status_label.setText("Error loading generated map")
+                self.set_buttons_enabled(False)
         except Exception as e:
             self.status_label.setText(f"Error generating map: {str(e)}")
             self.set_buttons_enabled(False)
     
+    def start_job(self, job, message):
+        """Run a job on the worker threads, showing its progress as message"""
+        job.signals.progress.connect(lambda percent: self.show_job_progress(message, percent))
+        self.job_pool.start(job)
+        self.cancel_btn.setEnabled(True)
+        self.progress_bar.show()
+        self.show_job_progress(message, 0)
+    
+    def cancel_job(self, job):
+        """Cancel a job, its cancelled signal is ignored"""
+        if job is None:
+            return
+        job.cancel()
+        if job is self.map_job:
+            self.map_job = None
+            self.set_buttons_enabled(self.nav_manager.map_img is not None)
+        elif job is self.path_job:
+            self.path_job = None
+            self.set_path_buttons_enabled(self.map_job is None and self.nav_manager.map_img is not None)
+        self.end_job_progress()
+    
+    def cancel_jobs(self):
+        """Cancel button: stop the running map generation and path planning"""
+        if self.map_job is None and self.path_job is None:
+            return
+        self.cancel_job(self.map_job)
+        self.cancel_job(self.path_job)
+        self.status_label.setText("Cancelled")
+    
+    def show_job_progress(self, message, percent):
+        self.progress_bar.setValue(percent)
+        self.status_label.setText(f"{message}... {percent}%")
+    
+    def end_job_progress(self):
+        if self.map_job is None and self.path_job is None:
+            self.cancel_btn.setEnabled(False)
+            self.progress_bar.hide()
+    
+    def closeEvent(self, event):
+        # Running jobs stop at their next progress report
+        self.cancel_job(self.map_job)
+        self.cancel_job(self.path_job)
+        self.cancel_pyramid_job()
+        self.job_pool.shutdown()
+        self.export_pool.shutdown()
+        self.pyramid_pool.shutdown()
+        self.upload_queue.stop(timeout=1.0)
+        super().closeEvent(event)
+    
     def setup_scene(self):
         """Setup the scene with the current map"""
         try:
@@ -925,28 +1482,16 @@ class MapNavigator(QMainWindow):
                 self.setup_empty_scene()
                 return
             
-            # Create new map display
-            map_display = cv2.cvtColor(self.nav_manager.map_img, cv2.COLOR_GRAY2RGB)
-            bytes_per_line = 3 * self.nav_manager.width
-            qimg = QImage(map_display.data, self.nav_manager.width, self.nav_manager.height, 
-                         bytes_per_line, QImage.Format_RGB888)
-            pixmap = QPixmap.fromImage(qimg)
-            self.scene.addPixmap(pixmap)
-            
-            # Add border visualization
-            border_mask = (self.nav_manager.map_img == 0).astype(np.uint8) * 255
-            border_image = np.zeros((self.nav_manager.height, self.nav_manager.width, 4), dtype=np.uint8)
-            border_image[:, :, 2] = border_mask  # Red channel
-            border_image[:, :, 3] = border_mask  # Alpha channel
-            bytes_per_line = 4 * self.nav_manager.width
-            qimg_border = QImage(border_image.tobytes(), self.nav_manager.width, self.nav_manager.height, 
-                                bytes_per_line, QImage.Format_ARGB32)
-            pixmap_border = QPixmap.fromImage(qimg_border)
-            self.scene.addPixmap(pixmap_border)
-            
-            # Draw new grid and update display
-            self.path_visualizer.draw_grid()
-            self.path_visualizer.update_display()
+            with timed("scene.setup"):
+                # Map display, drawn tile by tile from the pyramid (borders in red)
+                self.map_item = MapTileItem(self.nav_manager.map_pyramid)
+                self.scene.addItem(self.map_item)
+                self.scene.setSceneRect(self.map_item.boundingRect())
+                self.build_pyramid()
+                
+                # Draw new grid and update display
+                self.path_visualizer.draw_grid()
+                self.path_visualizer.update_display()
             
             # Reset zoom and center view
             self.zoom_level = 1.0
@@ -955,46 +1500,200 @@ class MapNavigator(QMainWindow):
             print(f"Error setting up scene: {str(e)}")
             self.status_label.setText(f"Error setting up scene: {str(e)}")
     
+    def build_pyramid(self):
+        """Build the coarse levels of the shown map in the background, repainting it once built"""
+        self.cancel_pyramid_job()
+        job = Job(self.nav_manager.map_pyramid.build)
+        job.signals.finished.connect(lambda pyramid, job=job: self.on_pyramid_built(job))
+        job.signals.failed.connect(lambda error: print(f"Error building map levels: {error}"))
+        self.pyramid_pool.start(job)
+        self.pyramid_job = job
+    
+    def on_pyramid_built(self, job):
+        if job is not self.pyramid_job:
+            return  # The map was replaced, its item is gone
+        self.pyramid_job = None
+        self.map_item.update()
+    
+    def cancel_pyramid_job(self):
+        if self.pyramid_job is not None:
+            self.pyramid_job.cancel()
+            self.pyramid_job = None
+    
     def add_waypoint(self, x, y):
-        if self.nav_manager.add_waypoint(x, y):
-            self.path_visualizer.update_display()
+        if self.auto_route_check.isChecked():
+            # Route around land from the previous waypoint
+            added = self.nav_manager.add_routed_waypoint(x, y)
+            if added:
+                self.path_visualizer.waypoint_added(added)
+                self.update_status()
+            else:
+                self.status_label.setText("Cannot route to this point: too close to land or unreachable!")
+        elif self.nav_manager.add_waypoint(x, y):
+            self.path_visualizer.waypoint_added()
             self.update_status()
         else:
             self.status_label.setText("Cannot place waypoint on border or non-navigable area!")
     
     def remove_nearest_waypoint(self, x, y):
-        self.nav_manager.remove_nearest_waypoint(x, y)
-        self.path_visualizer.update_display()
+        index = self.nav_manager.remove_nearest_waypoint(x, y)
+        if index is not None:
+            self.path_visualizer.waypoint_removed(index)
         self.update_status()
     
     def clear_waypoints(self):
         self.nav_manager.clear_waypoints()
         self.path_visualizer.update_display()
+        self.path_visualizer.update_vessel_display()
         self.update_status()
     
+    def blocked_leg_warning(self):
+        """Warning about the first leg crossing land, None if the whole path is in water"""
+        leg = self.nav_manager.first_blocked_leg()
+        if leg is None:
+            return None
+        count = len(self.nav_manager.blocked_legs())
+        return (f"The leg from waypoint {leg + 1} to {leg + 2} leaves the free water "
+                f"({count} blocked legs, shown in red)")
+    
     def save_waypoints(self):
         self.nav_manager.save_waypoints()
-        self.status_label.setText(f"Saved {len(self.nav_manager.get_waypoints())} waypoints to waypoints.yaml")
+        saved = []
+        if self.nav_manager.get_waypoints() or not self.nav_manager.vessel_waypoints:
+            saved.append(f"{len(self.nav_manager.get_waypoints())} waypoints to waypoints.yaml")
+        if self.nav_manager.vessel_waypoints:
+            saved.append(f"{len(self.nav_manager.vessel_waypoints)} vessel paths to waypoints_vessel<n>.yaml")
+        message = "Saved " + " and ".join(saved)
+        warning = self.blocked_leg_warning()
+        if warning:
+            message += f" | Warning: {warning}"
+        self.status_label.setText(message)
     
     def create_coverage_path(self):
+        if self.vessels_spin.value() > 1:
+            self.create_fleet_paths()
+            return
         if not self.nav_manager.get_waypoints():
             self.status_label.setText("Please add at least one waypoint as starting point")
             return
-        start_point = self.nav_manager.get_waypoints()[0]
-        x0, y0 = start_point.x(), start_point.y()
-        planner = CoveragePathPlanner(self.nav_manager.map_img)
-        coverage_points = planner.generate_path(x0, y0)
-        for p in coverage_points:
-            self.nav_manager.add_waypoint(p[0], p[1])
+        x0, y0 = self.nav_manager.get_waypoints()[0]
+        planner = self.planner_selector.currentText()
+        if planner not in PLANNER_MODES:
+            planner = "Lawnmower"
+        # Plan in the background, the map can still be browsed and edited
+        self.cancel_job(self.path_job)
+        self.set_path_buttons_enabled(False)
+        job = Job(plan_path, self.nav_manager.map_img, x0, y0, planner=planner,
+                  clearance=self.nav_manager.clearance, safety_margin=self.nav_manager.safety_margin,
+                  turn_radius_m=self.turn_radius_spin.value())
+        job.signals.finished.connect(
+            lambda points, job=job: self.on_path_planned(job, points))
+        job.signals.failed.connect(
+            lambda error, job=job: self.on_path_job_ended(job, f"Error planning path: {error}"))
+        job.signals.cancelled.connect(
+            lambda job=job: self.on_path_job_ended(job, "Cancelled path planning"))
+        self.start_job(job, f"Planning {planner} path")
+        self.path_job = job
+    
+    def create_fleet_paths(self):
+        """Split the water between the vessels and plan every region in parallel"""
+        vessels = self.vessels_spin.value()
+        planner = self.planner_selector.currentText()
+        if planner not in PLANNER_MODES:
+            planner = "Lawnmower"
+        waypoints = self.nav_manager.get_waypoints()
+        # One waypoint per vessel seeds the split at the launch points, bands otherwise
+        launch_points = waypoints.xy[:vessels].tolist() if len(waypoints) >= vessels else None
+        self.cancel_job(self.path_job)
+        self.set_path_buttons_enabled(False)
+        job = Job(plan_fleet, self.nav_manager.map_path, vessels, planner=planner,
+                  resolution=self.nav_manager.resolution, safety_margin=self.nav_manager.safety_margin,
+                  launch_points=launch_points, turn_radius_m=self.turn_radius_spin.value())
+        job.signals.finished.connect(
+            lambda results, job=job: self.on_fleet_planned(job, results))
+        job.signals.failed.connect(
+            lambda error, job=job: self.on_path_job_ended(job, f"Error planning vessel paths: {error}"))
+        job.signals.cancelled.connect(
+            lambda job=job: self.on_path_job_ended(job, "Cancelled path planning"))
+        self.start_job(job, f"Planning {planner} paths for {vessels} vessels")
+        self.path_job = job
+    
+    def on_fleet_planned(self, job, results):
+        if job is not self.path_job:
+            return  # Superseded or cancelled
+        self.path_job = None
+        # The launch points start the vessel paths, they are not a path of their own
+        self.nav_manager.waypoints.clear()
+        self.nav_manager.set_vessel_paths([result["points"] for result in results])
         self.path_visualizer.update_display()
+        self.path_visualizer.update_vessel_display()
+        self.set_path_buttons_enabled(self.map_job is None)
+        self.end_job_progress()
         self.update_status()
     
+    def on_path_planned(self, job, coverage_points):
+        if job is not self.path_job:
+            return  # Superseded or cancelled
+        self.path_job = None
+        self.nav_manager.add_planned_path(coverage_points)
+        self.path_visualizer.update_display()
+        # Stay disabled while a new map is being generated
+        self.set_path_buttons_enabled(self.map_job is None)
+        self.end_job_progress()
+        self.update_status()
+    
+    def on_path_job_ended(self, job, message):
+        """A path planning failed or was cancelled"""
+        if job is not self.path_job:
+            return
+        self.path_job = None
+        self.status_label.setText(message)
+        self.set_path_buttons_enabled(self.map_job is None and self.nav_manager.map_img is not None)
+        self.end_job_progress()
+    
+    def set_path_buttons_enabled(self, enabled):
+        self.create_path_btn.setEnabled(enabled)
+        self.planner_selector.setEnabled(enabled)
+        self.vessels_spin.setEnabled(enabled)
+        self.safety_margin_spin.setEnabled(enabled)
+        self.turn_radius_spin.setEnabled(enabled)
+    
+    def set_safety_margin(self, margin):
+        """Safety margin spin box: applies to new waypoints and paths"""
+        self.nav_manager.safety_margin = margin
+    
     def update_status(self):
         wp_count = len(self.nav_manager.get_waypoints())
+        coverage = self.update_coverage()
+        vessels = ""
+        if self.nav_manager.vessel_waypoints:
+            vessels = "Vessel paths: " + ", ".join(str(len(waypoints))
+                                                  for waypoints in self.nav_manager.vessel_waypoints) + " | "
         self.status_label.setText(f"{wp_count} waypoints | "
+                                f"{vessels}"
+                                f"{coverage}"
                                 f"Zoom: {self.zoom_level:.1f}x | "
                                 "Click to add waypoint, Right-click to remove")
     
+    def update_coverage(self):
+        """
+        Re-evaluate the swath coverage of the waypoints when the heatmap is
+        shown. Returns the summary for the status bar, empty when hidden.
+        """
+        if not self.coverage_check.isChecked() or self.nav_manager.map_img is None:
+            self.path_visualizer.hide_coverage()
+            return ""
+        # The vessel paths of a fleet plan are swept together with the waypoints
+        paths = [self.nav_manager.get_waypoints().xy]
+        paths += [waypoints.xy for waypoints in self.nav_manager.vessel_waypoints]
+        evaluation = evaluate_paths_coverage(self.nav_manager.map_img, paths,
+                                             self.swath_width_spin.value(), self.nav_manager.resolution)
+        self.path_visualizer.show_coverage(evaluation)
+        summary = evaluation.summary()
+        return (f"Coverage: {summary['coverage_percent']:.1f}% | "
+                f"Overlap: {summary['overlap_percent']:.1f}% | "
+                f"{summary['gaps']} gaps (largest {summary['largest_gap_m2']:.0f} m2) | ")
+    
     def zoom_in(self):
         self.zoom_level = min(self.zoom_level * self.zoom_factor, self.max_zoom)
         self.apply_zoom()
@@ -1021,9 +1720,17 @@ class MapNavigator(QMainWindow):
         real_x = x * self.nav_manager.resolution
         real_y = (self.nav_manager.height - y) * self.nav_manager.resolution
         
+        # Global coordinates when the map is georeferenced
+        global_text = ""
+        georef = self.nav_manager.georef
+        if georef is not None:
+            lng, lat = georef.pixels_to_wgs84((x, y))[0]
+            global_text = f"Lat: {lat:.7f}, Lng: {lng:.7f} | "
+        
         self.status_label.setText(
             f"Pixel Coordinates: X: {int(x)}, Y: {int(y)} | "
             f"Real-world: X: {real_x:.2f}m, Y: {real_y:.2f}m | "
+            f"{global_text}"
             f"{wp_count} waypoints | "
             f"Zoom: {self.zoom_level:.1f}x | "
             "Click to add waypoint, Right-click to remove"
@@ -0,0 +1,81 @@
+import math
+import threading
+
+import numpy as np
+
+
+def downsample_min(img):
+    """
+    Halve an image with 2x2 min-pooling. Borders (0) win over unknown (205)
+    which wins over free (255), so thin borders stay visible when zoomed out.
+    """
+    height, width = img.shape
+    out = np.array(img[0::2, 0::2])
+    h_odd, w_odd = height // 2, width // 2
+    np.minimum(out[:h_odd, :], img[1::2, 0::2], out=out[:h_odd, :])
+    np.minimum(out[:, :w_odd], img[0::2, 1::2], out=out[:, :w_odd])
+    np.minimum(out[:h_odd, :w_odd], img[1::2, 1::2], out=out[:h_odd, :w_odd])
+    return out
+
+class MapPyramid:
+    """
+    Image pyramid of a map, level k being downsampled by 2**k. Level 0 is the
+    map itself (usually a memmap); coarser levels are built by build() or on
+    first use, and stop once a level fits in a single tile.
+    """
+
+    def __init__(self, map_img, tile_size=512):
+        self.tile_size = tile_size
+        self.height, self.width = map_img.shape
+        self.levels = [map_img]
+        self.lock = threading.Lock()  # Held while building levels
+        self.num_levels = 1
+        size = max(self.height, self.width)
+        while size > tile_size:
+            size = (size + 1) // 2
+            self.num_levels += 1
+
+    def level(self, k):
+        """Image of level k, building the missing coarser levels"""
+        k = min(max(k, 0), self.num_levels - 1)
+        if k >= len(self.levels):
+            self.build(k)
+        return self.levels[k]
+
+    def build(self, k=None, progress=None):
+        """
+        Build the levels up to k (all of them by default). Levels are only
+        appended once complete, so other threads can read the built ones.
+        progress: optional callback receiving the fraction of levels built
+        """
+        k = self.num_levels - 1 if k is None else min(k, self.num_levels - 1)
+        with self.lock:
+            while len(self.levels) <= k:
+                self.levels.append(downsample_min(self.levels[-1]))
+                if progress is not None:
+                    progress(len(self.levels) / (k + 1))
+        return self
+
+    def built_level(self, k):
+        """Level closest to k that is already built, never coarser than k"""
+        return min(max(k, 0), self.num_levels - 1, len(self.levels) - 1)
+
+    def level_for_scale(self, scale):
+        """Coarsest level that still has at least one pixel per screen pixel at scale"""
+        if scale <= 0:
+            return self.num_levels - 1
+        k = int(math.floor(math.log2(1.0 / scale))) if scale < 1.0 else 0
+        return min(max(k, 0), self.num_levels - 1)
+
+    def tile_grid(self, k):
+        """Number of (columns, rows) of tiles at level k"""
+        img = self.level(k)
+        return (math.ceil(img.shape[1] / self.tile_size),
+                math.ceil(img.shape[0] / self.tile_size))
+
+    def tile(self, k, tx, ty):
+        """Pixels of tile (tx, ty) at level k, clipped at the image edge"""
+        img = self.level(k)
+        y0 = ty * self.tile_size
+        x0 = tx * self.tile_size
+        return img[y0:y0 + self.tile_size, x0:x0 + self.tile_size]
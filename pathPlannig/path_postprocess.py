@@ -0,0 +1,149 @@
+import math
+
+import numpy as np
+
+from pathPlannig.path_validation import blocked_pairs, blocked_segments
+
+# Waypoints closer than this to the simplified path are dropped
+DEFAULT_TOLERANCE_M = 0.05
+# Largest angle covered by one chord of a smoothed turn
+ARC_STEP_DEG = 30.0
+
+
+def segment_distances(points, start, end):
+    """Distance of every point to the segment from start to end (not its infinite line)"""
+    direction = end - start
+    length2 = direction @ direction
+    offsets = points - start
+    if length2 == 0:
+        return np.hypot(offsets[:, 0], offsets[:, 1])
+    t = np.clip(offsets @ direction / length2, 0.0, 1.0)
+    nearest = offsets - t[:, None] * direction
+    return np.hypot(nearest[:, 0], nearest[:, 1])
+
+def farthest_point(points, first, last):
+    """Index and distance of the point between first and last farthest from their segment"""
+    distances = segment_distances(points[first + 1:last], points[first], points[last])
+    index = int(np.argmax(distances))
+    return first + 1 + index, float(distances[index])
+
+def simplify_path(points, tolerance, clearance=None, safety_margin=0.0):
+    """
+    Douglas-Peucker simplification of a waypoint path, with an explicit
+    stack instead of recursion. Distances are taken to the segments
+    rather than their lines, so a path doubling back on itself keeps its
+    turnaround point.
+    points: (n, 2) waypoint pixel coordinates, in path order
+    tolerance: largest distance in pixels of a dropped waypoint to the new path
+    clearance: ClearanceMap of the map, new legs that would leave the safe
+        water are split again at their farthest point until they do not
+    Returns the indices of the kept waypoints, in order.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(points) < 3:
+        return np.arange(len(points))
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+    pending = [(0, len(points) - 1)]
+    while pending:
+        merged = []
+        while pending:
+            first, last = pending.pop()
+            if last - first < 2:
+                continue
+            index, distance = farthest_point(points, first, last)
+            if distance > tolerance:
+                keep[index] = True
+                pending.append((first, index))
+                pending.append((index, last))
+            else:
+                merged.append((first, last))
+        if clearance is None or not merged:
+            break
+        # New legs are checked all at once, blocked ones are split regardless of the tolerance
+        merged = np.array(merged)
+        blocked = blocked_pairs(clearance, points[merged[:, 0]], points[merged[:, 1]], safety_margin)
+        for first, last in merged[blocked].tolist():
+            index, _ = farthest_point(points, first, last)
+            keep[index] = True
+            pending.append((first, index))
+            pending.append((index, last))
+    return np.flatnonzero(keep)
+
+def fillet(before, corner, after, radius):
+    """
+    Arc of the given radius tangent to the legs before -> corner -> after,
+    shrunk to fit in half of each leg. Returns the (m, 2) arc points, or
+    None when the legs are straight, doubled back or too short.
+    """
+    d1 = corner - before
+    d2 = after - corner
+    l1 = math.hypot(*d1)
+    l2 = math.hypot(*d2)
+    if l1 == 0 or l2 == 0:
+        return None
+    d1 = d1 / l1
+    d2 = d2 / l2
+    cross = d1[0] * d2[1] - d1[1] * d2[0]
+    turn = math.atan2(abs(cross), d1 @ d2)  # 0 straight on, pi doubling back
+    if turn < math.radians(1.0) or turn > math.radians(179.0):
+        return None
+    # Tangent length along each leg, halving the legs leaves room for the next turn
+    tangent = min(radius * math.tan(turn / 2), l1 / 2, l2 / 2)
+    radius = tangent / math.tan(turn / 2)
+    start = corner - d1 * tangent
+    normal = np.array([-d1[1], d1[0]]) * math.copysign(1.0, cross)
+    center = start + normal * radius
+    steps = max(2, int(math.ceil(math.degrees(turn) / ARC_STEP_DEG)))
+    start_angle = math.atan2(*(start - center)[::-1])
+    angles = start_angle + math.copysign(1.0, cross) * np.linspace(0.0, turn, steps + 1)
+    return center + radius * np.column_stack((np.cos(angles), np.sin(angles)))
+
+def smooth_corners(points, turn_radius, clearance=None, safety_margin=0.0):
+    """
+    Replace every corner of a path by an arc of radius turn_radius pixels
+    (less where the legs are short). Corners whose arc would leave the
+    safe water stay sharp.
+    Returns the new (m, 2) path.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(points) < 3 or turn_radius <= 0:
+        return points
+    arcs = [fillet(points[i - 1], points[i], points[i + 1], turn_radius) for i in range(1, len(points) - 1)]
+    if clearance is not None:
+        # The arcs joined by their legs, every corner is checked in one pass
+        checked = [(i, arc) for i, arc in enumerate(arcs) if arc is not None]
+        if checked:
+            pieces = [np.vstack((points[i], arc, points[i + 2])) for i, arc in checked]
+            path = np.vstack(pieces)
+            # Legs joining consecutive pieces are not part of any arc
+            ends = np.cumsum([len(piece) for piece in pieces])
+            blocked = np.zeros(len(path) - 1, dtype=bool)
+            blocked[blocked_segments(clearance, path, safety_margin)] = True
+            blocked[ends[:-1] - 1] = False
+            starts = np.concatenate(([0], ends[:-1]))
+            for (i, _), first, last in zip(checked, starts, ends):
+                if blocked[first:last - 1].any():
+                    arcs[i] = None
+    smoothed = [points[:1]]
+    for i, arc in enumerate(arcs):
+        smoothed.append(points[i + 1:i + 2] if arc is None else arc)
+    smoothed.append(points[-1:])
+    return np.vstack(smoothed)
+
+def postprocess_path(points, resolution=0.05, tolerance_m=DEFAULT_TOLERANCE_M, turn_radius_m=0.0,
+                     clearance=None, safety_margin=0.0):
+    """
+    Drop the waypoints a planned path does not need, then round its
+    corners for the boat's turning radius
+    tolerance_m: largest distance in meters of a dropped waypoint to the new path, 0 keeps them all
+    turn_radius_m: radius of the turns in meters, 0 keeps sharp corners
+    clearance: ClearanceMap of the map, the new legs and turns keep safety_margin from land
+    Returns the new (m, 2) path.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if tolerance_m > 0:
+        points = points[simplify_path(points, tolerance_m / resolution, clearance, safety_margin)]
+    if turn_radius_m > 0:
+        points = smooth_corners(points, turn_radius_m / resolution, clearance, safety_margin)
+    return points
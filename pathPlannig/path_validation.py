@@ -0,0 +1,101 @@
+import numpy as np
+
+# Segment samples rasterized at once, bounds the memory of long plans
+CHUNK_SAMPLES = 1 << 18
+
+
+def segment_sample_counts(points, ends=None):
+    """
+    DDA sample count of every segment: one per pixel of its major axis
+    Segments join consecutive (n, 2) points, or points[i] to ends[i] when ends is given.
+    """
+    deltas = np.abs(np.diff(points, axis=0) if ends is None else ends - points)
+    return np.ceil(deltas.max(axis=1)).astype(np.int64) + 1
+
+def rasterize_segments(p1, p2, counts):
+    """
+    Pixel samples of all the segments from p1[i] to p2[i] at once, counts[i]
+    evenly spaced samples per segment (both ends included)
+    Returns the (m, 2) samples and the offset of the first sample of every segment.
+    """
+    offsets = np.cumsum(counts) - counts
+    steps = np.arange(offsets[-1] + counts[-1]) - np.repeat(offsets, counts)
+    increments = (p2 - p1) / np.maximum(counts - 1, 1)[:, None]
+    samples = np.empty((len(steps), 2), dtype=np.float64)
+    for axis in range(2):
+        samples[:, axis] = np.repeat(p1[:, axis], counts) + steps * np.repeat(increments[:, axis], counts)
+    return samples, offsets
+
+def unsafe_segments(clearance, p1, p2, counts, threshold):
+    """Boolean array, True for the segments p1[i] to p2[i] with a sample below threshold"""
+    samples, offsets = rasterize_segments(p1, p2, counts)
+    unsafe = clearance.lookup(samples) < threshold
+    # Any unsafe sample blocks its segment
+    return np.logical_or.reduceat(unsafe, offsets)
+
+def segment_chunks(counts, chunk_samples=CHUNK_SAMPLES):
+    """(first, last) segment ranges of about chunk_samples samples each"""
+    ends = np.cumsum(counts)
+    first = 0
+    while first < len(counts):
+        offset = ends[first - 1] if first > 0 else 0
+        last = int(np.searchsorted(ends, offset + chunk_samples, side="right"))
+        # A segment longer than a chunk gets a chunk of its own
+        last = max(last, first + 1)
+        yield first, last
+        first = last
+
+def blocked_segments(clearance, points, safety_margin=0.0, chunk_samples=CHUNK_SAMPLES,
+                     stop_at_first=False):
+    """
+    Indices of the segments between consecutive points that leave the safe
+    water, segment i joining points i and i + 1. The segments are
+    rasterized with a DDA (one sample per pixel of their major axis) a
+    chunk at a time and the samples are looked up in the distance field.
+    clearance: ClearanceMap of the map
+    safety_margin: distance in meters to keep from obstacles, 0 for any free pixel
+    stop_at_first: return after the chunk holding the first blocked segment
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(points) < 2:
+        return np.empty(0, dtype=np.int64)
+    counts = segment_sample_counts(points)
+    threshold = clearance.threshold(safety_margin)
+    blocked = []
+    for first, last in segment_chunks(counts, chunk_samples):
+        unsafe = unsafe_segments(clearance, points[first:last], points[first + 1:last + 1],
+                                 counts[first:last], threshold)
+        chunk_blocked = np.flatnonzero(unsafe)
+        if len(chunk_blocked):
+            blocked.append(chunk_blocked + first)
+            if stop_at_first:
+                break
+    if not blocked:
+        return np.empty(0, dtype=np.int64)
+    return np.concatenate(blocked)
+
+def first_blocked_segment(clearance, points, safety_margin=0.0, chunk_samples=CHUNK_SAMPLES):
+    """Index of the first segment leaving the safe water, or None if the whole path is safe"""
+    blocked = blocked_segments(clearance, points, safety_margin, chunk_samples, stop_at_first=True)
+    return int(blocked[0]) if len(blocked) else None
+
+def blocked_pairs(clearance, p1, p2, safety_margin=0.0, chunk_samples=CHUNK_SAMPLES):
+    """
+    Boolean array, True where the segment from p1[i] to p2[i] leaves the safe
+    water. For line of sight tests between unrelated point pairs.
+    """
+    p1 = np.asarray(p1, dtype=np.float64).reshape(-1, 2)
+    p2 = np.asarray(p2, dtype=np.float64).reshape(-1, 2)
+    blocked = np.zeros(len(p1), dtype=bool)
+    if len(p1) == 0:
+        return blocked
+    counts = segment_sample_counts(p1, p2)
+    threshold = clearance.threshold(safety_margin)
+    for first, last in segment_chunks(counts, chunk_samples):
+        blocked[first:last] = unsafe_segments(clearance, p1[first:last], p2[first:last],
+                                              counts[first:last], threshold)
+    return blocked
+
+def segment_is_blocked(clearance, p1, p2, safety_margin=0.0):
+    """True if the segment from p1 to p2 leaves the safe water"""
+    return len(blocked_segments(clearance, [p1, p2], safety_margin)) > 0
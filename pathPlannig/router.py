@@ -0,0 +1,239 @@
+import heapq
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+from mapGenrating.clearance import CLEARANCE_SCALE, DEFAULT_SAFETY_MARGIN
+from mapGenrating.instrumentation import count, timed
+from pathPlannig.bulk_ops import block_reduce
+from pathPlannig.path_validation import blocked_pairs, blocked_segments, segment_is_blocked
+
+# Cells of the routing grid, the map is pooled down to about this many.
+# Channels narrower than about two cells are closed on the grid.
+MAX_GRID_CELLS = 1 << 16
+# Extra cost per cell next to the shore, fading out at SOFT_CLEARANCE_M
+SHORE_COST = 2.0
+SOFT_CLEARANCE_M = 2.0
+# Routes remembered by a Router
+ROUTE_CACHE_SIZE = 128
+
+SQRT2 = math.sqrt(2.0)
+# 8-connected neighbour offsets (row, column) and their step lengths
+NEIGHBOURS = [(-1, 0, 1.0), (1, 0, 1.0), (0, -1, 1.0), (0, 1, 1.0),
+              (-1, -1, SQRT2), (-1, 1, SQRT2), (1, -1, SQRT2), (1, 1, SQRT2)]
+
+
+def pool_clearance(dist, cell):
+    """
+    Minimum of the distance field over cell x cell blocks, so that a grid
+    cell is only as clear as its worst pixel. Blocks cut by the map edge
+    use the pixels they have.
+    """
+    return block_reduce(dist, cell, np.minimum, np.iinfo(np.uint16).max, np.uint16)
+
+class CostMap:
+    """
+    Downsampled routing grid of a map: cells whose every pixel keeps the
+    safety margin are passable, and cells close to the shore cost more so
+    routes keep to open water when they can.
+    """
+
+    def __init__(self, clearance, safety_margin=DEFAULT_SAFETY_MARGIN, max_cells=MAX_GRID_CELLS,
+                 shore_cost=SHORE_COST, soft_clearance_m=SOFT_CLEARANCE_M):
+        self.width = clearance.width
+        self.height = clearance.height
+        self.cell = max(1, int(math.ceil(math.sqrt(self.width * self.height / max_cells))))
+        pooled = pool_clearance(clearance.dist, self.cell)
+        self.passable = pooled >= clearance.threshold(safety_margin)
+        meters = pooled / CLEARANCE_SCALE * clearance.resolution
+        self.cost = 1.0 + shore_cost * np.clip(1.0 - meters / soft_clearance_m, 0.0, 1.0)
+        self.rows, self.cols = self.passable.shape
+
+    def to_cell(self, x, y):
+        """(row, column) of the grid cell holding pixel (x, y)"""
+        row = min(max(int(y) // self.cell, 0), self.rows - 1)
+        col = min(max(int(x) // self.cell, 0), self.cols - 1)
+        return row, col
+
+    def cell_center(self, row, col):
+        """Pixel coordinates of the middle of a cell, inside the map"""
+        x = min((col + 0.5) * self.cell, self.width - 1)
+        y = min((row + 0.5) * self.cell, self.height - 1)
+        return x, y
+
+    def nearest_passable(self, row, col, max_radius=8):
+        """Passable cell closest to (row, column) within max_radius cells, or None"""
+        if self.passable[row, col]:
+            return row, col
+        r0 = max(row - max_radius, 0)
+        c0 = max(col - max_radius, 0)
+        window = self.passable[r0:row + max_radius + 1, c0:col + max_radius + 1]
+        cells = np.argwhere(window)
+        if len(cells) == 0:
+            return None
+        cells += (r0, c0)
+        nearest = cells[np.argmin(((cells - (row, col)) ** 2).sum(axis=1))]
+        return int(nearest[0]), int(nearest[1])
+
+def astar(costmap, start, goal):
+    """
+    Cheapest 8-connected path between two passable cells of a CostMap,
+    with a binary heap and the octile distance as heuristic. Diagonal
+    steps may not cut the corner of an impassable cell.
+    Returns the list of (row, column) cells from start to goal, or None.
+    """
+    cols = costmap.cols
+    rows = costmap.rows
+    # Plain lists index much faster than NumPy arrays one element at a time
+    passable = costmap.passable.ravel().tolist()
+    cost = costmap.cost.ravel().tolist()
+    start_index = start[0] * cols + start[1]
+    goal_index = goal[0] * cols + goal[1]
+    goal_row, goal_col = goal
+    diagonal = SQRT2 - 1.0
+
+    g = [math.inf] * len(passable)
+    g[start_index] = 0.0
+    parent = {start_index: -1}
+    closed = bytearray(len(passable))
+    heap = [(0.0, 0.0, start_index)]
+    while heap:
+        _, g_current, index = heapq.heappop(heap)
+        if index == goal_index:
+            path = []
+            while index != -1:
+                path.append(divmod(index, cols))
+                index = parent[index]
+            return path[::-1]
+        if closed[index]:
+            continue
+        closed[index] = 1
+        row, col = divmod(index, cols)
+        for dr, dc, length in NEIGHBOURS:
+            r = row + dr
+            c = col + dc
+            if r < 0 or c < 0 or r >= rows or c >= cols:
+                continue
+            neighbour = r * cols + c
+            if not passable[neighbour] or closed[neighbour]:
+                continue
+            if dr and dc and not (passable[row * cols + c] and passable[r * cols + col]):
+                continue
+            g_next = g_current + length * 0.5 * (cost[index] + cost[neighbour])
+            if g_next < g[neighbour]:
+                g[neighbour] = g_next
+                parent[neighbour] = index
+                # Octile distance to the goal, inlined as this is the hot loop
+                dr = abs(r - goal_row)
+                dc = abs(c - goal_col)
+                h = dr + diagonal * dc if dr > dc else dc + diagonal * dr
+                heapq.heappush(heap, (g_next + h, g_next, neighbour))
+    return None
+
+def turning_points(cells):
+    """The cells of a grid path where its direction changes, plus both ends"""
+    if len(cells) <= 2:
+        return list(cells)
+    points = [cells[0]]
+    for previous, current, following in zip(cells, cells[1:], cells[2:]):
+        if (current[0] - previous[0], current[1] - previous[1]) != \
+                (following[0] - current[0], following[1] - current[1]):
+            points.append(current)
+    points.append(cells[-1])
+    return points
+
+class Router:
+    """
+    Point to point routes around land on a map. Searches A* on a CostMap
+    (built on the first blocked query) and pulls the grid path tight with
+    line of sight checks on the full resolution distance field, which
+    gives any-angle routes like Theta*. Direct legs skip the search and
+    recent routes are cached.
+    """
+
+    def __init__(self, clearance, safety_margin=DEFAULT_SAFETY_MARGIN, cache_size=ROUTE_CACHE_SIZE,
+                 max_cells=MAX_GRID_CELLS):
+        self.clearance = clearance
+        self.safety_margin = safety_margin
+        self.cache_size = cache_size
+        self.max_cells = max_cells
+        self.costmap = None
+        self.cache = OrderedDict()  # rounded (x0, y0, x1, y1) -> route, least recently used first
+
+    def get_costmap(self):
+        if self.costmap is None:
+            with timed("router.costmap"):
+                self.costmap = CostMap(self.clearance, self.safety_margin, self.max_cells)
+        return self.costmap
+
+    def route(self, start, goal):
+        """
+        Waypoints from start to goal, both included, staying safety_margin
+        away from land. Returns an (n, 2) array or None if goal is unreachable.
+        """
+        key = (round(start[0]), round(start[1]), round(goal[0]), round(goal[1]))
+        if key in self.cache:
+            count("router.cache_hits")
+            self.cache.move_to_end(key)
+            route = self.cache[key]
+            return None if route is None else route.copy()
+        route = self.find_route(start, goal)
+        self.cache[key] = route
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return None if route is None else route.copy()
+
+    def find_route(self, start, goal):
+        start = (float(start[0]), float(start[1]))
+        goal = (float(goal[0]), float(goal[1]))
+        if not (self.clearance.is_safe(*start, self.safety_margin) and
+                self.clearance.is_safe(*goal, self.safety_margin)):
+            return None
+        if not segment_is_blocked(self.clearance, start, goal, self.safety_margin):
+            return np.array([start, goal])
+        costmap = self.get_costmap()
+        start_cell = costmap.nearest_passable(*costmap.to_cell(*start))
+        goal_cell = costmap.nearest_passable(*costmap.to_cell(*goal))
+        if start_cell is None or goal_cell is None:
+            return None
+        with timed("router.astar"):
+            cells = astar(costmap, start_cell, goal_cell)
+        if cells is None:
+            return None
+        points = [start] + [costmap.cell_center(*cell) for cell in turning_points(cells)] + [goal]
+        return self.pull_tight(np.array(points))
+
+    def route_path(self, points):
+        """
+        A path with every leg leaving the safe water replaced by a route
+        around land. Legs that cannot be routed are kept as they are.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        blocked = blocked_segments(self.clearance, points, self.safety_margin)
+        if len(blocked) == 0:
+            return points
+        pieces = []
+        previous = 0
+        for leg in blocked.tolist():
+            route = self.route(points[leg], points[leg + 1])
+            if route is None:
+                continue
+            pieces.append(points[previous:leg + 1])
+            pieces.append(route[1:-1])
+            previous = leg + 1
+        pieces.append(points[previous:])
+        return np.vstack(pieces)
+    
+    def pull_tight(self, points):
+        """Drop the points of a route that the previous kept point can see past"""
+        kept = [0]
+        while kept[-1] < len(points) - 1:
+            anchor = kept[-1]
+            ahead = points[anchor + 1:]
+            blocked = blocked_pairs(self.clearance, np.repeat(points[anchor:anchor + 1], len(ahead), axis=0),
+                                    ahead, self.safety_margin)
+            visible = np.flatnonzero(~blocked)
+            # Grid steps are always kept, even if the snapped ends make them graze the margin
+            kept.append(anchor + 1 + (int(visible[-1]) if len(visible) else 0))
+        return points[kept]
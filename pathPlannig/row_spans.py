@@ -0,0 +1,59 @@
+import numpy as np
+
+
+class RowSpanIndex:
+    """
+    Per-row index of the free-space intervals of a map image.
+
+    The index is built once with a vectorized pass over the whole image and
+    stored in CSR form: the spans of row y are starts[row_ptr[y]:row_ptr[y+1]]
+    and ends[row_ptr[y]:row_ptr[y+1]] (inclusive pixel columns).
+    """
+
+    def __init__(self, free_mask):
+        free_mask = np.asarray(free_mask, dtype=bool)
+        self.height, self.width = free_mask.shape
+
+        # A span starts on a free pixel whose left neighbour is blocked and
+        # ends on a free pixel whose right neighbour is blocked
+        rising = free_mask.copy()
+        rising[:, 1:] &= ~free_mask[:, :-1]
+        falling = free_mask.copy()
+        falling[:, :-1] &= ~free_mask[:, 1:]
+        start_rows, starts = np.nonzero(rising)
+        _, ends = np.nonzero(falling)
+
+        self.starts = starts.astype(np.int32)
+        self.ends = ends.astype(np.int32)
+        counts = np.bincount(start_rows, minlength=self.height)
+        self.row_ptr = np.zeros(self.height + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.row_ptr[1:])
+
+    @classmethod
+    def from_map(cls, map_img, free_value=255):
+        """Build the index from a PGM map, where free_value marks navigable pixels"""
+        return cls(np.asarray(map_img) == free_value)
+
+    def row_range(self, y):
+        """Return (x_min, x_max) of the free space on row y, or (None, None)"""
+        if y < 0 or y >= self.height:
+            return None, None
+        lo = self.row_ptr[y]
+        hi = self.row_ptr[y + 1]
+        if lo == hi:
+            return None, None
+        return int(self.starts[lo]), int(self.ends[hi - 1])
+
+    def row_spans(self, y):
+        """Return the free intervals of row y as an (n, 2) array of [start, end]"""
+        if y < 0 or y >= self.height:
+            return np.empty((0, 2), dtype=np.int32)
+        lo = self.row_ptr[y]
+        hi = self.row_ptr[y + 1]
+        return np.column_stack((self.starts[lo:hi], self.ends[lo:hi]))
+
+    def span_count(self, y):
+        """Number of free intervals on row y"""
+        if y < 0 or y >= self.height:
+            return 0
+        return int(self.row_ptr[y + 1] - self.row_ptr[y])
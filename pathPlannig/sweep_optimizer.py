@@ -0,0 +1,165 @@
+import math
+
+import cv2
+import numpy as np
+
+from mapGenrating.clearance import DEFAULT_SAFETY_MARGIN, ClearanceMap
+from mapGenrating.instrumentation import count, timed
+from pathPlannig.bulk_ops import run_in_processes
+from pathPlannig.boustrophedon import BoustrophedonPlanner
+
+# Sweep directions tried, in degrees from the map x axis
+CANDIDATE_ANGLES = tuple(range(0, 180, 15))
+# Longest side of the mask the angles are evaluated on
+EVALUATION_SIZE = 1024
+# Angles times evaluated pixels from which the angles go to worker processes
+# when no worker count is given, about a second of evaluation in one process:
+# below, handing the masks to the workers costs more than it saves
+PARALLEL_MIN_WORK = 1 << 28
+# Mission time model: boat speed along the sweep lines and time lost per turn
+SWEEP_SPEED = 1.0  # m/s
+TURN_TIME = 8.0  # s
+
+
+def rotation(shape, angle):
+    """
+    Affine matrix rotating an image of shape (height, width) by angle
+    degrees onto a canvas large enough to hold all of it, and the canvas
+    size as (width, height)
+    """
+    height, width = shape
+    center = (width / 2.0, height / 2.0)
+    matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
+    cos = abs(matrix[0, 0])
+    sin = abs(matrix[0, 1])
+    new_width = int(math.ceil(height * sin + width * cos))
+    new_height = int(math.ceil(height * cos + width * sin))
+    matrix[0, 2] += new_width / 2.0 - center[0]
+    matrix[1, 2] += new_height / 2.0 - center[1]
+    return matrix, (new_width, new_height)
+
+def rotate_image(image, angle, interpolation=cv2.INTER_NEAREST):
+    """Image rotated by angle degrees, outside is 0"""
+    matrix, size = rotation(image.shape, angle)
+    return cv2.warpAffine(np.ascontiguousarray(image), matrix, size, flags=interpolation,
+                          borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+
+def transform_points(matrix, points):
+    """Apply an affine matrix to (n, 2) pixel coordinates (pixel centers at +0.5)"""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    return (points - 0.5) @ matrix[:, :2].T + matrix[:, 2] + 0.5
+
+def sweep_cost(mask, angle, line_spacing, scale, resolution,
+               sweep_speed=SWEEP_SPEED, turn_time=TURN_TIME):
+    """
+    Estimated cost of sweeping the safe water of mask along direction angle
+    mask: boolean safe water mask, downsampled by scale from the map
+    line_spacing: distance between sweep lines in map pixels
+    Returns a dict with the angle, the path length in meters, the number
+    of turns and the estimated mission time in seconds.
+    """
+    rotated = rotate_image(mask.astype(np.uint8), angle).astype(bool)
+    rows = np.round(np.arange(0, rotated.shape[0], line_spacing / scale)).astype(np.intp)
+    lines = rotated[rows[rows < rotated.shape[0]]]
+    # Every free interval of a sweep line is swept once and ends in two turns
+    starts = lines.copy()
+    starts[:, 1:] &= ~lines[:, :-1]
+    spans = int(starts.sum())
+    swept_px = lines.sum() * scale
+    # Moving to the next line, once per swept line
+    transits_px = np.count_nonzero(lines.any(axis=1)) * line_spacing
+    length_m = float(swept_px + transits_px) * resolution
+    turns = 2 * spans
+    return {
+        "angle": angle,
+        "length_m": round(length_m, 1),
+        "turns": turns,
+        "seconds": round(length_m / sweep_speed + turns * turn_time, 1),
+    }
+
+def evaluate_angles(mask, resolution, angles=CANDIDATE_ANGLES, line_spacing=60, workers=None,
+                    progress=None):
+    """
+    sweep_cost of every candidate angle, each on its own rotation of a
+    downsampled copy of mask
+    workers: processes to use, 1 evaluates in the calling process. By
+        default the angles go to the shared pool of all cores once there
+        are PARALLEL_MIN_WORK angles times pixels to evaluate: an angle
+        takes a few milliseconds on the downsampled mask.
+    progress: optional callback called with the fraction of angles evaluated
+    """
+    scale = max(1, int(math.ceil(max(mask.shape) / EVALUATION_SIZE)))
+    small = np.asarray(mask)[::scale, ::scale]
+    if workers is None and len(angles) * small.size < PARALLEL_MIN_WORK:
+        workers = 1
+    tasks = [(small, angle, line_spacing, scale, resolution) for angle in angles]
+    return run_in_processes(sweep_cost, tasks, workers, progress)
+
+class SweepAnglePlanner:
+    """
+    Boustrophedon coverage along the cheapest sweep direction. The safe
+    water is evaluated at CANDIDATE_ANGLES (estimated path length and
+    turns), then the distance field is rotated once by the best angle,
+    swept with BoustrophedonPlanner and the path rotated back.
+    """
+
+    def __init__(self, map_img, clearance=None, safety_margin=DEFAULT_SAFETY_MARGIN,
+                 angles=CANDIDATE_ANGLES, vertical_step=60, workers=None):
+        """
+        clearance: ClearanceMap of map_img, computed if not given
+        safety_margin: distance in meters kept from borders and land
+        workers: processes evaluating the angles, see evaluate_angles
+        """
+        self.map_img = map_img
+        self.clearance = clearance if clearance is not None else ClearanceMap.compute(map_img)
+        self.safety_margin = safety_margin
+        self.angles = angles
+        self.vertical_step = vertical_step
+        self.workers = workers
+        self.evaluations = []
+        self.angle = None
+
+    def best_angle(self, progress=None):
+        """Evaluate the candidate angles, returns the one with the lowest estimated time"""
+        with timed("sweep_angle.evaluate"):
+            self.evaluations = evaluate_angles(self.clearance.safe_mask(self.safety_margin),
+                                               self.clearance.resolution, self.angles,
+                                               self.vertical_step, self.workers, progress)
+        count("sweep_angle.angles", len(self.evaluations))
+        best = min(self.evaluations, key=lambda evaluation: evaluation["seconds"])
+        return best["angle"]
+
+    def generate_path(self, x0, y0, progress=None):
+        """
+        progress: optional callback called with the completed fraction (0 to 1),
+            may raise to abort the planning
+        """
+        self.angle = self.best_angle(
+            progress=(lambda fraction: progress(0.3 * fraction)) if progress else None)
+        if self.angle == 0:
+            planner = BoustrophedonPlanner(self.map_img, self.clearance, self.safety_margin,
+                                           vertical_step=self.vertical_step)
+            return planner.generate_path(x0, y0, progress=progress)
+
+        # Distances do not change with rotation, so the field is rotated as
+        # is. Interpolating it keeps the rotated shoreline from breaking up
+        # into single pixel steps, which would split the boustrophedon cells.
+        matrix, _ = rotation(self.map_img.shape, self.angle)
+        rotated = ClearanceMap(rotate_image(np.asarray(self.clearance.dist), self.angle, cv2.INTER_LINEAR),
+                               self.clearance.resolution)
+        # Sweep ends land exactly on the margin, keep two more pixels so they
+        # still keep it once rotated back to whole pixels of the map
+        margin = self.safety_margin + 2 * self.clearance.resolution
+        # Specks of safe water a pixel wide are left where the shoreline
+        # stair steps meet the new rows, each would become a cell
+        safe = rotated.safe_mask(margin)
+        opened = cv2.morphologyEx(safe.astype(np.uint8), cv2.MORPH_OPEN, np.ones((3, 3), np.uint8))
+        rotated.dist[safe & (opened == 0)] = math.ceil(rotated.threshold(margin)) - 1
+        rotated_map = np.where(rotated.dist > 0, 255, 0).astype(np.uint8)
+        planner = BoustrophedonPlanner(rotated_map, rotated, margin, vertical_step=self.vertical_step)
+        start = transform_points(matrix, [(x0, y0)])[0]
+        points = planner.generate_path(
+            *start, progress=(lambda fraction: progress(0.3 + 0.7 * fraction)) if progress else None)
+        # The first point is the start itself, keep it exact
+        path = transform_points(cv2.invertAffineTransform(matrix), points[1:])
+        return [(float(x0), float(y0))] + [tuple(point) for point in path.tolist()]
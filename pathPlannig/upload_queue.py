@@ -0,0 +1,300 @@
+import glob
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+
+from mapGenrating.firebase_app import CREDENTIAL_PATH, DATABASE_URL, get_database
+
+# Database location of the uploaded coverage plans, one child per plan key
+FIREBASE_PLANS_PATH = 'navigation/coverage_path_planning'
+# Multi-path updates per request
+DEFAULT_CHUNK_SIZE = 500
+# Set to a JSON file to upload there instead of Firebase
+UPLOAD_JSON_ENV = "WAYPOINT_UPLOAD_JSON"
+# Children of a plan holding its waypoints, uploads alternate between them
+# and active_version names the complete one
+PLAN_VERSIONS = ("a", "b")
+# Acknowledged waypoints of every plan, plan keys never start with a dot
+# so it cannot be taken for an outbox item
+STATE_FILE = ".sent_state.json"
+
+
+def plan_key(map_name):
+    """Stable database key of the plan of a map (no . $ # [ ] / allowed)"""
+    return re.sub(r"[.$#\[\]/\s]+", "_", map_name or "").strip("_") or "unnamed"
+
+def vessel_key(map_name, vessel):
+    """Database key of the plan of one vessel (0 based) of a fleet plan of a map"""
+    return f"{plan_key(map_name)}_vessel{vessel + 1}"
+
+def point_hash(record):
+    """Short content hash of one waypoint record"""
+    payload = json.dumps(record, sort_keys=True).encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=8).hexdigest()
+
+def write_json(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+class FirebaseUploadBackend:
+    """Uploads to the Firebase realtime database with multi-path updates"""
+
+    def __init__(self, credential_path=CREDENTIAL_PATH, database_url=DATABASE_URL,
+                 plans_path=FIREBASE_PLANS_PATH):
+        self.credential_path = credential_path
+        self.database_url = database_url
+        self.plans_path = plans_path
+
+    def update(self, key, values):
+        """Apply {relative path: value} to the plan at key, None deletes"""
+        db = get_database(self.credential_path, self.database_url)
+        db.reference(f"{self.plans_path}/{key}").update(values)
+
+class JsonUploadBackend:
+    """
+    Local stand-in for FirebaseUploadBackend, keeping the plans in a JSON
+    file with the database layout. fail_next makes the next updates raise,
+    to exercise the retries.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.fail_next = 0
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f) or {}
+        except FileNotFoundError:
+            return {}
+
+    def update(self, key, values):
+        with self.lock:
+            self.requests += 1
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                raise ConnectionError("simulated upload failure")
+            data = self.load()
+            plan = data.setdefault(key, {})
+            for path, value in values.items():
+                *parents, leaf = path.split("/")
+                node = plan
+                for part in parents:
+                    node = node.setdefault(part, {})
+                if value is None:
+                    node.pop(leaf, None)
+                else:
+                    node[leaf] = value
+            write_json(self.path, data)
+
+    def plan(self, key):
+        """
+        Uploaded plan as the boat reads it: the metadata with the waypoints
+        of the active version as a list
+        """
+        plan = dict(self.load().get(key, {}))
+        versions = plan.pop("versions", {})
+        points = versions.get(plan.get("active_version"), {}).get("waypoints", {})
+        plan["waypoints"] = [points[i] for i in sorted(points, key=int)]
+        return plan
+
+def default_backend():
+    """Firebase backend, or the local JSON stand-in if WAYPOINT_UPLOAD_JSON is set"""
+    json_path = os.environ.get(UPLOAD_JSON_ENV)
+    if json_path:
+        return JsonUploadBackend(json_path)
+    return FirebaseUploadBackend()
+
+class UploadQueue:
+    """
+    Persistent outbox of waypoint plans with a background sender.
+
+    Every enqueued plan is written to outbox_dir/<key>.json before returning,
+    a newer plan for the same key replacing the pending one, so nothing is
+    lost if the application quits while offline. The sender uploads the plan
+    as chunks of multi-path updates and retries failed uploads with
+    exponential backoff.
+
+    The waypoints go to versions/<v>/waypoints of the plan, alternating
+    between the versions in PLAN_VERSIONS: an upload fills the version the
+    boat is not reading, then one multi-path update writes the metadata
+    and switches active_version to it, so the boat never sees a partly
+    uploaded plan. Uploads are deltas: the hash of every acknowledged
+    waypoint of every version is kept in outbox_dir/.sent_state.json and
+    only the waypoints added, changed or removed since that version was
+    last written are sent. Acknowledgements are recorded per chunk, so a
+    retry resumes where the failed attempt stopped.
+    """
+
+    def __init__(self, outbox_dir, backend, chunk_size=DEFAULT_CHUNK_SIZE,
+                 base_delay=1.0, max_delay=300.0):
+        self.outbox_dir = outbox_dir
+        self.backend = backend
+        self.chunk_size = chunk_size
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.state_path = os.path.join(outbox_dir, STATE_FILE)
+        os.makedirs(outbox_dir, exist_ok=True)
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.thread = None
+        self.listeners = []
+        # key -> {"active": version, "versions": {version: acknowledged point hashes}}
+        self.sent = self.load_state()
+
+    def load_state(self):
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def item_path(self, key):
+        return os.path.join(self.outbox_dir, f"{key}.json")
+
+    def pending(self):
+        """Keys of the plans waiting in the outbox"""
+        paths = glob.glob(os.path.join(self.outbox_dir, "*.json"))
+        return sorted(os.path.splitext(os.path.basename(path))[0]
+                      for path in paths if path != self.state_path)
+
+    def add_listener(self, callback):
+        """Call callback(key, status, message) with status "sent", "retry" or "progress" """
+        self.listeners.append(callback)
+
+    def notify(self, key, status, message):
+        for callback in self.listeners:
+            callback(key, status, message)
+
+    def enqueue(self, key, data):
+        """Store a plan in the outbox and wake up the sender"""
+        with self.lock:
+            write_json(self.item_path(key), {"key": key, "data": data,
+                                             "attempts": 0, "next_attempt": 0.0})
+        self.wakeup.set()
+
+    def load_item(self, key):
+        try:
+            with open(self.item_path(key)) as f:
+                item = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        # The acknowledgements of older versions were kept in sent.json
+        return item if "key" in item else None
+
+    def save_state(self, key, state):
+        """Record the acknowledged waypoints of a plan"""
+        with self.lock:
+            self.sent[key] = state
+            write_json(self.state_path, self.sent)
+
+    def send(self, item):
+        """Upload one outbox item, raises if the backend fails"""
+        key = item["key"]
+        data = item["data"]
+        records = data.get("waypoints", [])
+        hashes = [point_hash(record) for record in records]
+        state = self.sent.get(key, {"active": None, "versions": {}})
+        # Fill the version the boat is not reading
+        version = next(v for v in PLAN_VERSIONS if v != state["active"])
+        acked = list(state["versions"].get(version, []))
+        prefix = f"versions/{version}/waypoints"
+        # Waypoints that are new or differ from the acknowledged ones
+        updates = [(f"{prefix}/{i}", records[i]) for i, h in enumerate(hashes)
+                   if i >= len(acked) or acked[i] != h]
+        # Waypoints past the end of the new plan
+        updates += [(f"{prefix}/{i}", None) for i in range(len(hashes), len(acked))
+                    if acked[i] is not None]
+        acked += [None] * (len(hashes) - len(acked))
+
+        for start in range(0, len(updates), self.chunk_size):
+            chunk = updates[start:start + self.chunk_size]
+            self.backend.update(key, dict(chunk))
+            for path, value in chunk:
+                i = int(path.rsplit("/", 1)[1])
+                acked[i] = hashes[i] if value is not None else None
+            state["versions"][version] = list(acked)
+            self.save_state(key, state)
+            self.notify(key, "progress", f"Uploaded {start + len(chunk)}/{len(updates)} changed waypoints")
+
+        # Metadata and the switch to the new version in one update, the
+        # waypoints of plans uploaded before versions are dropped with it
+        meta = {name: value for name, value in data.items() if name != "waypoints"}
+        meta["waypoint_count"] = len(records)
+        meta["active_version"] = version
+        meta["waypoints"] = None
+        self.backend.update(key, meta)
+        state["active"] = version
+        state["versions"][version] = acked[:len(hashes)]
+        self.save_state(key, state)
+        return len(updates)
+
+    def process(self, now=None):
+        """
+        Send every outbox item that is due, in the calling thread
+        Returns the delay in seconds until the next item is due, or None
+        """
+        now = time.time() if now is None else now
+        next_due = None
+        for key in self.pending():
+            item = self.load_item(key)
+            if item is None:
+                continue
+            if item["next_attempt"] > now:
+                next_due = min(next_due or item["next_attempt"], item["next_attempt"])
+                continue
+            try:
+                changed = self.send(item)
+            except Exception as e:
+                item["attempts"] += 1
+                delay = min(self.max_delay, self.base_delay * 2 ** (item["attempts"] - 1))
+                # Jitter so that many clients coming back online do not retry together
+                delay *= random.uniform(0.5, 1.0)
+                item["next_attempt"] = time.time() + delay
+                with self.lock:
+                    # Keep a newer plan enqueued meanwhile
+                    current = self.load_item(key)
+                    if current is not None and current["data"] == item["data"]:
+                        write_json(self.item_path(key), item)
+                next_due = min(next_due or item["next_attempt"], item["next_attempt"])
+                self.notify(key, "retry", f"Upload failed ({str(e)}), retrying in {delay:.1f}s")
+                continue
+            with self.lock:
+                current = self.load_item(key)
+                if current is not None and current["data"] == item["data"]:
+                    os.remove(self.item_path(key))
+            self.notify(key, "sent", f"Uploaded {len(item['data'].get('waypoints', []))} waypoints "
+                                     f"({changed} changed)")
+        if next_due is None:
+            return None
+        return max(next_due - time.time(), 0.0)
+
+    def run(self):
+        while not self.stopping.is_set():
+            self.wakeup.clear()
+            delay = self.process()
+            # Sleep until the next retry is due or a plan is enqueued
+            self.wakeup.wait(delay)
+
+    def start(self):
+        """Start the background sender, pending items of a previous run are sent too"""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.run, name="waypoint-upload", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=None):
+        self.stopping.set()
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
@@ -0,0 +1,208 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mapGenrating.firebase_app import CREDENTIAL_PATH, DATABASE_URL, get_database
+
+# Database location of the operator accounts
+FIREBASE_USERS_PATH = 'users'
+# Set to a JSON file with the database layout to use it instead of Firebase
+USERS_JSON_ENV = "USERS_JSON"
+# Set to 1 to replace the plaintext passwords found at login by their hash
+MIGRATE_PASSWORDS_ENV = "MIGRATE_LEGACY_PASSWORDS"
+HASH_ALGORITHM = "pbkdf2_sha256"
+PBKDF2_ITERATIONS = 200000
+# Seconds a verified login is remembered
+SESSION_TTL = 300
+
+
+def hash_password(password, salt=None, iterations=PBKDF2_ITERATIONS):
+    """Salted hash of a password, stored as pbkdf2_sha256$iterations$salt$hash"""
+    if salt is None:
+        salt = base64.b64encode(secrets.token_bytes(16)).decode("ascii")
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt.encode("ascii"), iterations)
+    return f"{HASH_ALGORITHM}${iterations}${salt}${base64.b64encode(digest).decode('ascii')}"
+
+def verify_password(password, user_data):
+    """
+    Check a password against a user record, in constant time
+    Records created before hashing only have a plaintext 'password' field,
+    they are still accepted.
+    """
+    stored = user_data.get("password_hash")
+    if stored:
+        try:
+            algorithm, iterations, salt, _ = stored.split("$")
+            iterations = int(iterations)
+        except ValueError:
+            return False
+        if algorithm != HASH_ALGORITHM:
+            return False
+        return hmac.compare_digest(hash_password(password, salt, iterations), stored)
+    legacy = user_data.get("password")
+    if legacy is None:
+        return False
+    return hmac.compare_digest(password.encode("utf-8"), str(legacy).encode("utf-8"))
+
+class FirebaseUserBackend:
+    """
+    Operator accounts in the Firebase realtime database. Users are looked
+    up with an indexed query, which needs ".indexOn": ["username"] on the
+    users node in the database rules.
+    """
+
+    def __init__(self, credential_path=CREDENTIAL_PATH, database_url=DATABASE_URL,
+                 users_path=FIREBASE_USERS_PATH):
+        self.credential_path = credential_path
+        self.database_url = database_url
+        self.users_path = users_path
+
+    def reference(self):
+        db = get_database(self.credential_path, self.database_url)
+        return db.reference(self.users_path)
+
+    def find_user(self, username):
+        """Returns (user_id, user_data) of the user, or (None, None)"""
+        users = self.reference().order_by_child('username').equal_to(username).limit_to_first(1).get()
+        for user_id, user_data in (users or {}).items():
+            return user_id, user_data
+        return None, None
+
+    def update_user(self, user_id, values):
+        self.reference().child(user_id).update(values)
+
+class JsonUserBackend:
+    """Local stand-in for FirebaseUserBackend reading a JSON file with the database layout"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def load(self):
+        with open(self.path) as f:
+            return json.load(f) or {}
+
+    def find_user(self, username):
+        for user_id, user_data in self.load().items():
+            if user_data.get('username') == username:
+                return user_id, user_data
+        return None, None
+
+    def update_user(self, user_id, values):
+        with self.lock:
+            users = self.load()
+            user = users.setdefault(user_id, {})
+            for name, value in values.items():
+                if value is None:
+                    user.pop(name, None)
+                else:
+                    user[name] = value
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(users, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+class Authenticator:
+    """
+    Verifies operator logins against a user backend and remembers verified
+    logins for ttl seconds, so repeated logins and privilege checks do not
+    go to the database.
+
+    The cache holds an HMAC of the password under a key that only lives in
+    this process, never the password itself. A plaintext password found in
+    the database is replaced by its salted hash after a successful login
+    when migrate_legacy is set. The migration is best effort: when the
+    write fails the login still succeeds and the record is left as it was.
+    """
+
+    def __init__(self, backend, ttl=SESSION_TTL, migrate_legacy=False):
+        self.backend = backend
+        self.ttl = ttl
+        self.migrate_legacy = migrate_legacy
+        self.cache_key = secrets.token_bytes(32)
+        self.sessions = {}  # username -> (password hmac, is_admin, expires)
+        self.lock = threading.Lock()
+
+    def password_mac(self, password):
+        return hmac.new(self.cache_key, password.encode("utf-8"), hashlib.sha256).digest()
+
+    def cached_session(self, username):
+        with self.lock:
+            session = self.sessions.get(username)
+            if session is not None and session[2] < time.monotonic():
+                del self.sessions[username]
+                session = None
+        return session
+
+    def check_credentials(self, username, password):
+        """Returns (is_valid, is_admin), is_admin is None for invalid logins"""
+        session = self.cached_session(username)
+        if session is not None and hmac.compare_digest(session[0], self.password_mac(password)):
+            return True, session[1]
+
+        user_id, user_data = self.backend.find_user(username)
+        if user_data is None or not verify_password(password, user_data):
+            return False, None
+        if self.migrate_legacy and not user_data.get("password_hash"):
+            self.migrate_password(user_id, username, password)
+
+        # Check if user is admin
+        is_admin = user_data.get('privileges') == 'admin'
+        with self.lock:
+            self.sessions[username] = (self.password_mac(password), is_admin, time.monotonic() + self.ttl)
+        return True, is_admin
+
+    def migrate_password(self, user_id, username, password):
+        """Store the hash of a legacy plaintext password in place of the password"""
+        try:
+            self.backend.update_user(user_id, {"password_hash": hash_password(password), "password": None})
+        except Exception as e:
+            print(f"Error migrating the password of {username}: {str(e)}")
+
+    def is_admin(self, username):
+        """Privileges of a user logged in within the last ttl seconds, None if unknown"""
+        session = self.cached_session(username)
+        return None if session is None else session[1]
+
+    def logout(self, username):
+        with self.lock:
+            self.sessions.pop(username, None)
+
+# Shared authenticator, created on first use
+_authenticator = None
+
+def default_backend():
+    """Firebase backend, or the local JSON stand-in if USERS_JSON is set"""
+    json_path = os.environ.get(USERS_JSON_ENV)
+    if json_path:
+        return JsonUserBackend(json_path)
+    return FirebaseUserBackend()
+
+def get_authenticator():
+    global _authenticator
+    if _authenticator is None:
+        migrate = os.environ.get(MIGRATE_PASSWORDS_ENV, "") not in ("", "0")
+        _authenticator = Authenticator(default_backend(), migrate_legacy=migrate)
+    return _authenticator
+
+def check_user_credentials(username, password):
+    """Check user credentials against Firebase database"""
+    try:
+        return get_authenticator().check_credentials(username, password)
+    except Exception as e:
+        print(f"Error checking credentials: {str(e)}")
+        return False, None
+
+if __name__ == "__main__":
+    # Print the password_hash value to store for a new operator
+    if len(sys.argv) != 2:
+        print("usage: python3 user_auth.py <password>")
+        sys.exit(2)
+    print(hash_password(sys.argv[1]))
@@ -0,0 +1,341 @@
+import math
+
+import numpy as np
+
+# Waypoint record: pixel coordinates plus optional heading (radians) and
+# speed (m/s), NaN when not set. All fields are float64 so the records can
+# also be viewed as a plain (n, 4) array.
+WAYPOINT_DTYPE = np.dtype([("x", np.float64), ("y", np.float64),
+                           ("heading", np.float64), ("speed", np.float64)])
+# Inserts and removes applied lazily to the id -> position table before it
+# is rebuilt, every lookup replays them
+MAX_PENDING_SHIFTS = 64
+
+
+def pixels_to_meters(xy, resolution, height):
+    """Convert (n, 2) pixel coordinates to map meters (origin bottom-left, y up)"""
+    xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+    meters = np.empty_like(xy)
+    meters[:, 0] = xy[:, 0] * resolution
+    meters[:, 1] = (height - xy[:, 1]) * resolution
+    return meters
+
+class WaypointStore:
+    """
+    Ordered waypoint list backed by a growable structured NumPy array
+    (see WAYPOINT_DTYPE), with a grid-bucket spatial index for
+    nearest-neighbour and radius queries.
+
+    Waypoints keep their path order in the array. Every waypoint also gets a
+    stable id; the buckets map a grid cell to the ids (and coordinates) of the
+    waypoints inside it, so queries only look at the cells around the query
+    point instead of every waypoint. A table maps the ids back to positions:
+    inserts and removes only log the shift they cause, and lookups apply the
+    shifts logged after their table entry was written.
+    """
+
+    def __init__(self, cell_size=64.0, capacity=64):
+        self.cell_size = float(cell_size)
+        self._data = np.empty(capacity, dtype=WAYPOINT_DTYPE)
+        self._ids = np.empty(capacity, dtype=np.int64)
+        self._size = 0
+        self._next_id = 0
+        self._buckets = {}  # (cx, cy) -> {id: (x, y)}
+        self._id_positions = np.empty(capacity, dtype=np.int64)
+        # Shifts logged before the table entry of every id was written
+        self._id_shifts = np.empty(capacity, dtype=np.int64)
+        self._shifts = []  # (index, +1 insert or -1 remove)
+        self._cell_bounds = None  # (cx_min, cy_min, cx_max, cy_max) of all cells ever used
+
+    def __len__(self):
+        return self._size
+
+    def __bool__(self):
+        return self._size > 0
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._size
+        if index < 0 or index >= self._size:
+            raise IndexError("waypoint index out of range")
+        return float(self._data["x"][index]), float(self._data["y"][index])
+
+    def __iter__(self):
+        for x, y in self.xy.tolist():
+            yield x, y
+
+    @property
+    def records(self):
+        """Structured view of the waypoints, in path order"""
+        return self._data[:self._size]
+
+    @property
+    def xy(self):
+        """(n, 2) view of the waypoint pixel coordinates, in path order"""
+        return self._raw()[:self._size, :2]
+
+    def _raw(self):
+        # Plain float view of the records, much faster to shift than the structured array
+        return self._data.view(np.float64).reshape(-1, len(WAYPOINT_DTYPE))
+
+    def cell(self, x, y):
+        return int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size))
+
+    def _reserve(self, size):
+        capacity = len(self._data)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        data = np.empty(capacity, dtype=WAYPOINT_DTYPE)
+        data[:self._size] = self._data[:self._size]
+        ids = np.empty(capacity, dtype=np.int64)
+        ids[:self._size] = self._ids[:self._size]
+        self._data = data
+        self._ids = ids
+
+    def _reserve_ids(self, count):
+        capacity = len(self._id_positions)
+        if count <= capacity:
+            return
+        while capacity < count:
+            capacity *= 2
+        for name in ("_id_positions", "_id_shifts"):
+            table = np.empty(capacity, dtype=np.int64)
+            table[:self._next_id] = getattr(self, name)[:self._next_id]
+            setattr(self, name, table)
+
+    def _shift(self, index, step):
+        """Log that the waypoints from index on moved by step"""
+        self._shifts.append((index, step))
+        if len(self._shifts) > MAX_PENDING_SHIFTS:
+            ids = self._ids[:self._size]
+            self._id_positions[ids] = np.arange(self._size)
+            self._id_shifts[ids] = 0
+            self._shifts = []
+
+    def _index(self, waypoint_id, x, y):
+        cx, cy = self.cell(x, y)
+        self._buckets.setdefault((cx, cy), {})[waypoint_id] = (x, y)
+        if self._cell_bounds is None:
+            self._cell_bounds = (cx, cy, cx, cy)
+        else:
+            x0, y0, x1, y1 = self._cell_bounds
+            self._cell_bounds = (min(x0, cx), min(y0, cy), max(x1, cx), max(y1, cy))
+
+    def _unindex(self, waypoint_id, x, y):
+        key = self.cell(x, y)
+        bucket = self._buckets[key]
+        del bucket[waypoint_id]
+        if not bucket:
+            del self._buckets[key]
+
+    def _position(self, waypoint_id):
+        position = int(self._id_positions[waypoint_id])
+        for index, step in self._shifts[self._id_shifts[waypoint_id]:]:
+            if position > index or (step > 0 and position == index):
+                position += step
+        return position
+
+    def _positions(self, ids):
+        """Like _position for an array of ids"""
+        positions = self._id_positions[ids]
+        logged = self._id_shifts[ids]
+        for shift, (index, step) in enumerate(self._shifts):
+            moved = (positions > index) if step < 0 else (positions >= index)
+            positions += step * (moved & (logged <= shift))
+        return positions
+
+    def insert(self, index, x, y, heading=np.nan, speed=np.nan):
+        """Insert a waypoint before position index"""
+        index = min(max(index, 0), self._size)
+        self._reserve(self._size + 1)
+        n = self._size
+        raw = self._raw()
+        raw[index + 1:n + 1] = raw[index:n]
+        self._ids[index + 1:n + 1] = self._ids[index:n]
+        self._data[index] = (x, y, heading, speed)
+        self._ids[index] = self._next_id
+        self._index(self._next_id, float(x), float(y))
+        self._size += 1
+        # The id tables must hold the new id before a shift can rebuild them
+        self._reserve_ids(self._next_id + 1)
+        if index < n:
+            self._shift(index, 1)
+        self._id_positions[self._next_id] = index
+        self._id_shifts[self._next_id] = len(self._shifts)
+        self._next_id += 1
+
+    def append(self, x, y, heading=np.nan, speed=np.nan):
+        self.insert(self._size, x, y, heading, speed)
+
+    def extend(self, points):
+        """
+        Append waypoints given as a WAYPOINT_DTYPE array, or as an (n, 2) or
+        (n, 4) array of x, y[, heading, speed]
+        """
+        if isinstance(points, np.ndarray) and points.dtype == WAYPOINT_DTYPE:
+            records = points
+        else:
+            points = np.asarray(points, dtype=np.float64)
+            points = points.reshape(-1, points.shape[-1] if points.ndim > 1 else 2)
+            records = np.full(len(points), np.nan, dtype=WAYPOINT_DTYPE)
+            for column, field in zip(points.T, WAYPOINT_DTYPE.names):
+                records[field] = column
+        count = len(records)
+        self._reserve(self._size + count)
+        self._data[self._size:self._size + count] = records
+        points = np.column_stack((records["x"], records["y"]))
+        ids = np.arange(self._next_id, self._next_id + count)
+        self._ids[self._size:self._size + count] = ids
+        self._reserve_ids(self._next_id + count)
+        self._id_positions[ids] = np.arange(self._size, self._size + count)
+        self._id_shifts[ids] = len(self._shifts)
+        for waypoint_id, (x, y) in zip(ids.tolist(), points.tolist()):
+            self._index(waypoint_id, x, y)
+        self._next_id += count
+        self._size += count
+
+    def remove(self, index):
+        """Remove the waypoint at position index"""
+        if index < 0:
+            index += self._size
+        if index < 0 or index >= self._size:
+            raise IndexError("waypoint index out of range")
+        x, y = self[index]
+        self._unindex(int(self._ids[index]), x, y)
+        n = self._size
+        raw = self._raw()
+        raw[index:n - 1] = raw[index + 1:n]
+        self._ids[index:n - 1] = self._ids[index + 1:n]
+        self._size -= 1
+        if index < self._size:
+            self._shift(index, -1)
+
+    def clear(self):
+        self._size = 0
+        self._next_id = 0
+        self._buckets = {}
+        self._shifts = []
+        self._cell_bounds = None
+
+    def _ring(self, cx, cy, r):
+        """Cells at Chebyshev distance r from (cx, cy)"""
+        if r == 0:
+            yield cx, cy
+            return
+        for dx in range(-r, r + 1):
+            yield cx + dx, cy - r
+            yield cx + dx, cy + r
+        for dy in range(-r + 1, r):
+            yield cx - r, cy + dy
+            yield cx + r, cy + dy
+
+    def nearest(self, x, y):
+        """Position of the waypoint closest to (x, y), or None when empty"""
+        if self._size == 0:
+            return None
+        cx, cy = self.cell(x, y)
+        x0, y0, x1, y1 = self._cell_bounds
+        max_ring = max(abs(cx - x0), abs(cx - x1), abs(cy - y0), abs(cy - y1))
+        best_id = None
+        best_d2 = math.inf
+        r = 0
+        while r <= max_ring:
+            if (2 * r + 1) ** 2 > len(self._buckets):
+                # Rings now cover more cells than are occupied, scan the array instead
+                d2 = np.sum((self.xy - (x, y)) ** 2, axis=1)
+                return int(np.argmin(d2))
+            for key in self._ring(cx, cy, r):
+                for waypoint_id, (px, py) in self._buckets.get(key, {}).items():
+                    d2 = (px - x) ** 2 + (py - y) ** 2
+                    if d2 < best_d2:
+                        best_id, best_d2 = waypoint_id, d2
+            # Cells beyond ring r are at least r cells away from (x, y)
+            if best_id is not None and best_d2 <= (r * self.cell_size) ** 2:
+                break
+            r += 1
+        return self._position(best_id)
+
+    def within_radius(self, x, y, radius):
+        """Positions (ascending) of the waypoints within radius of (x, y)"""
+        if self._size == 0:
+            return np.empty(0, dtype=np.int64)
+        cx0, cy0 = self.cell(x - radius, y - radius)
+        cx1, cy1 = self.cell(x + radius, y + radius)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(self._buckets):
+            keys = self._buckets.keys()
+        else:
+            keys = [(cx, cy) for cx in range(cx0, cx1 + 1) for cy in range(cy0, cy1 + 1)]
+        r2 = radius * radius
+        ids = [waypoint_id
+               for key in keys
+               for waypoint_id, (px, py) in self._buckets.get(key, {}).items()
+               if (px - x) ** 2 + (py - y) ** 2 <= r2]
+        if not ids:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(self._positions(np.array(ids, dtype=np.int64)))
+
+    def to_meters(self, resolution, height):
+        """(n, 2) array of the waypoints in map meters"""
+        return pixels_to_meters(self.xy, resolution, height)
+
+    def to_wgs84(self, georef):
+        """(n, 2) array of the waypoint longitudes, latitudes on a georeferenced map"""
+        return georef.pixels_to_wgs84(self.xy)
+
+    def to_yaml(self, resolution, height, georef=None):
+        """
+        Waypoints in the boat navigation YAML format
+        georef: UtmGeoreference of the map, adds the WGS84 lat/lng of every waypoint
+        """
+        meters = self.to_meters(resolution, height)
+        xs = np.char.mod("%.2f", meters[:, 0]).tolist()
+        ys = np.char.mod("%.2f", meters[:, 1]).tolist()
+        if georef is not None:
+            lnglat = self.to_wgs84(georef)
+            lngs = np.char.mod("%.8f", lnglat[:, 0]).tolist()
+            lats = np.char.mod("%.8f", lnglat[:, 1]).tolist()
+        headings = self.records["heading"]
+        speeds = self.records["speed"]
+        lines = ["# Boat navigation waypoints", "waypoints:"]
+        for i, (x, y) in enumerate(zip(xs, ys)):
+            lines.append(f"  - point{x}_{y}:")
+            lines.append(f"      x: {x}")
+            lines.append(f"      y: {y}")
+            lines.append(f"      name: wp{i+1}")
+            if georef is not None:
+                lines.append(f"      lat: {lats[i]}")
+                lines.append(f"      lng: {lngs[i]}")
+            if not np.isnan(headings[i]):
+                lines.append(f"      heading: {headings[i]:.4f}")
+            if not np.isnan(speeds[i]):
+                lines.append(f"      speed: {speeds[i]:.2f}")
+        return "\n".join(lines) + "\n"
+
+    def to_records(self, resolution, height, georef=None):
+        """
+        Waypoints as a list of dicts in meters, as uploaded to Firebase
+        georef: UtmGeoreference of the map, adds the WGS84 lat/lng of every waypoint
+        """
+        meters = np.round(self.to_meters(resolution, height), 2)
+        headings = self.records["heading"]
+        speeds = self.records["speed"]
+        has_heading = ~np.isnan(headings)
+        has_speed = ~np.isnan(speeds)
+        records = [{
+            "point_number": i,
+            "point_name": f"point{i}",
+            "x": x,
+            "y": y
+        } for i, (x, y) in enumerate(meters.tolist(), 1)]  # Start numbering from 1
+        if georef is not None:
+            lnglat = np.round(self.to_wgs84(georef), 8).tolist()
+            for record, (lng, lat) in zip(records, lnglat):
+                record["lat"] = lat
+                record["lng"] = lng
+        for i in np.flatnonzero(has_heading).tolist():
+            records[i]["heading"] = round(float(headings[i]), 4)
+        for i in np.flatnonzero(has_speed).tolist():
+            records[i]["speed"] = round(float(speeds[i]), 2)
+        return records
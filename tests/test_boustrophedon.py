@@ -0,0 +1,44 @@
+import math
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mapGenrating.clearance import ClearanceMap
+from pathPlannig.boustrophedon import BoustrophedonPlanner
+from pathPlannig.coverage_planner import default_start
+from pathPlannig.path_validation import blocked_segments
+from pathPlannig.sweep_optimizer import SweepAnglePlanner
+
+SAFETY_MARGIN = 0.5
+
+
+def star_lake(size=1200, arms=7, outer=560, inner=220, island=60):
+    """Map of a star shaped lake with an island, 255 on water and 0 on land"""
+    angles = np.arange(2 * arms) * math.pi / arms
+    radii = np.where(np.arange(2 * arms) % 2 == 0, outer, inner)
+    center = size / 2.0
+    polygon = np.column_stack((center + radii * np.cos(angles), center + radii * np.sin(angles)))
+    map_img = np.zeros((size, size), dtype=np.uint8)
+    cv2.fillPoly(map_img, [np.round(polygon).astype(np.int32)], 255)
+    cv2.circle(map_img, (int(center), int(center)), island, 0, -1)
+    return map_img
+
+def plan(planner_class):
+    map_img = star_lake()
+    clearance = ClearanceMap.compute(map_img)
+    planner = planner_class(map_img, clearance, SAFETY_MARGIN)
+    return clearance, planner.generate_path(*default_start(clearance, SAFETY_MARGIN))
+
+def test_boustrophedon_legs_stay_in_safe_water():
+    clearance, points = plan(BoustrophedonPlanner)
+    assert len(points) > 100
+    assert len(blocked_segments(clearance, points)) == 0
+    assert len(blocked_segments(clearance, points, SAFETY_MARGIN)) == 0
+
+def test_sweep_angle_legs_stay_in_water():
+    clearance, points = plan(SweepAnglePlanner)
+    assert len(points) > 100
+    assert len(blocked_segments(clearance, points)) == 0
@@ -0,0 +1,76 @@
+import os
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mapGenrating.clearance import ClearanceMap, clearance_path, compute_clearance, read_clearance_info
+
+
+class Abort(Exception):
+    pass
+
+def striped_map(height=3000, width=500):
+    map_img = np.full((height, width), 255, dtype=np.uint8)
+    map_img[::97] = 0
+    return map_img
+
+def map_file(tmp_path):
+    path = tmp_path / "lake.pgm"
+    path.write_bytes(b"P5")
+    return str(path)
+
+def test_progress_reports_every_band_and_aborts(tmp_path):
+    map_img = striped_map()
+    fractions = []
+    def progress(fraction):
+        fractions.append(fraction)
+        if fraction > 0.5:
+            raise Abort()
+    with pytest.raises(Abort):
+        ClearanceMap.load_or_compute(map_file(tmp_path), map_img, progress=progress)
+    assert fractions == pytest.approx([1024 / 3000, 2048 / 3000])
+    # The aborted computation leaves no temporary file
+    assert os.listdir(tmp_path) == ["lake.pgm"]
+
+def test_overlapping_loads_of_a_map(tmp_path):
+    map_img = striped_map()
+    path = map_file(tmp_path)
+    loaded = []
+    threads = [threading.Thread(target=lambda: loaded.append(ClearanceMap.load_or_compute(path, map_img)))
+               for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    expected = compute_clearance(map_img, 0.05)
+    assert len(loaded) == 3
+    assert all(np.array_equal(clearance.dist, expected) for clearance in loaded)
+    assert sorted(os.listdir(tmp_path)) == ["lake.dist.json", "lake.dist.npy", "lake.pgm"]
+
+def test_cache_is_recomputed_for_another_resolution_or_clamp(tmp_path):
+    map_img = striped_map()
+    path = map_file(tmp_path)
+    ClearanceMap.load_or_compute(path, map_img, 0.05)
+    assert read_clearance_info(path) == {"resolution": 0.05, "max_clearance_px": 200}
+    # Same parameters: the cached field is reused
+    cached = ClearanceMap.load_or_compute(path, map_img, 0.05)
+    assert isinstance(cached.dist, np.memmap)
+    # A coarser map clamps at fewer pixels
+    coarse = ClearanceMap.load_or_compute(path, map_img, 0.25)
+    assert np.array_equal(coarse.dist, compute_clearance(map_img, 0.25))
+    assert read_clearance_info(path) == {"resolution": 0.25, "max_clearance_px": 40}
+    clamped = ClearanceMap.load_or_compute(path, map_img, 0.25, max_clearance_m=1.0)
+    assert np.array_equal(clamped.dist, compute_clearance(map_img, 0.25, 1.0))
+    assert read_clearance_info(path)["max_clearance_px"] == 4
+
+def test_cache_without_parameters_is_recomputed(tmp_path):
+    map_img = striped_map()
+    path = map_file(tmp_path)
+    # A field cached before its parameters were recorded, at another clamp
+    np.save(clearance_path(path), compute_clearance(map_img, 0.05, 1.0))
+    clearance = ClearanceMap.load_or_compute(path, map_img, 0.05)
+    assert np.array_equal(clearance.dist, compute_clearance(map_img, 0.05))
+    assert read_clearance_info(path) == {"resolution": 0.05, "max_clearance_px": 200}
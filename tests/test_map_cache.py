@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mapGenrating.map_cache import MapCache
+
+
+def write_files(cache, key, suffixes=(".pgm", ".yaml")):
+    for suffix in suffixes:
+        with open(os.path.join(cache.cache_dir, key + suffix), "w") as f:
+            f.write("x" * 10)
+
+def test_failed_generation_leaves_no_files(tmp_path):
+    cache = MapCache(str(tmp_path))
+    with pytest.raises(RuntimeError):
+        with cache.writing("abc") as path:
+            assert path == cache.path_for("abc")
+            write_files(cache, "abc", (".pgm", ".yaml", ".dist.npy.x1y2z3.tmp"))
+            raise RuntimeError("cancelled")
+    assert sorted(os.listdir(tmp_path)) == []
+
+def test_finished_generation_is_kept(tmp_path):
+    cache = MapCache(str(tmp_path))
+    with cache.writing("abc"):
+        write_files(cache, "abc")
+    cache.put("abc", name="lake")
+    assert cache.entries["abc"]["size"] == 20
+
+def test_unindexed_files_are_swept_on_startup(tmp_path):
+    cache = MapCache(str(tmp_path))
+    write_files(cache, "kept")
+    cache.put("kept")
+    write_files(cache, "orphan", (".pgm", ".yaml", ".dist.npy.x1y2z3.tmp"))
+    MapCache(str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == ["index.json", "kept.pgm", "kept.yaml"]
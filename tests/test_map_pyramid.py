@@ -0,0 +1,29 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pathPlannig.map_pyramid import MapPyramid
+
+
+def test_build_reports_each_level():
+    pyramid = MapPyramid(np.full((2000, 1500), 255, dtype=np.uint8), tile_size=256)
+    assert pyramid.num_levels == 4
+    fractions = []
+    pyramid.build(progress=fractions.append)
+    assert fractions == [2 / 4, 3 / 4, 4 / 4]
+    assert [level.shape for level in pyramid.levels] == [(2000, 1500), (1000, 750), (500, 375), (250, 188)]
+
+def test_built_level_falls_back_to_finer_levels():
+    img = np.full((2000, 1500), 255, dtype=np.uint8)
+    img[1001, 3] = 0
+    pyramid = MapPyramid(img, tile_size=256)
+    assert pyramid.built_level(3) == 0
+    pyramid.build(1)
+    assert len(pyramid.levels) == 2
+    assert pyramid.built_level(3) == 1
+    assert pyramid.built_level(0) == 0
+    # level() still builds what it needs, borders survive the downsampling
+    assert pyramid.level(3)[125, 0] == 0
+    assert pyramid.built_level(5) == 3
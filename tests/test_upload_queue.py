@@ -0,0 +1,111 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pathPlannig.upload_queue import JsonUploadBackend, UploadQueue
+
+# Far enough in the future for every retry to be due
+LATER = 1e12
+
+
+class RecordingBackend(JsonUploadBackend):
+    """JsonUploadBackend keeping the values of every successful update"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.updates = []
+
+    def update(self, key, values):
+        super().update(key, values)
+        self.updates.append(dict(values))
+
+def plan(count, name="lake", offset=0.0):
+    return {"map_name": name,
+            "waypoints": [{"point_number": i + 1, "x": i + offset, "y": 2.0 * i} for i in range(count)]}
+
+def make_queue(tmp_path, chunk_size=10):
+    backend = RecordingBackend(str(tmp_path / "db.json"))
+    return UploadQueue(str(tmp_path / "outbox"), backend, chunk_size=chunk_size, base_delay=0.0), backend
+
+def test_outbox_persists_across_restart(tmp_path):
+    queue, backend = make_queue(tmp_path)
+    queue.enqueue("lake", plan(25))
+    restarted = UploadQueue(queue.outbox_dir, backend, chunk_size=10)
+    assert restarted.pending() == ["lake"]
+    restarted.process()
+    assert restarted.pending() == []
+    assert backend.plan("lake")["waypoints"] == plan(25)["waypoints"]
+    assert backend.plan("lake")["waypoint_count"] == 25
+
+def test_newer_plan_replaces_pending_one(tmp_path):
+    queue, backend = make_queue(tmp_path)
+    queue.enqueue("lake", plan(25))
+    queue.enqueue("lake", plan(12, offset=0.5))
+    assert queue.pending() == ["lake"]
+    queue.process()
+    assert backend.plan("lake")["waypoints"] == plan(12, offset=0.5)["waypoints"]
+
+def test_retry_resumes_after_failed_chunk(tmp_path):
+    queue, backend = make_queue(tmp_path)
+    queue.enqueue("lake", plan(15))
+    queue.process()
+    statuses = []
+    def fail_second_chunk(key, status, message):
+        statuses.append(status)
+        if statuses == ["progress"]:
+            backend.fail_next = 1
+    queue.add_listener(fail_second_chunk)
+    queue.enqueue("lake", plan(35, offset=0.5))
+    queue.process()
+    assert statuses == ["progress", "retry"]
+    # The boat still reads the previous plan, whole
+    assert backend.plan("lake")["waypoints"] == plan(15)["waypoints"]
+    assert backend.plan("lake")["waypoint_count"] == 15
+    sent = len(backend.updates)
+    queue.process(now=LATER)
+    assert statuses[-1] == "sent"
+    # The three chunks left and the metadata, not the first chunk again
+    assert len(backend.updates) - sent == 4
+    assert backend.plan("lake")["waypoints"] == plan(35, offset=0.5)["waypoints"]
+
+def test_delta_sends_only_changed_and_removed_points(tmp_path):
+    queue, backend = make_queue(tmp_path, chunk_size=100)
+    first = plan(30)
+    queue.enqueue("lake", first)
+    queue.process()
+    queue.enqueue("lake", plan(30, offset=0.5))
+    queue.process()
+    # Back to the version holding the first plan: one point moved, two removed
+    third = plan(28)
+    third["waypoints"][5]["x"] = 99.0
+    sent = len(backend.updates)
+    queue.enqueue("lake", third)
+    queue.process()
+    waypoint_updates = backend.updates[sent]
+    assert sorted(waypoint_updates) == ["versions/a/waypoints/28", "versions/a/waypoints/29",
+                                        "versions/a/waypoints/5"]
+    assert waypoint_updates["versions/a/waypoints/28"] is None
+    assert backend.plan("lake")["waypoints"] == third["waypoints"]
+    assert backend.plan("lake")["waypoint_count"] == 28
+
+def test_metadata_is_written_last_with_the_version_switch(tmp_path):
+    queue, backend = make_queue(tmp_path)
+    queue.enqueue("lake", plan(25))
+    queue.process()
+    *chunks, meta = backend.updates
+    assert len(chunks) == 3
+    assert all(path.startswith("versions/a/waypoints/") for chunk in chunks for path in chunk)
+    assert meta["active_version"] == "a"
+    assert meta["waypoint_count"] == 25
+    assert meta["map_name"] == "lake"
+    assert not any(path.startswith("versions/") for path in meta)
+
+def test_plan_named_like_the_state_file(tmp_path):
+    queue, backend = make_queue(tmp_path)
+    queue.enqueue("lake", plan(5))
+    queue.process()
+    queue.enqueue("sent", plan(3, name="sent"))
+    assert queue.pending() == ["sent"]
+    queue.process()
+    assert backend.plan("sent")["waypoint_count"] == 3
+    assert UploadQueue(queue.outbox_dir, backend).sent["lake"]["active"] == "a"
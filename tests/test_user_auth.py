@@ -0,0 +1,112 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pathPlannig import user_auth
+from pathPlannig.user_auth import (MIGRATE_PASSWORDS_ENV, USERS_JSON_ENV, Authenticator, JsonUserBackend,
+                                   check_user_credentials, hash_password, verify_password)
+
+# Few iterations keep the tests fast, the records carry their own count
+TEST_ITERATIONS = 1000
+
+
+class CountingBackend(JsonUserBackend):
+    """JsonUserBackend counting the lookups that reach the database"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.lookups = 0
+
+    def find_user(self, username):
+        self.lookups += 1
+        return super().find_user(username)
+
+class Clock:
+    """Stand-in for the time module, moved forward by hand"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+def users_file(tmp_path):
+    path = tmp_path / "users.json"
+    path.write_text(json.dumps({
+        "u1": {"username": "alice", "privileges": "admin",
+               "password_hash": hash_password("s3cret", iterations=TEST_ITERATIONS)},
+        "u2": {"username": "bob", "password": "legacy"},
+    }))
+    return str(path)
+
+def read_users(path):
+    with open(path) as f:
+        return json.load(f)
+
+def test_hash_and_verify_round_trip():
+    stored = hash_password("s3cret")
+    algorithm, iterations, salt, _ = stored.split("$")
+    assert (algorithm, int(iterations)) == ("pbkdf2_sha256", user_auth.PBKDF2_ITERATIONS)
+    assert verify_password("s3cret", {"password_hash": stored})
+    # Salted: the same password never hashes the same twice
+    assert hash_password("s3cret") != stored
+    assert hash_password("s3cret", salt) == stored
+
+def test_wrong_passwords_are_rejected(tmp_path):
+    stored = hash_password("s3cret", iterations=TEST_ITERATIONS)
+    assert not verify_password("S3cret", {"password_hash": stored})
+    assert not verify_password("s3cret", {"password_hash": "md5$1$salt$hash"})
+    assert not verify_password("s3cret", {})
+    authenticator = Authenticator(JsonUserBackend(users_file(tmp_path)))
+    assert authenticator.check_credentials("alice", "wrong") == (False, None)
+    assert authenticator.check_credentials("carol", "s3cret") == (False, None)
+    assert authenticator.check_credentials("alice", "s3cret") == (True, True)
+
+def test_legacy_password_is_kept_without_migration(tmp_path, monkeypatch):
+    path = users_file(tmp_path)
+    monkeypatch.setenv(USERS_JSON_ENV, path)
+    monkeypatch.delenv(MIGRATE_PASSWORDS_ENV, raising=False)
+    monkeypatch.setattr(user_auth, "_authenticator", None)
+    assert check_user_credentials("bob", "legacy") == (True, False)
+    assert check_user_credentials("bob", "wrong") == (False, None)
+    assert read_users(path)["u2"] == {"username": "bob", "password": "legacy"}
+
+def test_legacy_password_is_migrated(tmp_path, monkeypatch):
+    path = users_file(tmp_path)
+    monkeypatch.setenv(USERS_JSON_ENV, path)
+    monkeypatch.setenv(MIGRATE_PASSWORDS_ENV, "1")
+    monkeypatch.setattr(user_auth, "_authenticator", None)
+    assert check_user_credentials("bob", "legacy") == (True, False)
+    bob = read_users(path)["u2"]
+    assert "password" not in bob
+    assert verify_password("legacy", bob)
+    # A new process logs in against the hash
+    assert Authenticator(JsonUserBackend(path)).check_credentials("bob", "legacy") == (True, False)
+    assert Authenticator(JsonUserBackend(path)).check_credentials("bob", "wrong") == (False, None)
+
+def test_sessions_expire_after_the_ttl(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(user_auth, "time", clock)
+    backend = CountingBackend(users_file(tmp_path))
+    authenticator = Authenticator(backend, ttl=10)
+    assert authenticator.check_credentials("alice", "s3cret") == (True, True)
+    clock.now += 9
+    assert authenticator.is_admin("alice") is True
+    assert authenticator.check_credentials("alice", "s3cret") == (True, True)
+    assert backend.lookups == 1
+    clock.now += 2
+    assert authenticator.is_admin("alice") is None
+    assert authenticator.check_credentials("alice", "s3cret") == (True, True)
+    assert backend.lookups == 2
+
+def test_wrong_password_of_a_cached_user_is_rejected(tmp_path):
+    backend = CountingBackend(users_file(tmp_path))
+    authenticator = Authenticator(backend)
+    assert authenticator.check_credentials("alice", "s3cret") == (True, True)
+    assert authenticator.check_credentials("alice", "wrong") == (False, None)
+    assert authenticator.check_credentials("alice", "") == (False, None)
+    assert backend.lookups == 3
+    # The failed attempts leave the session of the right password alone
+    assert authenticator.check_credentials("alice", "s3cret") == (True, True)
+    assert backend.lookups == 3
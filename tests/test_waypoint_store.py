@@ -0,0 +1,60 @@
+import os
+import random
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pathPlannig.waypoint_store import MAX_PENDING_SHIFTS, WaypointStore
+
+
+def random_point(rng, size=500.0):
+    return rng.uniform(0, size), rng.uniform(0, size)
+
+def test_matches_a_list_under_random_edits():
+    rng = random.Random(7)
+    store = WaypointStore(cell_size=16)
+    points = [random_point(rng) for _ in range(200)]
+    store.extend(np.array(points))
+    for step in range(3000):
+        op = rng.random()
+        if op < 0.4:
+            index = rng.randint(0, len(points))
+            point = random_point(rng)
+            store.insert(index, *point)
+            points.insert(index, point)
+        elif op < 0.8 and points:
+            index = rng.randrange(len(points))
+            store.remove(index)
+            points.pop(index)
+        elif op < 0.99:
+            added = [random_point(rng) for _ in range(rng.randint(0, 6))]
+            store.extend(np.array(added).reshape(-1, 2))
+            points += added
+        else:
+            store.clear()
+            points = []
+        assert store.xy.tolist() == [list(point) for point in points]
+        if not points:
+            assert store.nearest(0.0, 0.0) is None
+            continue
+        x, y = random_point(rng)
+        d2 = [(px - x) ** 2 + (py - y) ** 2 for px, py in points]
+        assert d2[store.nearest(x, y)] == min(d2), step
+        radius = rng.uniform(0, 60)
+        assert store.within_radius(x, y, radius).tolist() == [i for i, d in enumerate(d2) if d <= radius ** 2]
+
+def test_insert_rebuilding_the_id_table_when_it_is_full():
+    # The insert brings the shifts past MAX_PENDING_SHIFTS while the id
+    # tables are exactly full
+    store = WaypointStore(capacity=64)
+    store.extend(np.arange(200.0).reshape(100, 2))
+    for _ in range(MAX_PENDING_SHIFTS):
+        store.remove(0)
+    store.extend(np.arange(56.0).reshape(28, 2))
+    store.insert(0, 1000.0, 1000.0)
+    assert len(store) == 65
+    assert store.nearest(1000.0, 1000.0) == 0
+    # 36 points are left of the first 100, the second batch follows them
+    assert store.nearest(0.0, 1.0) == 37
+    assert store.within_radius(130.0, 131.0, 1.0).tolist() == [2]